@@ -1,16 +1,16 @@
 from flask import Flask
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from config import Config
+from .utils.sharding import ShardedSession, configure_shards
+from .utils.replicas import configure_replicas
 
 # Create instances of extensions to be used across the application
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": ShardedSession})
 bcrypt = Bcrypt()
 jwt = JWTManager()
-migrate = Migrate()
 
 def create_app(config_class=Config):
     """
@@ -26,19 +26,66 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # User shards and read replicas are registered as database binds before the database extension starts
+    configure_shards(app)
+    configure_replicas(app)
+
     # Initialize extensions
     db.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
-    migrate.init_app(app, db)
+
+    # Fast JSON encoding and response compression
+    from .utils.json_provider import configure_json
+    configure_json(app)
+    if app.config['RESPONSE_COMPRESSION']:
+        from .utils.compression import register_compression
+        register_compression(app)
 
     # Enable CORS for specific origins
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+    # Opt-in anonymised request traces for replay (first, so rejected requests are recorded too)
+    from .utils.traffic import register_traffic_capture
+    register_traffic_capture(app)
+
+    # Concurrency limits, per-user rate limits and queue-time shedding on the write and analysis endpoints
+    from .utils.admission import register_admission
+    register_admission(app)
+
     # Register blueprints
     from .routes import bp as routes_bp
     app.register_blueprint(routes_bp, url_prefix='/api')
 
+    # Compressed monthly partitions of archived symptom logs
+    from .utils.log_archive import register_archive
+    register_archive(app)
+
+    # Per-user windows of recent logs shared by the read endpoints
+    from .utils.hot_window import HotWindowCache
+    app.extensions['hot_window'] = HotWindowCache(window_size=app.config['HOT_WINDOW_SIZE'],
+                                                  max_bytes=app.config['HOT_WINDOW_MAX_MB'] * 1024 * 1024,
+                                                  archive=app.extensions['log_archive'])
+
+    # Outbox of new symptom logs for incremental consumers
+    from .utils.change_feed import register_change_feed
+    register_change_feed(app)
+
+    # Server-sent event streams of new logs and analyses, per user
+    from .utils.live_updates import register_live_updates
+    register_live_updates(app)
+
+    # Keep SQLite read replicas refreshed from the primary
+    app.extensions['replica_set'].start()
+
+    # CLI commands for scheduled jobs
+    from .commands import register_commands
+    register_commands(app)
+
+    # Load the deferred ML modules and model off the request path
+    from .utils.warmup import start_warmup
+    start_warmup(app)
+
     # Error Handlers
     @app.errorhandler(404)
     def not_found_error(error):
@@ -0,0 +1,461 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, distinct, case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from ..models import User, SymptomLog, DailyRollup, ExerciseRollup, UserAdherence
+from ..utils.flare_rules import is_flare_up, flare_up_mask
+from .sketches import HyperLogLog, parse_histogram, format_histogram, histogram_quantiles
+
+def cohort_for(created_at):
+    """
+    Cohort label for a user, based on the month they signed up.
+
+    Args:
+        created_at (datetime or None): The user's creation timestamp.
+
+    Returns:
+        str: Cohort label such as "2024-11", or "unknown".
+    """
+    return created_at.strftime('%Y-%m') if created_at else 'unknown'
+
+class RollupManager:
+    """
+    Maintains daily per-cohort aggregate tables for population-level analytics.
+    Rollups are updated incrementally as logs are written (`record_log`) and can be
+    rebuilt for a date range from `symptom_logs` by a scheduled job (`rebuild`).
+    Dashboards read only from the rollups (`summarize`).
+    """
+
+    def __init__(self, db_session: Session, precision=10, chunk_size=50000, archive=None):
+        """
+        Initialize the RollupManager.
+
+        Args:
+            db_session (Session): SQLAlchemy session for database interactions.
+            precision (int): HyperLogLog precision for the distinct user sketches.
+            chunk_size (int): Number of logs read per chunk when rebuilding.
+            archive (LogArchive, optional): Archived months of `symptom_logs`, read alongside the table.
+        """
+        self.db_session = db_session
+        self.precision = precision
+        self.chunk_size = chunk_size
+        self.archive = archive
+
+    # ---------------------- Incremental Updates ----------------------
+
+    def _locked_row(self, model, keys, **zeros):
+        """
+        The row of `model` with the given key values, created first if it does not exist.
+        The row is created with INSERT ... ON CONFLICT DO NOTHING, so concurrent writers never race to
+        insert it, and read FOR UPDATE (on SQLite the insert already holds the write lock), so their
+        read-modify-write updates of its counters are serialized.
+        """
+        dialect = self.db_session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            statement = sqlite.insert(model.__table__)
+        elif dialect == 'postgresql':
+            statement = postgresql.insert(model.__table__)
+        else:
+            raise NotImplementedError(f"Incremental rollups do not support the {dialect} dialect")
+        self.db_session.execute(statement.values(**keys, **zeros).on_conflict_do_nothing(index_elements=list(keys)))
+        return self.db_session.execute(select(model).filter_by(**keys).with_for_update()).scalar_one()
+
+    def _daily_row(self, day, cohort):
+        return self._locked_row(DailyRollup, {"day": day, "cohort": cohort}, log_count=0, flare_count=0, pain_sum=0,
+                                stress_sum=0, sleep_sum=0.0, medication_count=0)
+
+    def _exercise_row(self, day, cohort, exercise_type):
+        return self._locked_row(ExerciseRollup, {"day": day, "cohort": cohort, "exercise_type": exercise_type},
+                                log_count=0, pain_sum=0)
+
+    def record_log(self, log, cohort):
+        """
+        Fold a single new symptom log into the rollups.
+        Does not commit, so the update lands in the same transaction as the log itself.
+        The log's levels must already be validated (1-10, see InputValidator.clean_symptom_log).
+
+        Args:
+            log (SymptomLog): The log being written.
+            cohort (str): Cohort label of the log's user (see `cohort_for`).
+        """
+        for level in (log.pain_level, log.stress_level):
+            # Negative indexes would silently count into the top histogram bins
+            if not isinstance(level, int) or not 1 <= level <= 10:
+                raise ValueError(f"Symptom levels must be integers from 1 to 10, got {level!r}")
+
+        day = (log.logged_at or datetime.utcnow()).date()
+        flare = is_flare_up(log.pain_level, log.stress_level, log.sleep_hours,
+                            log.exercise_done, log.took_medication)
+
+        daily = self._daily_row(day, cohort)
+        daily.log_count += 1
+        daily.flare_count += int(flare)
+        daily.pain_sum += log.pain_level
+        daily.stress_sum += log.stress_level
+        daily.sleep_sum += log.sleep_hours
+        daily.medication_count += int(bool(log.took_medication))
+
+        pain_histogram = parse_histogram(daily.pain_histogram)
+        pain_histogram[log.pain_level - 1] += 1
+        daily.pain_histogram = format_histogram(pain_histogram)
+
+        stress_histogram = parse_histogram(daily.stress_histogram)
+        stress_histogram[log.stress_level - 1] += 1
+        daily.stress_histogram = format_histogram(stress_histogram)
+
+        sketch = HyperLogLog(self.precision, daily.users_sketch)
+        sketch.add(log.user_id)
+        daily.users_sketch = sketch.to_bytes()
+
+        for exercise_type in (log.exercise_type.split(',') if log.exercise_type else ['none']):
+            exercise = self._exercise_row(day, cohort, exercise_type)
+            exercise.log_count += 1
+            exercise.pain_sum += log.pain_level
+
+        adherence = self._locked_row(UserAdherence, {"user_id": log.user_id}, cohort=cohort, log_count=0,
+                                     medication_count=0)
+        adherence.log_count += 1
+        adherence.medication_count += int(bool(log.took_medication))
+
+    # ---------------------- Scheduled Rebuild ----------------------
+
+    def rebuild(self, start=None, end=None):
+        """
+        Recompute the daily rollups for a date range from `symptom_logs` (and the archived
+        months), and the per-user adherence table in full. Logs are streamed in chunks as plain rows.
+
+        Args:
+            start (date, optional): First day to rebuild (inclusive). Defaults to all history.
+            end (date, optional): Last day to rebuild (inclusive). Defaults to all history.
+
+        Returns:
+            int: Number of logs scanned.
+        """
+        daily_filter = []
+        log_filter = []
+        since = datetime.combine(start, datetime.min.time()) if start is not None else None
+        until = datetime.combine(end + timedelta(days=1), datetime.min.time()) if end is not None else None
+        if start is not None:
+            daily_filter.append(DailyRollup.day >= start)
+            log_filter.append(SymptomLog.logged_at >= since)
+        if end is not None:
+            daily_filter.append(DailyRollup.day <= end)
+            log_filter.append(SymptomLog.logged_at < until)
+
+        exercise_filter = [ExerciseRollup.day >= start] if start is not None else []
+        if end is not None:
+            exercise_filter.append(ExerciseRollup.day <= end)
+
+        import pandas as pd  # Deferred: only the scheduled rebuild needs pandas, not the request path
+
+        try:
+            self.db_session.query(DailyRollup).filter(*daily_filter).delete(synchronize_session=False)
+            self.db_session.query(ExerciseRollup).filter(*exercise_filter).delete(synchronize_session=False)
+
+            daily, exercise, sketches = {}, {}, {}
+            scanned = 0
+            query = (select(SymptomLog.user_id, User.created_at, SymptomLog.logged_at, SymptomLog.pain_level,
+                            SymptomLog.stress_level, SymptomLog.sleep_hours, SymptomLog.exercise_done,
+                            SymptomLog.exercise_type, SymptomLog.took_medication)
+                     .join(User, User.user_id == SymptomLog.user_id)
+                     .where(*log_filter))
+            result = self.db_session.execute(query.execution_options(yield_per=self.chunk_size))
+
+            for rows in result.partitions():
+                chunk = pd.DataFrame(rows, columns=['user_id', 'created_at', 'logged_at', 'pain_level', 'stress_level',
+                                                    'sleep_hours', 'exercise_done', 'exercise_type', 'took_medication'])
+                scanned += len(chunk)
+                self._accumulate_chunk(chunk, daily, exercise, sketches)
+
+            if self.archive is not None:
+                created_at = None
+                for chunk in self.archive.frames(self.db_session, since, until):
+                    if created_at is None:
+                        created_at = dict(self.db_session.execute(select(User.user_id, User.created_at)).all())
+                    chunk = chunk[chunk['user_id'].isin(created_at.keys())]  # Inner join, as for the table
+                    chunk.insert(1, 'created_at', chunk['user_id'].map(created_at))
+                    scanned += len(chunk)
+                    self._accumulate_chunk(chunk, daily, exercise, sketches)
+
+            for (day, cohort), totals in daily.items():
+                self.db_session.add(DailyRollup(
+                    day=day, cohort=cohort,
+                    log_count=totals['log_count'], flare_count=totals['flare_count'],
+                    pain_sum=totals['pain_sum'], stress_sum=totals['stress_sum'],
+                    sleep_sum=totals['sleep_sum'], medication_count=totals['medication_count'],
+                    pain_histogram=format_histogram(totals['pain_histogram']),
+                    stress_histogram=format_histogram(totals['stress_histogram']),
+                    users_sketch=sketches[(day, cohort)].to_bytes()
+                ))
+
+            for (day, cohort, exercise_type), (log_count, pain_sum) in exercise.items():
+                self.db_session.add(ExerciseRollup(day=day, cohort=cohort, exercise_type=exercise_type,
+                                                   log_count=log_count, pain_sum=pain_sum))
+
+            self._rebuild_adherence()
+            self.db_session.commit()
+            print(f"Rollups rebuilt from {scanned} symptom logs.")
+            return scanned
+
+        except Exception as e:
+            self.db_session.rollback()
+            print(f"Error rebuilding analytics rollups: {e}")
+            raise
+
+    def _accumulate_chunk(self, chunk, daily, exercise, sketches):
+        """
+        Aggregate one chunk of raw log rows into the running rollup totals.
+        """
+        import pandas as pd
+
+        chunk['day'] = pd.to_datetime(chunk['logged_at']).dt.date
+        created_at = pd.to_datetime(chunk['created_at'])
+        chunk['cohort'] = created_at.dt.strftime('%Y-%m').fillna('unknown')
+        chunk['flare'] = flare_up_mask(chunk['pain_level'], chunk['stress_level'], chunk['sleep_hours'],
+                                       chunk['exercise_done'], chunk['took_medication'])
+        chunk['took_medication'] = chunk['took_medication'].astype(int)
+
+        grouped = chunk.groupby(['day', 'cohort'])
+        sums = grouped.agg(log_count=('pain_level', 'size'), flare_count=('flare', 'sum'),
+                           pain_sum=('pain_level', 'sum'), stress_sum=('stress_level', 'sum'),
+                           sleep_sum=('sleep_hours', 'sum'), medication_count=('took_medication', 'sum'))
+        pain_counts = chunk.groupby(['day', 'cohort', 'pain_level']).size()
+        stress_counts = chunk.groupby(['day', 'cohort', 'stress_level']).size()
+
+        for key, row in sums.iterrows():
+            totals = daily.setdefault(key, {
+                'log_count': 0, 'flare_count': 0, 'pain_sum': 0, 'stress_sum': 0, 'sleep_sum': 0.0,
+                'medication_count': 0, 'pain_histogram': [0] * 10, 'stress_histogram': [0] * 10
+            })
+            for column in ('log_count', 'flare_count', 'pain_sum', 'stress_sum', 'medication_count'):
+                totals[column] += int(row[column])
+            totals['sleep_sum'] += float(row['sleep_sum'])
+
+        for (day, cohort, level), count in pain_counts.items():
+            daily[(day, cohort)]['pain_histogram'][int(level) - 1] += int(count)
+        for (day, cohort, level), count in stress_counts.items():
+            daily[(day, cohort)]['stress_histogram'][int(level) - 1] += int(count)
+
+        for (day, cohort), user_ids in chunk.groupby(['day', 'cohort'])['user_id'].unique().items():
+            sketch = sketches.setdefault((day, cohort), HyperLogLog(self.precision))
+            for user_id in user_ids:
+                sketch.add(user_id)
+
+        types = chunk[['day', 'cohort', 'pain_level']].assign(
+            exercise_type=chunk['exercise_type'].fillna('').replace('', 'none').str.split(',')
+        ).explode('exercise_type')
+        for (day, cohort, exercise_type), row in types.groupby(['day', 'cohort', 'exercise_type'])['pain_level'].agg(['size', 'sum']).iterrows():
+            log_count, pain_sum = exercise.get((day, cohort, exercise_type), (0, 0))
+            exercise[(day, cohort, exercise_type)] = (log_count + int(row['size']), pain_sum + int(row['sum']))
+
+    def _rebuild_adherence(self):
+        """
+        Recompute per-user medication adherence with a single GROUP BY.
+        """
+        self.db_session.query(UserAdherence).delete(synchronize_session=False)
+        rows = self.db_session.execute(
+            select(SymptomLog.user_id, User.created_at, func.count(SymptomLog.id),
+                   func.sum(case((SymptomLog.took_medication, 1), else_=0)))
+            .join(User, User.user_id == SymptomLog.user_id)
+            .group_by(SymptomLog.user_id, User.created_at)
+        ).all()
+        adherence = {user_id: [created_at, log_count, int(medication_count or 0)]
+                     for user_id, created_at, log_count, medication_count in rows}
+
+        archived = self.archive.user_counts(self.db_session) if self.archive is not None else {}
+        if archived:
+            created_at = dict(self.db_session.execute(select(User.user_id, User.created_at)).all())
+            for user_id, (log_count, medication_count) in archived.items():
+                if user_id in created_at:
+                    totals = adherence.setdefault(user_id, [created_at[user_id], 0, 0])
+                    totals[1] += log_count
+                    totals[2] += medication_count
+
+        self.db_session.bulk_insert_mappings(UserAdherence, [
+            {'user_id': user_id, 'cohort': cohort_for(created_at), 'log_count': log_count,
+             'medication_count': medication_count}
+            for user_id, (created_at, log_count, medication_count) in adherence.items()
+        ])
+
+    # ---------------------- Queries ----------------------
+
+    def summarize(self, start=None, end=None, cohort=None, approximate=False):
+        """
+        Population-level analytics answered from the rollup tables.
+
+        Args:
+            start (date, optional): First day to include.
+            end (date, optional): Last day to include.
+            cohort (str, optional): Restrict to one signup cohort.
+            approximate (bool): Use the HyperLogLog sketches for distinct users instead of
+                an exact COUNT(DISTINCT) over `symptom_logs`.
+
+        Returns:
+            dict: Flare-up rate by day, average pain by exercise type, adherence distribution,
+                pain/stress quantiles and distinct users.
+        """
+        return self.finalize(self.collect(start, end, cohort, approximate), start, end, cohort, approximate)
+
+    def collect(self, start=None, end=None, cohort=None, approximate=False):
+        """
+        The mergeable partial aggregates behind `summarize`, for one database (or shard).
+        Partials from shards holding disjoint users combine with `merge`.
+
+        Returns:
+            dict: Partial aggregates.
+        """
+        daily_filter, exercise_filter = [], []
+        if start is not None:
+            daily_filter.append(DailyRollup.day >= start)
+            exercise_filter.append(ExerciseRollup.day >= start)
+        if end is not None:
+            daily_filter.append(DailyRollup.day <= end)
+            exercise_filter.append(ExerciseRollup.day <= end)
+        if cohort is not None:
+            daily_filter.append(DailyRollup.cohort == cohort)
+            exercise_filter.append(ExerciseRollup.cohort == cohort)
+
+        by_day = self.db_session.execute(
+            select(DailyRollup.day, func.sum(DailyRollup.log_count), func.sum(DailyRollup.flare_count))
+            .where(*daily_filter).group_by(DailyRollup.day)
+        ).all()
+
+        by_exercise = self.db_session.execute(
+            select(ExerciseRollup.exercise_type, func.sum(ExerciseRollup.log_count), func.sum(ExerciseRollup.pain_sum))
+            .where(*exercise_filter).group_by(ExerciseRollup.exercise_type)
+        ).all()
+
+        histograms = self.db_session.execute(
+            select(DailyRollup.pain_histogram, DailyRollup.stress_histogram, DailyRollup.users_sketch,
+                   DailyRollup.log_count, DailyRollup.pain_sum, DailyRollup.stress_sum, DailyRollup.sleep_sum)
+            .where(*daily_filter)
+        ).all()
+
+        pain_histogram, stress_histogram = [0] * 10, [0] * 10
+        totals = {'logs': 0, 'pain': 0, 'stress': 0, 'sleep': 0.0}
+        sketch = HyperLogLog(self.precision) if approximate else None
+        for pain, stress, users_sketch, log_count, pain_sum, stress_sum, sleep_sum in histograms:
+            pain_histogram = [a + b for a, b in zip(pain_histogram, parse_histogram(pain))]
+            stress_histogram = [a + b for a, b in zip(stress_histogram, parse_histogram(stress))]
+            totals['logs'] += log_count
+            totals['pain'] += pain_sum
+            totals['stress'] += stress_sum
+            totals['sleep'] += sleep_sum
+            if sketch is not None and users_sketch:
+                sketch.merge(HyperLogLog(self.precision, users_sketch))
+
+        return {
+            "by_day": {day: (int(log_count), int(flare_count)) for day, log_count, flare_count in by_day},
+            "by_exercise": {exercise_type: (int(log_count), int(pain_sum))
+                            for exercise_type, log_count, pain_sum in by_exercise},
+            "pain_histogram": pain_histogram,
+            "stress_histogram": stress_histogram,
+            "totals": totals,
+            "sketch": sketch,
+            "distinct_users": None if approximate else self._exact_distinct_users(start, end, cohort),
+            "adherence": self._adherence_counts(cohort)
+        }
+
+    @staticmethod
+    def merge(partials):
+        """
+        Combine `collect` results from databases holding disjoint sets of users.
+
+        Args:
+            partials (list): Partial aggregates.
+
+        Returns:
+            dict: One partial covering all of them.
+        """
+        merged = partials[0]
+        for partial in partials[1:]:
+            for day, (log_count, flare_count) in partial['by_day'].items():
+                logs, flares = merged['by_day'].get(day, (0, 0))
+                merged['by_day'][day] = (logs + log_count, flares + flare_count)
+            for exercise_type, (log_count, pain_sum) in partial['by_exercise'].items():
+                logs, pain = merged['by_exercise'].get(exercise_type, (0, 0))
+                merged['by_exercise'][exercise_type] = (logs + log_count, pain + pain_sum)
+            merged['pain_histogram'] = [a + b for a, b in zip(merged['pain_histogram'], partial['pain_histogram'])]
+            merged['stress_histogram'] = [a + b for a, b in zip(merged['stress_histogram'], partial['stress_histogram'])]
+            for key, value in partial['totals'].items():
+                merged['totals'][key] += value
+            if merged['sketch'] is not None:
+                merged['sketch'].merge(partial['sketch'])
+            if merged['distinct_users'] is not None:
+                merged['distinct_users'] += partial['distinct_users']
+            merged['adherence'] = [a + b for a, b in zip(merged['adherence'], partial['adherence'])]
+        return merged
+
+    @staticmethod
+    def finalize(partial, start=None, end=None, cohort=None, approximate=False):
+        """
+        Turn (merged) partial aggregates into the `summarize` response.
+        """
+        totals = partial['totals']
+        logs = totals['logs']
+        return {
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+            "cohort": cohort,
+            "approximate": approximate,
+            "total_logs": logs,
+            "distinct_users": partial['sketch'].count() if approximate else partial['distinct_users'],
+            "average_pain": round(totals['pain'] / logs, 2) if logs else None,
+            "average_stress": round(totals['stress'] / logs, 2) if logs else None,
+            "average_sleep": round(totals['sleep'] / logs, 2) if logs else None,
+            "pain_quantiles": histogram_quantiles(partial['pain_histogram']),
+            "stress_quantiles": histogram_quantiles(partial['stress_histogram']),
+            "flare_rate_by_day": [
+                {"day": day.isoformat(), "logs": log_count, "flare_rate": round(flare_count / log_count, 4)}
+                for day, (log_count, flare_count) in sorted(partial['by_day'].items()) if log_count
+            ],
+            "average_pain_by_exercise": {
+                exercise_type: round(pain_sum / log_count, 2)
+                for exercise_type, (log_count, pain_sum) in sorted(partial['by_exercise'].items()) if log_count
+            },
+            "medication_adherence_distribution": [
+                {"adherence": f"{bucket * 10}-{bucket * 10 + 10}%", "users": users}
+                for bucket, users in enumerate(partial['adherence'])
+            ]
+        }
+
+    def _exact_distinct_users(self, start, end, cohort):
+        """
+        Exact distinct user count; the one query in `summarize` that reads `symptom_logs`
+        (and the archived months in the range, if any).
+        """
+        since = datetime.combine(start, datetime.min.time()) if start is not None else None
+        until = datetime.combine(end + timedelta(days=1), datetime.min.time()) if end is not None else None
+        archived = (self.archive.user_ids(self.db_session, since, until)
+                    if self.archive is not None and self.archive.partitions(self.db_session, since, until) else None)
+
+        query = select(SymptomLog.user_id).distinct() if archived else select(func.count(distinct(SymptomLog.user_id)))
+        if start is not None:
+            query = query.where(SymptomLog.logged_at >= since)
+        if end is not None:
+            query = query.where(SymptomLog.logged_at < until)
+        cohort_users = select(UserAdherence.user_id).where(UserAdherence.cohort == cohort)
+        if cohort is not None:
+            query = query.where(SymptomLog.user_id.in_(cohort_users))
+        if not archived:
+            return self.db_session.execute(query).scalar() or 0
+
+        users = archived | set(self.db_session.execute(query).scalars())
+        if cohort is not None:
+            users &= set(self.db_session.execute(cohort_users).scalars())
+        return len(users)
+
+    def _adherence_counts(self, cohort=None):
+        """
+        Number of users per 10% medication adherence bucket.
+        """
+        ratio = UserAdherence.medication_count * 10 // UserAdherence.log_count
+        bucket = case((ratio >= 9, 9), else_=ratio)
+        query = (select(bucket.label('bucket'), func.count())
+                 .where(UserAdherence.log_count > 0)
+                 .group_by('bucket'))
+        if cohort is not None:
+            query = query.where(UserAdherence.cohort == cohort)
+
+        counts = dict(self.db_session.execute(query).all())
+        return [int(counts.get(bucket, 0)) for bucket in range(10)]
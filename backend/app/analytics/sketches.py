@@ -0,0 +1,107 @@
+import hashlib
+import math
+import numpy as np
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch for approximate distinct counts.
+    Registers are stored as raw bytes so sketches can be persisted in rollup rows and
+    merged across days and cohorts without rescanning the logs.
+    """
+
+    def __init__(self, precision=10, registers=None):
+        """
+        Initialize the sketch.
+
+        Args:
+            precision (int): Number of index bits; uses 2**precision one-byte registers.
+            registers (bytes, optional): Previously serialized registers to resume from.
+        """
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = (np.frombuffer(registers, dtype=np.uint8).copy() if registers
+                          else np.zeros(self.num_registers, dtype=np.uint8))
+
+        if len(self.registers) != self.num_registers:
+            raise ValueError(f"Expected {self.num_registers} registers, got {len(self.registers)}")
+
+    def add(self, value):
+        """
+        Add a value (anything with a stable `str`) to the sketch.
+        """
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        remaining_bits = 64 - self.precision
+        index = hashed >> remaining_bits
+        remainder = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """
+        Merge another sketch of the same precision into this one (in place).
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """
+        Estimate the number of distinct values added.
+
+        Returns:
+            int: Approximate distinct count (about 3% standard error at precision 10).
+        """
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int32)).sum()
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Linear counting for small cardinalities
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+def parse_histogram(histogram, bins=10):
+    """
+    Parse a comma separated histogram column into a list of counts.
+    """
+    return [int(count) for count in histogram.split(',')] if histogram else [0] * bins
+
+def format_histogram(counts):
+    """
+    Serialize a list of counts into a comma separated histogram column.
+    """
+    return ",".join(str(count) for count in counts)
+
+def histogram_quantiles(counts, quantiles=(0.5, 0.9), first_level=1):
+    """
+    Quantiles of a discrete distribution given as per-level counts.
+
+    Args:
+        counts (list of int): Count per level, starting at `first_level`.
+        quantiles (tuple of float): Quantiles to compute, between 0 and 1.
+        first_level (int): Value represented by the first bucket.
+
+    Returns:
+        dict: Quantile label (e.g. "p50") to value, or None values if the histogram is empty.
+    """
+    total = sum(counts)
+    results = {}
+    for quantile in quantiles:
+        label = f"p{int(round(quantile * 100))}"
+        if not total:
+            results[label] = None
+            continue
+
+        target = quantile * total
+        running = 0
+        for offset, count in enumerate(counts):
+            running += count
+            if running >= target:
+                results[label] = first_level + offset
+                break
+    return results
@@ -0,0 +1,367 @@
+from datetime import datetime, timedelta
+import time
+import click
+from flask import current_app
+from . import db
+
+class LazyMigrateGroup(click.Group):
+    """
+    Stand-in for Flask-Migrate's `flask db` command group. Flask-Migrate imports alembic, which costs
+    more than the rest of the app's startup, so it is only initialised once a `db` command is used.
+    """
+
+    def __init__(self, app):
+        super().__init__(name='db', help="Perform database migrations.")
+        self.app = app
+        self._group = None
+
+    def _load(self):
+        if self._group is None:
+            from flask_migrate import Migrate
+            Migrate(self.app, db)  # Registers the real `db` group (and app.extensions['migrate'])
+            self._group = self.app.cli.commands['db']
+        return self._group
+
+    def parse_args(self, ctx, args):
+        # Take over the real group's options (--directory, -x) and callback before parsing
+        group = self._load()
+        self.params, self.callback = group.params, group.callback
+        return super().parse_args(ctx, args)
+
+    def list_commands(self, ctx):
+        return self._load().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._load().get_command(ctx, name)
+
+def register_commands(app):
+    """
+    Register CLI commands for maintenance and scheduled jobs (run with `flask <command>`).
+
+    Args:
+        app (Flask): The application to register the commands on.
+    """
+    app.cli.add_command(LazyMigrateGroup(app))
+
+    @app.cli.command('rollup-analytics')
+    @click.option('--days', type=int, default=None, help='Only rebuild the last N days (default: all history).')
+    def rollup_analytics(days):
+        """
+        Rebuild the population analytics rollups from symptom_logs.
+        """
+        from .analytics.rollups import RollupManager
+        from .utils.log_archive import get_archive
+        from .utils.sharding import get_router
+
+        start = (datetime.utcnow() - timedelta(days=days)).date() if days else None
+        precision = current_app.config['ANALYTICS_HLL_PRECISION']
+        archive = get_archive()
+        scanned = sum(get_router().fan_out(
+            lambda session: RollupManager(session, precision=precision, archive=archive).rebuild(start=start)))
+        click.echo(f"Rebuilt analytics rollups from {scanned} logs.")
+
+    @app.cli.command('train-model')
+    @click.option('--source', default=None, help='CSV path/glob, SQLite file or URL (default: the app database).')
+    @click.option('--out-of-core/--in-memory', default=False,
+                  help='Stream the data with a StreamingPreprocessor instead of loading a CSV at once.')
+    @click.option('--mode', type=click.Choice(['forest', 'sgd']), default='forest', help='Out-of-core learner.')
+    @click.option('--max-memory-mb', type=int, default=None, help='Peak memory budget for out-of-core training.')
+    @click.option('--challenger', default=None,
+                  help='Register the model under this name as the challenger instead of replacing the live model.')
+    def train_model(source, out_of_core, mode, max_memory_mb, challenger):
+        """
+        Train the flare-up model and overwrite the saved model file (or register it as a challenger).
+        """
+        import os
+        from .ml.model_registry import get_registry
+        from .ml.predictor import FlareUpPredictor
+        from .utils.sharding import get_router
+
+        registry = get_registry(current_app)
+        try:
+            predictor = FlareUpPredictor(model_file_path=registry.path(challenger) if challenger else None)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        os.makedirs(os.path.dirname(predictor.model_file_path), exist_ok=True)
+        if not out_of_core:
+            if not source or not source.endswith('.csv'):
+                raise click.UsageError("In-memory training needs --source pointing to a CSV file "
+                                       "(use --out-of-core to train from the database).")
+            predictor.train_model(source)
+            report = {"mode": 'in-memory'}
+        else:
+            report = predictor.train_model_out_of_core(
+                source or get_router().engines(read_only=True), mode=mode,
+                max_memory_mb=max_memory_mb or current_app.config['OUT_OF_CORE_MAX_MEMORY_MB'])
+            click.echo(f"Training report: {report}")
+
+        if challenger:
+            registry.register(challenger, source=source or 'database', report=report)
+            registry.set_challenger(challenger)
+            click.echo(f"Registered '{challenger}' as the challenger; restart the workers to shadow-score it.")
+
+    @app.cli.command('models')
+    @click.option('--challenger', default=None, help='Registered model to shadow-score against the champion.')
+    @click.option('--no-challenger', is_flag=True, help='Stop shadow scoring.')
+    @click.option('--promote', default=None, help='Registered model to copy over the live model file.')
+    def models(challenger, no_challenger, promote):
+        """
+        List the registered flare-up models, and set the challenger or promote one to champion.
+        """
+        from .ml.model_registry import get_registry
+
+        registry = get_registry(current_app)
+        try:
+            if promote:
+                previous = registry.promote(promote)
+                click.echo(f"Promoted '{promote}' (previous champion: '{previous}'); restart the workers to serve it.")
+            if challenger or no_challenger:
+                registry.set_challenger(None if no_challenger else challenger)
+        except (KeyError, ValueError) as e:
+            raise click.UsageError(str(e.args[0]))
+
+        click.echo(f"Champion: {registry.champion}; challenger: {registry.challenger or 'none'}")
+        for model in registry.models():
+            click.echo(f"{model['name']:30} {model['role'] or '':10} {model['created_at']}  "
+                       f"{model.get('report') or ''}")
+
+    @app.cli.command('evaluate-models')
+    @click.option('--champion', default=None, help='Reference model (default: the live model).')
+    @click.option('--challenger', default=None, help='Model compared to it (default: the registry\'s challenger).')
+    @click.option('--workers', type=int, default=None, help='Worker processes (default: MODEL_EVALUATION_WORKERS).')
+    @click.option('--chunk-size', type=int, default=None, help='Logs per chunk (default: MODEL_EVALUATION_CHUNK_SIZE).')
+    @click.option('--output', type=click.Path(dir_okay=False), default=None, help='Also write the report as JSON.')
+    def evaluate_models(champion, challenger, workers, chunk_size, output):
+        """
+        Replay every symptom log through the champion and a challenger and compare them.
+        """
+        import json
+        import pandas as pd
+        from sqlalchemy import text
+        from .ml.evaluation import OfflineEvaluator
+        from .ml.model_registry import LIVE_MODEL, get_registry
+        from .utils.log_archive import get_archive
+        from .utils.sharding import get_router
+
+        registry = get_registry(current_app)
+        champion = champion or LIVE_MODEL
+        challenger = challenger or registry.challenger
+        if not challenger:
+            raise click.UsageError("No challenger: pass --challenger or set one with `flask models --challenger`.")
+        try:
+            pipelines = {champion: registry.load(champion), challenger: registry.load(challenger)}
+        except (OSError, ValueError) as e:
+            raise click.UsageError(f"Unable to load the models: {e}")
+
+        if workers is None:
+            workers = current_app.config['MODEL_EVALUATION_WORKERS']
+        evaluator = OfflineEvaluator(pipelines, workers=workers,
+                                     chunk_size=chunk_size or current_app.config['MODEL_EVALUATION_CHUNK_SIZE'])
+        engines = get_router().engines(read_only=True)
+        report = evaluator.run(engines, archive=get_archive())
+        with engines[0].connect() as connection:
+            sample = pd.read_sql(text("SELECT * FROM symptom_logs ORDER BY id DESC LIMIT 200"), connection)
+        for name, latency in evaluator.single_row_latency(sample).items():
+            report['models'][name]['single_log_ms'] = latency
+
+        click.echo(f"Replayed {report['logs']} logs ({report['archived_logs']} from archived months) "
+                   f"in {report['chunks']} chunks on {report['workers']} workers "
+                   f"in {report['seconds']}s ({report['logs_per_second']} logs/s); "
+                   f"rule-based flare-up rate {report['rule_flare_up_rate']}.")
+        for name, result in report['models'].items():
+            click.echo(f"{name} ({result['role']}): accuracy {result['accuracy']}, precision {result['precision']}, "
+                       f"recall {result['recall']}, {result['microseconds_per_log']}us/log in batches, "
+                       f"{result['single_log_ms']}ms for a single log")
+        for name, agreement in report['agreement'].items():
+            click.echo(f"Agreement of {name} with {champion}: {agreement['rate']} "
+                       f"({agreement['challenger_only']} flare-ups only {name} predicts, "
+                       f"{agreement['champion_only']} only {champion}); "
+                       f"mean probability difference {agreement['mean_difference']}")
+        if output:
+            with open(output, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+
+    @app.cli.command('upgrade-shards')
+    def upgrade_shards():
+        """
+        Apply the database migrations to every shard.
+        """
+        from flask_migrate import Migrate, upgrade
+        from .utils.sharding import get_router
+
+        if 'migrate' not in current_app.extensions:
+            Migrate(current_app, db)
+        for shard in get_router().shard_keys:
+            click.echo(f"Upgrading {shard}...")
+            upgrade(x_arg=[f'shard={shard}'])
+
+    @app.cli.command('reshard')
+    @click.option('--previous-count', type=int, required=True,
+                  help='Number of shards (the first N of SHARD_URLS) the data is currently spread over.')
+    @click.option('--batch-size', type=int, default=500, help='Users moved per transaction.')
+    def reshard_users(previous_count, batch_size):
+        """
+        Move users to their shard after SHARD_URLS was extended.
+        """
+        from .utils.sharding import get_router, reshard
+
+        router = get_router()
+        if not router.enabled or not 0 < previous_count <= len(router.shard_keys):
+            raise click.UsageError(f"--previous-count must be between 1 and the {len(router.shard_keys)} shards.")
+        try:
+            moved = reshard(router, router.shard_keys[:previous_count], batch_size=batch_size)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Users moved per shard: {moved}")
+
+    @app.cli.command('consume-changes')
+    @click.option('--consumer', 'names', multiple=True, help='Consumer to run (repeatable; default: all).')
+    @click.option('--once', is_flag=True, help='Process the backlog and exit instead of polling.')
+    @click.option('--interval', type=float, default=1.0, help='Seconds between polls once caught up.')
+    def consume_changes(names, once, interval):
+        """
+        Feed new symptom logs from the change feed to the incremental consumers.
+        """
+        from .utils.change_feed import durable_consumers
+
+        consumers = durable_consumers()
+        unknown = set(names) - set(consumers)
+        if unknown:
+            raise click.UsageError(f"Unknown consumers {sorted(unknown)}; choose from {sorted(consumers)}.")
+        selected = [consumers[name] for name in names or consumers]
+
+        feed = current_app.extensions['change_feed']
+        while True:
+            for consumer in selected:
+                delivered = feed.drain(consumer)
+                if delivered:
+                    click.echo(f"{consumer.name}: {delivered} events")
+            if once:
+                return
+            time.sleep(interval)
+
+    @app.cli.command('prune-change-feed')
+    @click.option('--days', type=int, default=7, help='Keep events younger than this many days.')
+    def prune_change_feed(days):
+        """
+        Delete old change feed events every consumer has processed.
+        """
+        deleted = current_app.extensions['change_feed'].prune(retain_days=days)
+        click.echo(f"Deleted {deleted} change feed events.")
+
+    @app.cli.command('build-features')
+    def build_features():
+        """
+        Recompute every user's feature vector (e.g. after retraining with new preprocessing).
+        """
+        from .ml.feature_store import FeatureEncoder, FeatureStore
+        from .ml.predictor import FlareUpPredictor
+        from .utils.sharding import get_router
+
+        pipeline = FlareUpPredictor().pipeline
+        if pipeline is None:
+            raise click.UsageError("No trained model available.")
+        store = FeatureStore(FeatureEncoder(pipeline))
+        stored = sum(get_router().fan_out(store.rebuild))
+        click.echo(f"Stored feature vectors for {stored} users (version {store.encoder.version}).")
+
+    @app.cli.command('score-users')
+    @click.option('--threshold', type=float, default=0.5, help='Probability counted as a likely flare-up.')
+    def score_users(threshold):
+        """
+        Score every user from the feature store in one model pass per shard.
+        """
+        from .ml.feature_store import FeatureEncoder, FeatureStore
+        from .ml.predictor import FlareUpPredictor
+        from .utils.sharding import get_router
+
+        pipeline = FlareUpPredictor().pipeline
+        if pipeline is None:
+            raise click.UsageError("No trained model available.")
+        store = FeatureStore(FeatureEncoder(pipeline))
+        started = time.perf_counter()
+        scored = get_router().fan_out(store.score_all, read_only=True)
+        users = sum(len(user_ids) for user_ids, _ in scored)
+        likely = sum(int((probabilities >= threshold).sum()) for _, probabilities in scored)
+        click.echo(f"Scored {users} users in {time.perf_counter() - started:.3f}s; "
+                   f"{likely} above {threshold}.")
+
+    @app.cli.command('archive-logs')
+    @click.option('--days', type=int, default=None, help='Archive whole months older than this (default: ARCHIVE_AFTER_DAYS).')
+    @click.option('--vacuum', is_flag=True, help='Return the freed pages to the file system afterwards (SQLite).')
+    def archive_logs(days, vacuum):
+        """
+        Move old months of symptom_logs into compressed partition files.
+        """
+        from sqlalchemy import text
+        from sqlalchemy.orm import Session
+        from .utils.log_archive import get_archive
+        from .utils.sharding import get_router
+
+        router = get_router()
+        days = current_app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+        for label, engine in zip(router.shard_keys or ['default'], router.engines()):
+            with Session(bind=engine) as session:
+                archived = get_archive().archive(session, days, label=label)
+            click.echo(f"{label}: archived {sum(archived.values())} logs from {len(archived)} months "
+                       f"{sorted(archived)}.")
+            if vacuum and archived and engine.dialect.name == 'sqlite':
+                with engine.connect() as connection:
+                    connection.execute(text('VACUUM'))
+
+    @app.cli.command('restore-logs')
+    @click.option('--month', required=True, help='Archived month to move back into symptom_logs (YYYY-MM).')
+    def restore_logs(month):
+        """
+        Move an archived month back into symptom_logs.
+        """
+        from .utils.log_archive import get_archive
+        from .utils.sharding import get_router
+
+        archive = get_archive()
+        restored = sum(get_router().fan_out(lambda session: archive.restore(session, month), parallel=False))
+        click.echo(f"Restored {restored} logs of {month}.")
+
+    @app.cli.command('dump-schema')
+    @click.option('--output', type=click.Path(dir_okay=False), default=None,
+                  help='File to write (default: database/schema.sql).')
+    def dump_schema(output):
+        """
+        Write the SQLite schema of the ORM models, for database/initialize_db.py.
+        """
+        import os
+        from . import models  # noqa: F401 (registers the tables)
+        from .utils.db_utils import schema_ddl
+
+        output = output or os.path.join(os.path.dirname(current_app.root_path), '..', 'database', 'schema.sql')
+        with open(output, 'w') as schema_file:
+            schema_file.write("-- SQL schema for ReMission database\n"
+                              "-- Generated from the ORM models (app/models.py) by `flask dump-schema`; do not edit.\n\n")
+            schema_file.write(schema_ddl(db.metadata))
+        click.echo(f"Schema written to {os.path.abspath(output)}.")
+
+    @app.cli.command('migration-jobs')
+    @click.option('--cleanup', 'cleanup_name', default=None, help='Drop the old table of a swapped online migration.')
+    @click.option('--abort', 'abort_name', default=None, help='Drop the shadow table of an online migration not yet swapped.')
+    def migration_jobs(cleanup_name, abort_name):
+        """
+        Show online migrations and backfills with their progress, per shard.
+        """
+        from .utils.online_migration import OnlineMigration, job_status
+        from .utils.sharding import get_router
+
+        router = get_router()
+        for label, engine in zip(router.shard_keys or ['default'], router.engines()):
+            for job in job_status(engine):
+                if job['name'] in (cleanup_name, abort_name) and job['kind'] == OnlineMigration.kind:
+                    migration = OnlineMigration(engine, job['table_name'], job['name'])
+                    try:
+                        if job['name'] == cleanup_name:
+                            migration.cleanup()
+                        else:
+                            migration.abort()
+                    except RuntimeError as e:
+                        raise click.ClickException(str(e))
+                    job = {**job, **(migration.state() or {"phase": 'aborted'})}
+                click.echo(f"{label}: {job['name']} ({job['kind']} of {job['table_name']}) {job['phase']}, "
+                           f"{job['rows_done']} rows, {job['progress']:.1%} of keys, updated {job['updated_at']}")
@@ -0,0 +1,308 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from ..utils.metrics import Histogram
+from .feature_store import NUMERICAL_COLS, FeatureEncoder, first_exercise_type
+
+ATTRIBUTION_FEATURES = NUMERICAL_COLS + ['exercise_type']
+MIN_CONTRIBUTION = 0.01  # Factors moving the flare-up probability less than this are not mentioned
+
+# Wording of the bot's insights for the features that raise a user's predicted risk
+FACTOR_LABELS = {'pain_level': "Pain Level", 'stress_level': "Stress Level", 'sleep_hours': "Sleep",
+                 'exercise_done': "Exercise", 'took_medication': "Medication", 'exercise_type': "Exercise type"}
+FACTOR_ADVICE = {
+    'pain_level': "High pain can be challenging.",
+    'stress_level': "High stress affects your well-being.",
+    'sleep_hours': "Aim for 7-9 hours.",
+    'exercise_done': "Consider light activities to boost your energy.",
+    'took_medication': "Ensure you're following your plan.",
+    'exercise_type': "Consider mixing in gentler activities."
+}
+TREND_INSIGHTS = {
+    'pain_level': "Your recent pain levels are raising your flare-up risk.",
+    'stress_level': "Your recent stress levels are raising your flare-up risk. Consider stress management.",
+    'sleep_hours': "Your recent sleep is raising your flare-up risk. Prioritize rest.",
+    'exercise_done': "Your recent exercise pattern is raising your flare-up risk.",
+    'took_medication': "Your recent medication pattern is raising your flare-up risk. Ensure you're following your plan.",
+    'exercise_type': "Your recent types of exercise are raising your flare-up risk."
+}
+
+class FlatForest:
+    """
+    The trees of a fitted forest concatenated into flat node arrays, so every tree can be walked
+    for every row at once: one vectorized step per tree level instead of a Python loop per node.
+    Leaves point at themselves, which lets finished paths be dropped without special cases.
+    """
+
+    def __init__(self, model, positive_class=1):
+        """
+        Args:
+            model: Fitted forest classifier (`estimators_` of decision trees, e.g. RandomForestClassifier).
+            positive_class: Class whose probability is explained.
+        """
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        class_index = list(model.classes_).index(positive_class)
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+
+        self.roots = offsets.astype(np.intp)
+        self.feature = np.concatenate([np.maximum(tree.feature, 0) for tree in trees]).astype(np.intp)
+        self.threshold = np.concatenate([tree.threshold for tree in trees])
+        nodes = [np.arange(tree.node_count) + offset for tree, offset in zip(trees, offsets)]
+        self.left = np.concatenate([np.where(tree.children_left >= 0, tree.children_left + offset, own)
+                                    for tree, offset, own in zip(trees, offsets, nodes)]).astype(np.intp)
+        self.right = np.concatenate([np.where(tree.children_right >= 0, tree.children_right + offset, own)
+                                     for tree, offset, own in zip(trees, offsets, nodes)]).astype(np.intp)
+        # Positive class share of the training samples reaching each node (what predict_proba averages)
+        self.value = np.concatenate([tree.value[:, 0, class_index] / tree.value[:, 0, :].sum(axis=1)
+                                     for tree in trees])
+        self.is_leaf = self.left == np.arange(len(self.left))
+        self.bias = float(self.value[self.roots].mean())
+        self.n_trees = len(trees)
+        self.n_nodes = len(self.value)
+
+    def contributions(self, X):
+        """
+        Path-based (Saabas) contributions: walking each tree from the root, every split moves the
+        prediction from the parent's value to the child's, and that change is credited to the
+        split feature. Averaged over the trees, `bias + contributions.sum(axis=1)` equals the
+        forest's predicted probability exactly.
+
+        Args:
+            X (np.ndarray): (n, dimension) encoded feature vectors (float32, as the model sees them).
+
+        Returns:
+            np.ndarray: (n, dimension) contributions per encoded feature.
+        """
+        n, dimension = X.shape
+        rows = np.repeat(np.arange(n, dtype=np.intp), self.n_trees)
+        nodes = np.tile(self.roots, n)
+        totals = np.zeros(n * dimension)
+        while len(nodes):
+            features = self.feature[nodes]
+            # float32 inputs against float64 thresholds, as the trees compare them
+            children = np.where(X[rows, features] <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+            totals += np.bincount(rows * dimension + features, weights=self.value[children] - self.value[nodes],
+                                  minlength=n * dimension)
+            active = ~self.is_leaf[children]
+            rows, nodes = rows[active], children[active]
+        return totals.reshape(n, dimension) / self.n_trees
+
+class ContributionExplainer:
+    """
+    Per-prediction feature contributions of the flare-up model. Rows are encoded with the
+    FeatureEncoder, explained in one batch over the flattened forest, and the one-hot
+    exercise_type columns folded back into a single feature. Inputs are discrete (pain and
+    stress 1-10, booleans, a handful of exercise types, sleep in tenths of an hour), so results
+    are kept in an LRU cache keyed by the row and repeat rows cost a dictionary lookup.
+    """
+
+    def __init__(self, pipeline, cache_size=4096):
+        """
+        Args:
+            pipeline (Pipeline): Fitted pipeline with 'preprocessor' and a tree-ensemble 'model' step.
+            cache_size (int): Explained rows kept in memory.
+
+        Raises:
+            ValueError: If the model is not a forest of decision trees or the preprocessor cannot be
+                re-implemented by the FeatureEncoder.
+        """
+        model = pipeline.named_steps['model']
+        if not hasattr(model, 'estimators_') or not hasattr(np.ravel(model.estimators_)[0], 'tree_'):
+            raise ValueError(f"Feature contributions need a tree ensemble, not {type(model).__name__}")
+        self.encoder = FeatureEncoder(pipeline)
+        if not self.encoder.exact:
+            raise ValueError(f"Unsupported preprocessor {type(self.encoder.preprocessor).__name__}")
+        self.forest = FlatForest(model)
+        self.version = self.encoder.version
+
+        # Encoded column -> feature: numerical columns are scaled copies, the rest is the one-hot exercise_type
+        self.groups = np.zeros((self.encoder.dimension, len(ATTRIBUTION_FEATURES)))
+        for column in range(self.encoder.dimension):
+            weights = np.abs(self.encoder.weights[column])
+            self.groups[column, int(weights.argmax()) if weights.max() > 0 else len(NUMERICAL_COLS)] = 1
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.explain_ms = Histogram([0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100])
+
+    @property
+    def bias(self):
+        """
+        Expected flare-up probability before any feature is known (the mean over the training data).
+        """
+        return self.forest.bias
+
+    @staticmethod
+    def _key(row):
+        return (int(row['pain_level']), int(row['stress_level']), round(float(row['sleep_hours']), 2),
+                int(row['exercise_done']), int(row['took_medication']), row['exercise_type'])
+
+    def explain(self, rows):
+        """
+        Flare-up probabilities and per-feature contributions for a batch of rows.
+
+        Args:
+            rows (list of dict): Values for NUMERICAL_COLS and 'exercise_type' (the model's category value).
+
+        Returns:
+            tuple: (probabilities (n,), contributions (n, len(ATTRIBUTION_FEATURES))) as NumPy arrays;
+                   each probability is `bias` plus its row's contributions.
+        """
+        started = time.perf_counter()
+        keys = [self._key(row) for row in rows]
+        contributions = np.empty((len(rows), len(ATTRIBUTION_FEATURES)))
+        missing = {}
+        with self._lock:
+            for index, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.setdefault(key, []).append(index)
+                else:
+                    self._cache.move_to_end(key)
+                    contributions[index] = cached
+            self.hits += len(rows) - sum(len(indices) for indices in missing.values())
+            self.misses += len(missing)
+
+        if missing:
+            unique = list(missing)
+            encoded = self.encoder.encode([rows[missing[key][0]] for key in unique])
+            computed = self.forest.contributions(encoded) @ self.groups
+            with self._lock:
+                for key, values in zip(unique, computed):
+                    contributions[missing[key]] = values
+                    self._cache[key] = values
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        self.explain_ms.observe((time.perf_counter() - started) * 1000)
+        return self.bias + contributions.sum(axis=1), contributions
+
+    def explain_frame(self, logs):
+        """
+        `explain` for a DataFrame of symptom logs (stored exercise_type values are reduced to the model's input).
+        """
+        return self.explain(feature_rows(logs))
+
+    def metrics(self):
+        with self._lock:
+            cached = len(self._cache)
+        return {
+            "version": self.version,
+            "trees": self.forest.n_trees,
+            "nodes": self.forest.n_nodes,
+            "cached_rows": cached,
+            "hits": self.hits,
+            "misses": self.misses,
+            "explain_ms": {**self.explain_ms.snapshot(), "p99": self.explain_ms.quantile(0.99)}
+        }
+
+def feature_rows(logs):
+    """
+    Model input rows for a DataFrame of symptom logs.
+    """
+    return [{
+        "pain_level": pain,
+        "stress_level": stress,
+        "sleep_hours": sleep,
+        "exercise_done": int(exercise_done),
+        "took_medication": int(took_medication),
+        "exercise_type": first_exercise_type(exercise_type)
+    } for pain, stress, sleep, exercise_done, took_medication, exercise_type in zip(
+        logs['pain_level'], logs['stress_level'], logs['sleep_hours'], logs['exercise_done'],
+        logs['took_medication'], logs['exercise_type'])]
+
+def ranked_contributions(row, contributions, limit=None):
+    """
+    A row's features ordered by how much they moved its flare-up probability.
+
+    Args:
+        row (dict): The explained row.
+        contributions (np.ndarray): Its contributions, aligned with ATTRIBUTION_FEATURES.
+        limit (int): Keep only the first `limit` features.
+
+    Returns:
+        list of dict: feature, value and contribution (probability points, positive raises the risk).
+    """
+    order = np.argsort(-np.abs(contributions))[:limit]
+    return [{"feature": ATTRIBUTION_FEATURES[index], "value": row[ATTRIBUTION_FEATURES[index]],
+             "contribution": round(float(contributions[index]), 4)} for index in order]
+
+def _describe(feature, value):
+    if feature == 'sleep_hours':
+        return f"{value} hours"
+    if feature == 'exercise_done':
+        return "done" if value else "skipped"
+    if feature == 'took_medication':
+        return "taken" if value else "missed"
+    return "none" if value is None else value
+
+def factor_insights(row, contributions, min_contribution=MIN_CONTRIBUTION):
+    """
+    One insight per feature that raised this row's flare-up probability, strongest first.
+
+    Args:
+        row (dict): The explained row.
+        contributions (np.ndarray): Its contributions, aligned with ATTRIBUTION_FEATURES.
+        min_contribution (float): Smallest increase worth mentioning.
+
+    Returns:
+        list of str: Insights such as "Sleep: 5.5 hours raises your flare-up risk by 12 points. Aim for 7-9 hours."
+    """
+    insights = []
+    for factor in ranked_contributions(row, contributions):
+        if factor['contribution'] >= min_contribution:
+            points = round(factor['contribution'] * 100)
+            insights.append(f"{FACTOR_LABELS[factor['feature']]}: {_describe(factor['feature'], factor['value'])} "
+                            f"raises your flare-up risk by {points} point{'' if points == 1 else 's'}. "
+                            f"{FACTOR_ADVICE[factor['feature']]}")
+    return insights
+
+def trend_insights(contributions, min_contribution=MIN_CONTRIBUTION):
+    """
+    Insights for the features that raised the flare-up probability across several logs on average.
+
+    Args:
+        contributions (np.ndarray): (n, len(ATTRIBUTION_FEATURES)) contributions of the logs.
+        min_contribution (float): Smallest mean increase worth mentioning.
+
+    Returns:
+        list of str: Insights, strongest first.
+    """
+    means = contributions.mean(axis=0)
+    return [TREND_INSIGHTS[ATTRIBUTION_FEATURES[index]] for index in np.argsort(-means)
+            if means[index] >= min_contribution]
+
+_explainer_lock = threading.Lock()
+
+def get_explainer(app):
+    """
+    The app's shared ContributionExplainer, created on first use with the flare-up model.
+
+    Args:
+        app (Flask): The application (the cache size comes from ATTRIBUTION_CACHE_SIZE).
+
+    Returns:
+        ContributionExplainer: The explainer, or None if no trained tree model is available.
+    """
+    if 'explainer' in app.extensions:
+        return app.extensions['explainer']
+
+    with _explainer_lock:
+        if 'explainer' not in app.extensions:
+            from .predictor import FlareUpPredictor
+
+            # Share the model loaded by the startup warm-up, if get_batcher has not adopted it yet
+            predictor = app.extensions.get('preloaded_predictor') or FlareUpPredictor()
+            if predictor.pipeline is None:
+                return None
+            try:
+                app.extensions['explainer'] = ContributionExplainer(predictor.pipeline,
+                                                                    cache_size=app.config['ATTRIBUTION_CACHE_SIZE'])
+            except ValueError as e:
+                print(f"[DEBUG] Feature contributions unavailable: {e}")
+                app.extensions['explainer'] = None  # Not retried for this model
+    return app.extensions['explainer']
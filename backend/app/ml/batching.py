@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import pandas as pd
+from ..utils.metrics import Histogram
+from .feature_store import FeatureEncoder
+
+FEATURE_COLUMNS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type']
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row flare-up predictions into batches.
+    Requests are queued and a worker thread scores them with one `predict_proba` call
+    once `max_batch_size` rows are waiting or the oldest has waited `max_wait_ms`.
+    """
+
+    def __init__(self, pipeline, max_batch_size=64, max_wait_ms=5.0):
+        """
+        Args:
+            pipeline: Anything with `predict_proba(frame)`: a fitted pipeline, a FlareUpPredictor
+                or a PredictionLookupTable; or a FeatureEncoder, which scores the rows without a DataFrame.
+            max_batch_size (int): Maximum rows scored per batch.
+            max_wait_ms (float): Longest a request waits for others to join its batch.
+        """
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256])
+        self.queue_depths = Histogram([0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512])
+        self.wait_ms = Histogram([0.5, 1, 2, 5, 10, 20, 50, 100])
+
+        self._worker = threading.Thread(target=self._run, name='flare-up-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, features):
+        """
+        Queue one row for scoring.
+
+        Args:
+            features (dict): Values for FEATURE_COLUMNS.
+
+        Returns:
+            Future: Resolves to the flare-up probability (float).
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+
+        future = Future()
+        self.queue_depths.observe(self._queue.qsize())
+        self._queue.put((features, future, time.perf_counter()))
+        return future
+
+    def predict_proba(self, features, timeout=None):
+        """
+        Blocking convenience wrapper around `submit`.
+        """
+        return self.submit(features).result(timeout=timeout)
+
+    def pending(self):
+        """
+        Number of queued rows not yet taken into a batch.
+        """
+        return self._queue.qsize()
+
+    def _collect(self):
+        """
+        Block for the first request, then gather more until the batch is full or the deadline passes.
+        """
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if any(item is None for item in batch):
+                batch = [item for item in batch if item is not None]
+                self._score(batch)
+                return
+            self._score(batch)
+
+    def _score(self, batch):
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.wait_ms.observe((started - enqueued) * 1000)
+        self.batch_sizes.observe(len(batch))
+
+        try:
+            if isinstance(self.pipeline, FeatureEncoder):
+                probabilities = self.pipeline.predict_proba([features for features, _, _ in batch])[:, 1]
+            else:
+                frame = pd.DataFrame([features for features, _, _ in batch], columns=FEATURE_COLUMNS)
+                probabilities = self.pipeline.predict_proba(frame)[:, 1]
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future, _), probability in zip(batch, probabilities):
+            future.set_result(float(probability))
+
+    def close(self):
+        """
+        Stop accepting requests; queued requests are still scored.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join()
+
+    def metrics(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_depth_on_submit": self.queue_depths.snapshot(),
+            "wait_ms": self.wait_ms.snapshot()
+        }
+
+_batcher_lock = threading.Lock()
+
+def get_batcher(app):
+    """
+    The app's shared MicroBatcher, created on first use with the loaded FlareUpPredictor model.
+
+    Args:
+        app (Flask): The application (settings come from INFERENCE_* config values).
+
+    Returns:
+        MicroBatcher: The batcher, or None if no trained model is available.
+    """
+    batcher = app.extensions.get('inference_batcher')
+    if batcher is not None:
+        return batcher
+
+    with _batcher_lock:
+        if 'inference_batcher' not in app.extensions:
+            from .predictor import FlareUpPredictor
+
+            # Reuse the model loaded by the startup warm-up, if it ran
+            predictor = app.extensions.pop('preloaded_predictor', None) or \
+                FlareUpPredictor(use_lookup_table=app.config['PREDICTION_LOOKUP_TABLE'])
+            if predictor.pipeline is None:
+                return None
+            # Encode rows with NumPy unless predictions come from the lookup table
+            scorer = predictor
+            if predictor.lookup_table is None:
+                encoder = FeatureEncoder(predictor.pipeline)
+                scorer = encoder if encoder.exact else predictor
+            app.extensions['inference_batcher'] = MicroBatcher(
+                scorer,
+                max_batch_size=app.config['INFERENCE_MAX_BATCH_SIZE'],
+                max_wait_ms=app.config['INFERENCE_MAX_WAIT_MS']
+            )
+    return app.extensions['inference_batcher']
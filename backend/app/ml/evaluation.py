@@ -0,0 +1,260 @@
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from ..utils.flare_rules import flare_up_mask
+from ..utils.log_archive import ColdPartition
+from .feature_store import FeatureEncoder
+
+LOG_COLUMNS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type']
+CHUNK_QUERY = text(f"SELECT {', '.join(LOG_COLUMNS)} FROM symptom_logs WHERE id >= :start AND id < :end")
+
+def score_chunk(logs, encoders, threshold=0.5):
+    """
+    Score one chunk of symptom logs with every model and count how the predictions compare.
+
+    Args:
+        logs (pd.DataFrame): Symptom log columns.
+        encoders (dict): Model name -> FeatureEncoder; the first model is the reference (champion).
+        threshold (float): Probability counted as a predicted flare-up.
+
+    Returns:
+        dict: Counts and timings to be added up over chunks with `merge_counts`.
+    """
+    if not len(logs):
+        # An ID range emptied by deletes or archived months (predict_proba rejects 0 rows)
+        return {"chunks": 1, "logs": 0, "flare_ups": 0,
+                "models": {name: {"seconds": 0.0, "true_positives": 0, "false_positives": 0, "false_negatives": 0}
+                           for name in encoders},
+                "agreement": {name: {"agreed": 0, "champion_only": 0, "challenger_only": 0, "total_difference": 0.0,
+                                     "max_difference": 0.0} for name in list(encoders)[1:]}}
+
+    labels = flare_up_mask(logs['pain_level'], logs['stress_level'], logs['sleep_hours'], logs['exercise_done'],
+                           logs['took_medication'])
+    counts = {"chunks": 1, "logs": len(logs), "flare_ups": int(labels.sum()), "models": {}, "agreement": {}}
+    probabilities = {}
+    for name, encoder in encoders.items():
+        started = time.perf_counter()
+        probabilities[name] = encoder.model.predict_proba(encoder.encode_frame(logs))[:, 1]
+        predicted = probabilities[name] >= threshold
+        counts["models"][name] = {
+            "seconds": time.perf_counter() - started,
+            "true_positives": int((predicted & labels).sum()),
+            "false_positives": int((predicted & ~labels).sum()),
+            "false_negatives": int((~predicted & labels).sum())
+        }
+
+    reference = next(iter(encoders))
+    champion = probabilities[reference] >= threshold
+    for name in list(encoders)[1:]:
+        challenger = probabilities[name] >= threshold
+        difference = np.abs(probabilities[name] - probabilities[reference])
+        counts["agreement"][name] = {
+            "agreed": int((champion == challenger).sum()),
+            "champion_only": int((champion & ~challenger).sum()),
+            "challenger_only": int((~champion & challenger).sum()),
+            "total_difference": float(difference.sum()),
+            "max_difference": float(difference.max()) if len(difference) else 0.0
+        }
+    return counts
+
+def merge_counts(total, counts):
+    """
+    Add one chunk's counts into `total` (maxima for 'max_' keys); returns `total`.
+    """
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            merge_counts(total.setdefault(key, {}), value)
+        elif key.startswith('max_'):
+            total[key] = max(total.get(key, value), value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+# Per-process state of the evaluation workers: the models' encoders and an engine per database URL
+_worker = {}
+
+def _init_worker(payload, threshold):
+    _worker['encoders'] = {name: FeatureEncoder(pipeline) for name, pipeline in pickle.loads(payload).items()}
+    _worker['threshold'] = threshold
+    _worker['engines'] = {}
+
+def _evaluate_range(url, start, end):
+    engine = _worker['engines'].get(url)
+    if engine is None:
+        engine = _worker['engines'][url] = create_engine(url)
+    with engine.connect() as connection:
+        logs = pd.read_sql(CHUNK_QUERY, connection, params={"start": start, "end": end})
+    return score_chunk(logs, _worker['encoders'], _worker['threshold'])
+
+def _evaluate_partition(path):
+    cold = ColdPartition(path)
+    positions = cold.positions()
+    logs = pd.DataFrame({name: cold.column(name, positions) for name in LOG_COLUMNS}, columns=LOG_COLUMNS)
+    counts = score_chunk(logs, _worker['encoders'], _worker['threshold'])
+    counts['archived_logs'] = len(logs)
+    return counts
+
+class OfflineEvaluator:
+    """
+    Replays every symptom log (symptom_logs and the months archived out of it) through two or more
+    models and reports how often they agree, their accuracy against the rule-based labels
+    (`flare_up_mask`) and their scoring cost. The table is split into primary key ranges of
+    `chunk_size` IDs (some may be empty after deletes or archiving) and each archived month is one
+    more chunk. Each chunk is read with one range query (or from its partition file), encoded
+    column-wise (FeatureEncoder.encode_frame) and scored with one `predict_proba` call per model.
+    Chunks run in parallel worker processes, each holding its own copy of the models, so a full
+    history replay scales with the cores available. In-memory databases (which other processes
+    cannot open) are replayed in this process.
+    """
+
+    def __init__(self, pipelines, chunk_size=100_000, workers=0, threshold=0.5):
+        """
+        Args:
+            pipelines (dict): Model name -> fitted pipeline; the first is the reference (champion)
+                the others are compared to.
+            chunk_size (int): Logs per chunk (primary key range).
+            workers (int): Worker processes (0: one per CPU; 1: replay in this process).
+            threshold (float): Probability counted as a predicted flare-up.
+        """
+        if len(pipelines) < 2:
+            raise ValueError("Offline evaluation needs at least two models.")
+        self.pipelines = dict(pipelines)
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+
+    def ranges(self, engine):
+        """
+        Primary key ranges of `chunk_size` IDs covering symptom_logs.
+
+        Returns:
+            list of tuple: (start, end) pairs, end exclusive.
+        """
+        with engine.connect() as connection:
+            first, last = connection.execute(text("SELECT MIN(id), MAX(id) FROM symptom_logs")).one()
+        if first is None:
+            return []
+        return [(start, min(start + self.chunk_size, last + 1)) for start in range(first, last + 1, self.chunk_size)]
+
+    @staticmethod
+    def _shared(engine):
+        # Whether other processes can open the database
+        return not (engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:'))
+
+    @staticmethod
+    def partition_files(engine, archive):
+        """
+        Files of the months archived out of a database's symptom_logs, oldest first.
+        """
+        with Session(bind=engine) as session:
+            return [os.path.join(archive.directory, partition.path) for partition in archive.partitions(session)]
+
+    def run(self, engines, archive=None):
+        """
+        Replay the symptom logs of every database through all the models.
+
+        Args:
+            engines (list of Engine): The databases to replay (e.g. every shard).
+            archive (LogArchive, optional): Where their archived months are stored (None: replay
+                symptom_logs only).
+
+        Returns:
+            dict: The evaluation report (see `report`).
+        """
+        started = time.perf_counter()
+        total = {}
+        local = [engine for engine in engines if self.workers == 1 or not self._shared(engine)]
+        tasks = [(_evaluate_range, engine.url.render_as_string(hide_password=False), start, end)
+                 for engine in engines if engine not in local for start, end in self.ranges(engine)]
+        if archive is not None:
+            tasks += [(_evaluate_partition, path) for engine in engines if engine not in local
+                      for path in self.partition_files(engine, archive)]
+
+        if local:
+            encoders = {name: FeatureEncoder(pipeline) for name, pipeline in self.pipelines.items()}
+            for engine in local:
+                with engine.connect() as connection:
+                    for start, end in self.ranges(engine):
+                        logs = pd.read_sql(CHUNK_QUERY, connection, params={"start": start, "end": end})
+                        merge_counts(total, score_chunk(logs, encoders, self.threshold))
+                if archive is None:
+                    continue
+                with Session(bind=engine) as session:
+                    for logs in archive.frames(session, columns=LOG_COLUMNS):
+                        counts = score_chunk(logs, encoders, self.threshold)
+                        counts['archived_logs'] = len(logs)
+                        merge_counts(total, counts)
+
+        if tasks:
+            # 'spawn': the caller may be a web process with threads running, which must not be forked
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)), mp_context=get_context('spawn'),
+                                     initializer=_init_worker,
+                                     initargs=(pickle.dumps(self.pipelines), self.threshold)) as executor:
+                for future in as_completed([executor.submit(*task) for task in tasks]):
+                    merge_counts(total, future.result())
+
+        return self.report(total, time.perf_counter() - started)
+
+    def single_row_latency(self, logs, samples=200):
+        """
+        Median milliseconds to encode and score one log, per model (the cost on the request path).
+        """
+        latencies = {}
+        for name, pipeline in self.pipelines.items():
+            encoder = FeatureEncoder(pipeline)
+            timings = []
+            for position in range(min(samples, len(logs))):
+                row = logs.iloc[[position]]
+                started = time.perf_counter()
+                encoder.model.predict_proba(encoder.encode_frame(row))
+                timings.append(time.perf_counter() - started)
+            latencies[name] = round(float(np.median(timings)) * 1000, 3) if timings else None
+        return latencies
+
+    def report(self, total, seconds):
+        """
+        Rates and per-model results from the summed chunk counts.
+        """
+        logs = total.get('logs', 0)
+        flare_ups = total.get('flare_ups', 0)
+        report = {
+            "logs": logs,
+            "archived_logs": total.get('archived_logs', 0),  # Of `logs`, read from archived months
+            "seconds": round(seconds, 3),
+            "logs_per_second": round(logs / seconds) if seconds else None,
+            "workers": self.workers,
+            "chunks": total.get('chunks', 0),
+            "rule_flare_up_rate": round(flare_ups / logs, 4) if logs else None,
+            "models": {},
+            "agreement": {}
+        }
+        for position, name in enumerate(self.pipelines):
+            counts = total.get('models', {}).get(name, {})
+            true_positives = counts.get('true_positives', 0)
+            false_positives = counts.get('false_positives', 0)
+            false_negatives = counts.get('false_negatives', 0)
+            predicted = true_positives + false_positives
+            report["models"][name] = {
+                "role": 'champion' if position == 0 else 'challenger',
+                "accuracy": round((logs - false_positives - false_negatives) / logs, 4) if logs else None,
+                "precision": round(true_positives / predicted, 4) if predicted else None,
+                "recall": round(true_positives / flare_ups, 4) if flare_ups else None,
+                "predicted_flare_up_rate": round(predicted / logs, 4) if logs else None,
+                "scoring_seconds": round(counts.get('seconds', 0.0), 3),  # Summed over workers
+                "microseconds_per_log": round(counts.get('seconds', 0.0) / logs * 1e6, 3) if logs else None
+            }
+        for name, counts in total.get('agreement', {}).items():
+            report["agreement"][name] = {
+                "rate": round(counts['agreed'] / logs, 4) if logs else None,
+                "champion_only": counts['champion_only'],
+                "challenger_only": counts['challenger_only'],
+                "mean_difference": round(counts['total_difference'] / logs, 4) if logs else None,
+                "max_difference": round(counts['max_difference'], 4)
+            }
+        return report
@@ -0,0 +1,257 @@
+import hashlib
+import pickle
+from datetime import datetime
+import numpy as np
+from sqlalchemy import func, select
+from ..utils.change_feed import Consumer
+
+NUMERICAL_COLS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication']
+UNKNOWN_CATEGORY = '__unknown__'
+
+def artifact_version(preprocessor):
+    """
+    Short hash of a fitted preprocessor; feature vectors are only valid for the version they were encoded with.
+    """
+    return hashlib.sha1(pickle.dumps(preprocessor)).hexdigest()[:16]
+
+def first_exercise_type(exercise_type):
+    """
+    The model's exercise_type input for a stored (comma separated) value; None when missing (None, '' or NaN).
+    """
+    return exercise_type.split(',')[0] if isinstance(exercise_type, str) and exercise_type else None
+
+class FeatureEncoder:
+    """
+    NumPy re-implementation of a fitted preprocessor (the pipeline's ColumnTransformer or a
+    StreamingPreprocessor): scaled numerical columns are an affine map and the one-hot
+    exercise_type a table lookup, so encoding a row needs no DataFrame. A missing exercise_type
+    is imputed as in training. Both are read off the
+    preprocessor by transforming a few probe rows and checked against it on random rows; when
+    the check fails (an unsupported preprocessor) encoding falls back to the preprocessor itself.
+    """
+
+    def __init__(self, pipeline, check_rows=200, seed=0):
+        """
+        Args:
+            pipeline (Pipeline): Fitted pipeline with 'preprocessor' and 'model' steps.
+            check_rows (int): Random rows compared against the preprocessor.
+            seed (int): Seed for the check rows.
+        """
+        from .lookup_table import model_categories
+
+        self.preprocessor = pipeline.named_steps['preprocessor']
+        self.model = pipeline.named_steps['model']
+        self.version = artifact_version(self.preprocessor)
+        self.categories = model_categories(pipeline)
+        self._slots = {category: index for index, category in enumerate(self.categories)}
+
+        # Probe rows: all zeros, one unit vector per numerical column, then each category slot
+        slots = self.categories + [None, UNKNOWN_CATEGORY]
+        numerical = np.vstack([np.zeros(len(NUMERICAL_COLS)), np.eye(len(NUMERICAL_COLS)),
+                               np.zeros((len(slots), len(NUMERICAL_COLS)))])
+        outputs = self._transform(numerical, [None] * (1 + len(NUMERICAL_COLS)) + slots)
+        # Kept in float64 and only the result rounded, as the preprocessor does: tree splits are
+        # float32 thresholds, and float32 arithmetic here would move values across them
+        self.offset = outputs[0]
+        self.weights = (outputs[1:1 + len(NUMERICAL_COLS)] - self.offset).T
+        self.category_vectors = outputs[1 + len(NUMERICAL_COLS):] - self.offset
+        self.dimension = len(self.offset)
+
+        rng = np.random.default_rng(seed)
+        sample = np.column_stack([rng.integers(1, 11, check_rows), rng.integers(1, 11, check_rows),
+                                  rng.uniform(0, 12, check_rows).round(1), rng.integers(0, 2, check_rows),
+                                  rng.integers(0, 2, check_rows)]).astype(float)
+        sample_categories = list(rng.choice(np.array(slots, dtype=object), check_rows))
+        self.exact = bool(np.allclose(self._encode(sample, sample_categories),
+                                      self._transform(sample, sample_categories), atol=1e-4))
+        if not self.exact:
+            print(f"[DEBUG] Feature encoder does not match {type(self.preprocessor).__name__}; using it directly.")
+
+    def _transform(self, numerical, categories):
+        import pandas as pd  # Only for probing and the fallback path
+        frame = pd.DataFrame(numerical, columns=NUMERICAL_COLS)
+        # Missing categories as NaN, so they are imputed as in training (None in an object column is not)
+        frame['exercise_type'] = pd.Series([np.nan if category is None else category for category in categories],
+                                           dtype=object)
+        transformed = self.preprocessor.transform(frame)
+        return np.asarray(transformed.toarray() if hasattr(transformed, 'toarray') else transformed, dtype=np.float64)
+
+    def _encode(self, numerical, categories):
+        slot_of = self._slots.get
+        unknown_slot = len(self.categories) + 1
+        slots = np.fromiter((len(self.categories) if category is None else slot_of(category, unknown_slot)
+                             for category in categories), dtype=np.intp, count=len(categories))
+        return (np.asarray(numerical, dtype=np.float64) @ self.weights.T + self.offset
+                + self.category_vectors[slots]).astype(np.float32)
+
+    def encode(self, rows):
+        """
+        Model-ready float32 feature vectors.
+
+        Args:
+            rows (list of dict): Values for NUMERICAL_COLS and 'exercise_type' (the model's category value).
+
+        Returns:
+            np.ndarray: (len(rows), dimension) float32 matrix.
+        """
+        numerical = np.array([[row[column] for column in NUMERICAL_COLS] for row in rows], dtype=np.float64)
+        categories = [row['exercise_type'] for row in rows]
+        if not self.exact:
+            return self._transform(numerical, categories).astype(np.float32)
+        return self._encode(numerical, categories)
+
+    def encode_frame(self, logs):
+        """
+        Model-ready float32 feature vectors for a DataFrame of stored symptom logs (comma separated
+        exercise_type values), column-wise without building a dict per row.
+
+        Args:
+            logs (pd.DataFrame): Symptom log columns NUMERICAL_COLS and 'exercise_type'.
+
+        Returns:
+            np.ndarray: (len(logs), dimension) float32 matrix.
+        """
+        numerical = logs[NUMERICAL_COLS].to_numpy(dtype=np.float64)
+        categories = [first_exercise_type(exercise_type) for exercise_type in logs['exercise_type']]
+        if not self.exact:
+            return self._transform(numerical, categories).astype(np.float32)
+        return self._encode(numerical, categories)
+
+    def predict_proba(self, rows):
+        """
+        Flare-up class probabilities for feature rows (the MicroBatcher's scorer interface).
+        """
+        return self.model.predict_proba(self.encode(rows))
+
+class FeatureStore:
+    """
+    One precomputed, model-ready feature vector per user (from the user's latest log) in the
+    user_features table of each shard, stored as float32 bytes and tagged with the preprocessor
+    version. Scoring every user is then a single model pass over one contiguous matrix.
+    """
+
+    def __init__(self, encoder):
+        """
+        Args:
+            encoder (FeatureEncoder): Encoder of the current model.
+        """
+        self.encoder = encoder
+
+    def update(self, session, logs):
+        """
+        Store the vectors of the users in `logs` (the newest log per user wins). Not committed.
+
+        Args:
+            session (Session): Session on the users' shard.
+            logs (list of dict): Symptom log columns, including 'id'.
+
+        Returns:
+            int: Number of users updated.
+        """
+        from ..models import UserFeatures
+        from ..utils.db_utils import Repository
+
+        latest = {}
+        for log in logs:
+            if log['id'] > latest.get(log['user_id'], {'id': -1})['id']:
+                latest[log['user_id']] = log
+        if not latest:
+            return 0
+
+        vectors = self.encoder.encode([{**{column: log[column] for column in NUMERICAL_COLS},
+                                        'exercise_type': first_exercise_type(log['exercise_type'])}
+                                       for log in latest.values()])
+        updated_at = datetime.utcnow()
+        Repository(UserFeatures, session).upsert_many([{
+            "user_id": user_id,
+            "version": self.encoder.version,
+            "log_id": log['id'],
+            "vector": vector.tobytes(),
+            "updated_at": updated_at
+        } for (user_id, log), vector in zip(latest.items(), vectors)])
+        return len(latest)
+
+    def rebuild(self, session, batch_size=10_000, archive=None):
+        """
+        Recompute every user's vector from their latest log (after retraining with new preprocessing).
+        Users whose logs are all in archived months get the vector of their newest archived log.
+
+        Args:
+            session (Session): Session on one shard.
+            batch_size (int): Users encoded and stored per batch.
+            archive (LogArchive, optional): Defaults to the app's.
+
+        Returns:
+            int: Number of users stored.
+        """
+        from ..models import SymptomLog
+        from ..utils.log_archive import get_archive
+
+        newest = select(func.max(SymptomLog.id)).group_by(SymptomLog.user_id).scalar_subquery()
+        result = session.execute(
+            select(SymptomLog.id, SymptomLog.user_id, SymptomLog.exercise_type,
+                   *[getattr(SymptomLog, column) for column in NUMERICAL_COLS])
+            .where(SymptomLog.id.in_(newest))
+        ).mappings()
+
+        stored = 0
+        hot_users = set()
+        while True:
+            logs = result.fetchmany(batch_size)
+            if not logs:
+                break
+            hot_users.update(log['user_id'] for log in logs)
+            stored += self.update(session, logs)
+
+        archive = archive or get_archive()
+        if archive is not None:
+            archived = archive.latest_logs(session, ['id', 'user_id', 'exercise_type', *NUMERICAL_COLS], skip=hot_users)
+            for first in range(0, len(archived), batch_size):
+                stored += self.update(session, archived[first:first + batch_size])
+        session.commit()
+        return stored
+
+    def matrix(self, session):
+        """
+        Every current-version vector as one contiguous matrix.
+
+        Returns:
+            tuple: (list of user_ids, (n, dimension) float32 matrix)
+        """
+        from ..models import UserFeatures
+
+        rows = session.execute(select(UserFeatures.user_id, UserFeatures.vector)
+                               .where(UserFeatures.version == self.encoder.version)).all()
+        matrix = np.frombuffer(b''.join(vector for _, vector in rows), dtype=np.float32)
+        return [user_id for user_id, _ in rows], matrix.reshape(len(rows), self.encoder.dimension)
+
+    def score_all(self, session):
+        """
+        Flare-up probability of every user with a current vector, in one model pass.
+
+        Returns:
+            tuple: (list of user_ids, np.ndarray of probabilities)
+        """
+        user_ids, matrix = self.matrix(session)
+        if not user_ids:
+            return user_ids, np.empty(0, dtype=np.float32)
+        return user_ids, self.encoder.model.predict_proba(matrix)[:, 1]
+
+class FeatureStoreConsumer(Consumer):
+    """
+    Keeps the feature store current from the change feed.
+    """
+
+    name = 'feature-store'
+
+    def __init__(self):
+        self.store = None
+
+    def handle(self, session, events):
+        if self.store is None:
+            from .predictor import FlareUpPredictor
+            pipeline = FlareUpPredictor().pipeline
+            if pipeline is None:
+                raise RuntimeError("No trained model available.")
+            self.store = FeatureStore(FeatureEncoder(pipeline))
+        self.store.update(session, [{"id": change['entity_id'], **change['payload']} for change in events])
@@ -0,0 +1,134 @@
+import time
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type']
+UNKNOWN_CATEGORY = '__unknown__'
+
+def model_categories(pipeline):
+    """
+    Exercise types the pipeline's one-hot encoder knows about.
+
+    Args:
+        pipeline (Pipeline): Fitted pipeline with a ColumnTransformer or StreamingPreprocessor step.
+
+    Returns:
+        list: Known category values.
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    if hasattr(preprocessor, 'named_transformers_'):
+        return list(preprocessor.named_transformers_['cat'].named_steps['onehot'].categories_[0])
+    return list(preprocessor.categories_)
+
+class PredictionLookupTable:
+    """
+    Dense table of flare-up probabilities over the discrete feature grid.
+
+    Pain and stress take 1-10, the booleans 0/1, exercise_type one of the model's categories
+    (plus missing and unknown), and sleep_hours is gridded at 0.1 resolution over `sleep_range`.
+    The whole grid is scored once; inference is then an index computation and an array read.
+    Rows outside the grid fall back to the real pipeline.
+    """
+
+    def __init__(self, pipeline, sleep_range=(0.0, 12.0), sleep_step=0.1, chunk_size=100000):
+        """
+        Build the table by scoring every grid cell with `pipeline`.
+
+        Args:
+            pipeline (Pipeline): The fitted model pipeline to tabulate.
+            sleep_range (tuple): Lowest and highest sleep_hours covered by the table.
+            sleep_step (float): Sleep resolution of the grid.
+            chunk_size (int): Grid rows scored per `predict_proba` call while building.
+        """
+        start = time.perf_counter()
+        self.pipeline = pipeline
+        self.sleep_min, self.sleep_max = sleep_range
+        self.sleep_step = sleep_step
+        self.sleep_steps = int(round((self.sleep_max - self.sleep_min) / sleep_step)) + 1
+
+        # Category slots: the model's categories, then missing (None), then anything unknown
+        self.categories = model_categories(pipeline)
+        self.missing_slot = len(self.categories)
+        self.unknown_slot = len(self.categories) + 1
+        category_values = self.categories + [None, UNKNOWN_CATEGORY]
+
+        self.shape = (10, 10, self.sleep_steps, 2, 2, len(category_values))
+        self.table = np.empty(int(np.prod(self.shape)), dtype=np.float32)
+
+        for offset in range(0, self.table.size, chunk_size):
+            cells = np.unravel_index(np.arange(offset, min(offset + chunk_size, self.table.size)), self.shape)
+            grid = pd.DataFrame({
+                'pain_level': cells[0] + 1,
+                'stress_level': cells[1] + 1,
+                'sleep_hours': np.round(self.sleep_min + cells[2] * sleep_step, 1),
+                'exercise_done': cells[3],
+                'took_medication': cells[4],
+                'exercise_type': np.array(category_values, dtype=object)[cells[5]]
+            }, columns=FEATURE_COLUMNS)
+            self.table[offset:offset + len(grid)] = pipeline.predict_proba(grid)[:, 1]
+
+        self.build_seconds = time.perf_counter() - start
+        print(f"[DEBUG] Prediction lookup table built: {self.table.size} cells in {self.build_seconds:.1f}s.")
+
+    def _indices(self, frame):
+        """
+        Flat table index per row, and a mask of rows that fall inside the grid.
+        """
+        pain = frame['pain_level'].to_numpy(dtype=float)
+        stress = frame['stress_level'].to_numpy(dtype=float)
+        sleep_position = (frame['sleep_hours'].to_numpy(dtype=float) - self.sleep_min) / self.sleep_step
+        sleep_index = np.round(sleep_position)
+        exercise = frame['exercise_done'].to_numpy(dtype=float)
+        medication = frame['took_medication'].to_numpy(dtype=float)
+
+        types = frame['exercise_type']
+        category = pd.Categorical(types, categories=self.categories).codes.astype(np.int64)
+        category[category < 0] = self.unknown_slot
+        category[types.isna().to_numpy()] = self.missing_slot
+
+        in_grid = (
+                np.isin(pain, np.arange(1, 11)) & np.isin(stress, np.arange(1, 11)) &
+                (sleep_index >= 0) & (sleep_index < self.sleep_steps) &
+                (np.abs(sleep_position - sleep_index) < 1e-6) &
+                np.isin(exercise, (0, 1)) & np.isin(medication, (0, 1))
+        )
+
+        indices = np.zeros(len(frame), dtype=np.int64)
+        if in_grid.any():
+            indices[in_grid] = np.ravel_multi_index((
+                pain[in_grid].astype(np.int64) - 1,
+                stress[in_grid].astype(np.int64) - 1,
+                sleep_index[in_grid].astype(np.int64),
+                exercise[in_grid].astype(np.int64),
+                medication[in_grid].astype(np.int64),
+                category[in_grid]
+            ), self.shape)
+        return indices, in_grid
+
+    def predict_proba(self, frame):
+        """
+        Same contract as `Pipeline.predict_proba`: an (n, 2) array of class probabilities.
+
+        Args:
+            frame (pd.DataFrame): Rows with FEATURE_COLUMNS.
+
+        Returns:
+            np.ndarray: Probabilities of no flare-up / flare-up per row.
+        """
+        indices, in_grid = self._indices(frame)
+        flare = np.empty(len(frame), dtype=np.float64)
+        flare[in_grid] = self.table[indices[in_grid]]
+
+        if not in_grid.all():
+            flare[~in_grid] = self.pipeline.predict_proba(frame[~in_grid])[:, 1]
+
+        return np.column_stack([1.0 - flare, flare])
+
+    def predict(self, frame):
+        return (self.predict_proba(frame)[:, 1] >= 0.5).astype(int)
+
+    def max_difference(self, frame):
+        """
+        Largest absolute probability difference between the table and the pipeline on `frame` (parity check).
+        """
+        return float(np.abs(self.predict_proba(frame)[:, 1] - self.pipeline.predict_proba(frame)[:, 1]).max())
@@ -0,0 +1,304 @@
+import json
+import os
+import pickle
+import random
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+from ..utils.flare_rules import is_flare_up
+from ..utils.metrics import Histogram
+from .predictor import MODEL_FILE_PATH
+
+MANIFEST_FILE = 'registry.json'
+LIVE_MODEL = 'live'  # Name of a champion that was never registered (e.g. the shipped model file)
+
+class ModelRegistry:
+    """
+    Named flare-up models next to the live one: each is a pickled pipeline `<directory>/<name>.pkl`,
+    listed in registry.json with when it was added and how it was trained. The champion is always
+    the model in MODEL_FILE_PATH, which every process serves. At most one challenger is shadow-scored
+    on live predictions (ShadowScorer) and compared offline (`flask evaluate-models`) until it is
+    promoted, which copies it over the live model file. Workers pick up a new champion or challenger
+    when they restart.
+    """
+
+    def __init__(self, directory, champion_path=MODEL_FILE_PATH):
+        """
+        Args:
+            directory (str): Directory of the registered model files and the manifest.
+            champion_path (str): The live model file.
+        """
+        self.directory = directory
+        self.champion_path = champion_path
+
+    # ---------------------- Manifest ----------------------
+
+    def _read(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE)) as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return {"champion": None, "challenger": None, "models": {}}
+
+    def _write(self, manifest):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(f"{path}.tmp", 'w') as manifest_file:
+            # NumPy scalars (e.g. in training reports) as plain numbers
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True,
+                      default=lambda value: value.item() if hasattr(value, 'item') else str(value))
+        os.replace(f"{path}.tmp", path)
+
+    @property
+    def champion(self):
+        """
+        Name of the live model (LIVE_MODEL when it was not promoted from the registry).
+        """
+        return self._read()['champion'] or LIVE_MODEL
+
+    @property
+    def challenger(self):
+        """
+        Name of the model shadow-scored against the champion, or None.
+        """
+        return self._read()['challenger']
+
+    def models(self):
+        """
+        Registered models, oldest first.
+
+        Returns:
+            list of dict: name, role ('champion', 'challenger' or None), created_at and training details.
+        """
+        manifest = self._read()
+        roles = {manifest['champion']: 'champion', manifest['challenger']: 'challenger'}
+        return sorted(({"name": name, "role": roles.get(name), **details}
+                       for name, details in manifest['models'].items()), key=lambda model: model['created_at'])
+
+    # ---------------------- Models ----------------------
+
+    def path(self, name):
+        """
+        File of a registered model (which may not exist yet, e.g. before training it).
+        """
+        if not re.fullmatch(r'[\w.-]+', name) or name == LIVE_MODEL:
+            raise ValueError(f"Invalid model name '{name}' (letters, digits, '.', '_' and '-'; not '{LIVE_MODEL}').")
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    def register(self, name, pipeline=None, **details):
+        """
+        Add a model to the registry.
+
+        Args:
+            name (str): Model name.
+            pipeline (Pipeline): Fitted pipeline to save, or None when it was already written to `path(name)`.
+            **details: JSON-serializable training details kept in the manifest (e.g. a training report).
+        """
+        path = self.path(name)
+        if pipeline is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{path}.tmp", 'wb') as model_file:
+                pickle.dump(pipeline, model_file)
+            os.replace(f"{path}.tmp", path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No model file at {path}.")
+
+        manifest = self._read()
+        manifest['models'][name] = {"created_at": datetime.utcnow().isoformat(timespec='seconds'), **details}
+        self._write(manifest)
+
+    def load(self, name=None):
+        """
+        Unpickle a registered model, or the champion when `name` is None or LIVE_MODEL.
+        """
+        path = self.champion_path if name in (None, LIVE_MODEL) else self.path(name)
+        with open(path, 'rb') as model_file:
+            return pickle.load(model_file)
+
+    def set_challenger(self, name):
+        """
+        Shadow-score a registered model against the champion (None: no challenger).
+        """
+        manifest = self._read()
+        if name is not None and name not in manifest['models']:
+            raise KeyError(f"No registered model '{name}'.")
+        manifest['challenger'] = name
+        self._write(manifest)
+
+    def promote(self, name):
+        """
+        Make a registered model the champion by copying it over the live model file. A live model
+        that was never registered is registered first (as 'champion-<timestamp>'), so it can be
+        promoted back.
+
+        Returns:
+            str: Name of the previous champion.
+        """
+        manifest = self._read()
+        if name not in manifest['models']:
+            raise KeyError(f"No registered model '{name}'.")
+
+        previous = manifest['champion']
+        if previous is None and os.path.exists(self.champion_path):
+            previous = f"champion-{datetime.utcnow():%Y%m%d%H%M%S}"
+            shutil.copyfile(self.champion_path, self.path(previous))
+            manifest['models'][previous] = {"created_at": datetime.utcnow().isoformat(timespec='seconds'),
+                                            "source": self.champion_path}
+
+        shutil.copyfile(self.path(name), f"{self.champion_path}.tmp")
+        os.replace(f"{self.champion_path}.tmp", self.champion_path)
+        manifest['champion'] = name
+        if manifest['challenger'] == name:
+            manifest['challenger'] = None
+        self._write(manifest)
+        return previous or LIVE_MODEL
+
+class ShadowScorer:
+    """
+    Scores live predictions again with the challenger model, off the request path: `submit` only
+    queues the request's features (or drops them when the queue is full) and a MicroBatcher thread
+    scores them in batches. Each result is compared with the champion's probability for the same
+    input and with the rule-based label (`is_flare_up`), so /api/metrics shows how often the two
+    models agree and which is closer to the rules on real traffic.
+    """
+
+    def __init__(self, name, pipeline, sample=1.0, max_queue=1000, threshold=0.5, max_batch_size=64, max_wait_ms=20.0):
+        """
+        Args:
+            name (str): Challenger name (reported in the metrics).
+            pipeline (Pipeline): The challenger's fitted pipeline.
+            sample (float): Share of live predictions re-scored.
+            max_queue (int): Queued rows beyond which new ones are dropped instead of slowing the process.
+            threshold (float): Probability counted as a predicted flare-up (as in /predict-flare-up).
+            max_batch_size (int): Rows per challenger batch.
+            max_wait_ms (float): Longest a row waits for others to join its batch.
+        """
+        from .batching import MicroBatcher
+        from .feature_store import FeatureEncoder
+
+        self.name = name
+        self.sample = sample
+        self.max_queue = max_queue
+        self.threshold = threshold
+        encoder = FeatureEncoder(pipeline)
+        self.batcher = MicroBatcher(encoder if encoder.exact else pipeline, max_batch_size=max_batch_size,
+                                    max_wait_ms=max_wait_ms)
+
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.scored = 0
+        self.agreed = 0
+        self.flips = {"champion_only": 0, "challenger_only": 0}  # Flare-up predicted by one model only
+        self.correct = {"champion": 0, "challenger": 0}  # Predictions matching the rule-based label
+        self.difference = Histogram([0.01, 0.02, 0.05, 0.1, 0.2, 0.5])  # |challenger - champion|
+        self.latency_ms = Histogram([1, 2, 5, 10, 20, 50, 100, 200])  # Submission to challenger result
+
+    def submit(self, features, probability):
+        """
+        Queue a live prediction for the challenger; returns at once.
+
+        Args:
+            features (dict): The model input the champion scored (values for FEATURE_COLUMNS).
+            probability (float): The champion's flare-up probability.
+        """
+        if self.sample < 1.0 and random.random() >= self.sample:
+            return
+        if self.batcher.pending() >= self.max_queue:
+            with self._lock:
+                self.dropped += 1
+            return
+
+        label = bool(is_flare_up(features['pain_level'], features['stress_level'], features['sleep_hours'],
+                                 features['exercise_done'], features['took_medication']))
+        submitted = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+        future = self.batcher.submit(features)
+        future.add_done_callback(lambda result: self._record(result, probability, label, submitted))
+
+    def _record(self, result, champion_probability, label, submitted):
+        # Runs on the batcher thread once the challenger's batch is scored
+        if result.exception() is not None:
+            with self._lock:
+                self.errors += 1
+            return
+
+        challenger_probability = result.result()
+        champion = champion_probability >= self.threshold
+        challenger = challenger_probability >= self.threshold
+        with self._lock:
+            self.scored += 1
+            self.agreed += champion == challenger
+            if champion != challenger:
+                self.flips["champion_only" if champion else "challenger_only"] += 1
+            self.correct["champion"] += champion == label
+            self.correct["challenger"] += challenger == label
+        self.difference.observe(abs(challenger_probability - champion_probability))
+        self.latency_ms.observe((time.perf_counter() - submitted) * 1000)
+
+    def close(self):
+        """
+        Stop the batcher thread after scoring what is queued.
+        """
+        self.batcher.close()
+
+    def metrics(self):
+        with self._lock:
+            scored = self.scored
+            return {
+                "challenger": self.name,
+                "sample": self.sample,
+                "submitted": self.submitted,
+                "scored": scored,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "queue_depth": self.batcher.pending(),
+                "agreement": round(self.agreed / scored, 4) if scored else None,
+                "flips": dict(self.flips),
+                "rule_accuracy": {model: round(correct / scored, 4) if scored else None
+                                  for model, correct in self.correct.items()},
+                "difference": self.difference.snapshot(),
+                "latency_ms": self.latency_ms.snapshot()
+            }
+
+def get_registry(app):
+    """
+    The model registry in the app's MODEL_REGISTRY_DIR.
+    """
+    return ModelRegistry(app.config['MODEL_REGISTRY_DIR'])
+
+_shadow_lock = threading.Lock()
+
+def get_shadow(app):
+    """
+    The app's ShadowScorer for the registry's challenger, created on first use.
+
+    Args:
+        app (Flask): The application (settings come from MODEL_SHADOW_* config values).
+
+    Returns:
+        ShadowScorer: The scorer, or None when shadow scoring is off or there is no challenger.
+    """
+    if 'shadow_scorer' in app.extensions:
+        return app.extensions['shadow_scorer']
+
+    with _shadow_lock:
+        if 'shadow_scorer' not in app.extensions:
+            scorer = None
+            # Reuse the challenger loaded by the startup warm-up, if it ran
+            name, pipeline = app.extensions.pop('preloaded_challenger', (None, None))
+            try:
+                if pipeline is None and app.config['MODEL_SHADOW_SAMPLE'] > 0:
+                    name = get_registry(app).challenger
+                    pipeline = get_registry(app).load(name) if name else None
+                if pipeline is not None:
+                    scorer = ShadowScorer(name, pipeline, sample=app.config['MODEL_SHADOW_SAMPLE'],
+                                          max_queue=app.config['MODEL_SHADOW_MAX_QUEUE'])
+            except (OSError, ValueError, pickle.UnpicklingError) as e:
+                print(f"Error loading challenger model: {e}")
+            app.extensions['shadow_scorer'] = scorer  # None is not retried until the process restarts
+    return app.extensions['shadow_scorer']
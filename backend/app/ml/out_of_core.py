@@ -0,0 +1,372 @@
+import glob
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.pipeline import Pipeline
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from ..utils.flare_rules import flare_up_mask
+from ..utils.log_archive import get_archive
+
+NUMERICAL_COLS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication']
+CATEGORICAL_COL = 'exercise_type'
+
+LOG_COLUMNS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type']
+SYMPTOM_LOG_QUERY = f"SELECT {', '.join(LOG_COLUMNS)} FROM symptom_logs ORDER BY id"
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process in MB, or None where it is not available (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class SymptomLogSource:
+    """
+    Re-iterable stream of symptom log chunks from a SQLite database or chunked CSV files.
+    Each iteration starts a fresh pass, so multi-pass training never holds the dataset in memory.
+    Logs without a `flare_up` column (the `symptom_logs` table) are labelled with the rule-based flare logic.
+    A database's archived months (LogArchive) are streamed before its symptom_logs table, so training
+    sees the whole history.
+    """
+
+    def __init__(self, source, chunk_size=50000, archive=None):
+        """
+        Args:
+            source (str, list or Engine): A CSV path, glob or list of CSV paths; a SQLite file path;
+                a SQLAlchemy URL; an Engine; or a list of Engines (database shards, read in turn).
+            chunk_size (int): Rows per chunk.
+            archive (LogArchive, optional): Where the databases' archived months are stored. Defaults to
+                the app's archive for Engines (the app's databases) read in an app context.
+        """
+        self.source = source
+        self.chunk_size = chunk_size
+        self.archive = archive
+
+    def _csv_paths(self):
+        if isinstance(self.source, (list, tuple)) and not isinstance(self.source[0], Engine):
+            return list(self.source)
+        if isinstance(self.source, str) and self.source.endswith('.csv'):
+            return sorted(glob.glob(self.source)) or [self.source]
+        return None
+
+    def __iter__(self):
+        csv_paths = self._csv_paths()
+        if csv_paths is not None:
+            for path in csv_paths:
+                for chunk in pd.read_csv(path, chunksize=self.chunk_size):
+                    yield self._label(chunk)
+            return
+
+        engines = list(self.source) if isinstance(self.source, (list, tuple)) else [self.source]
+        for engine in engines:
+            archive = self.archive
+            if not isinstance(engine, Engine):
+                url = engine if '://' in engine else f"sqlite:///{os.path.abspath(engine)}"
+                engine = create_engine(url)
+            elif archive is None:
+                archive = get_archive()
+
+            if archive is not None:
+                with Session(bind=engine) as session:
+                    for chunk in archive.frames(session, columns=LOG_COLUMNS, chunk_size=self.chunk_size):
+                        yield self._label(chunk)
+            with engine.connect() as connection:
+                for chunk in pd.read_sql(SYMPTOM_LOG_QUERY, connection, chunksize=self.chunk_size):
+                    yield self._label(chunk)
+
+    @staticmethod
+    def _label(chunk):
+        if 'flare_up' not in chunk.columns:
+            chunk['flare_up'] = flare_up_mask(chunk['pain_level'], chunk['stress_level'], chunk['sleep_hours'],
+                                              chunk['exercise_done'], chunk['took_medication']).astype(int)
+        return chunk
+
+class StreamingPreprocessor(BaseEstimator, TransformerMixin):
+    """
+    Drop-in replacement for the predictor's ColumnTransformer whose statistics are fitted
+    incrementally: running mean/variance (Chan's parallel update) for the numerical columns
+    and a category vocabulary for `exercise_type`. Produces the same layout: scaled numerical
+    columns followed by one-hot categories in sorted order, unknown categories ignored.
+    """
+
+    def __init__(self, numerical_cols=None, categorical_col=CATEGORICAL_COL):
+        self.numerical_cols = numerical_cols or NUMERICAL_COLS
+        self.categorical_col = categorical_col
+        self.reset()
+
+    def reset(self):
+        self.count_ = np.zeros(len(self.numerical_cols))
+        self.mean_ = np.zeros(len(self.numerical_cols))
+        self.m2_ = np.zeros(len(self.numerical_cols))
+        self.category_counts_ = {}
+        return self
+
+    def partial_fit(self, X, y=None):
+        """
+        Update the running statistics with one chunk.
+        """
+        values = X[self.numerical_cols].astype(float).to_numpy()
+        count = (~np.isnan(values)).sum(axis=0)
+        mean = np.where(count > 0, np.nansum(values, axis=0) / np.maximum(count, 1), 0.0)
+        m2 = np.nansum((values - mean) ** 2, axis=0)
+
+        total = self.count_ + count
+        delta = mean - self.mean_
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean_ = np.where(total > 0, self.mean_ + delta * count / total, 0.0)
+            self.m2_ = np.where(total > 0, self.m2_ + m2 + delta ** 2 * self.count_ * count / total, 0.0)
+        self.count_ = total
+
+        for category, category_count in X[self.categorical_col].dropna().value_counts().items():
+            self.category_counts_[category] = self.category_counts_.get(category, 0) + int(category_count)
+        return self
+
+    def fit(self, X, y=None):
+        return self.reset().partial_fit(X)
+
+    @property
+    def scale_(self):
+        variance = np.where(self.count_ > 0, self.m2_ / np.maximum(self.count_, 1), 0.0)
+        scale = np.sqrt(variance)
+        return np.where(scale == 0, 1.0, scale)
+
+    @property
+    def categories_(self):
+        return np.array(sorted(self.category_counts_), dtype=object)
+
+    @property
+    def most_frequent_(self):
+        if not self.category_counts_:
+            return None
+        return min(self.category_counts_, key=lambda category: (-self.category_counts_[category], category))
+
+    @property
+    def n_features_out_(self):
+        return len(self.numerical_cols) + len(self.category_counts_)
+
+    def transform(self, X):
+        values = X[self.numerical_cols].astype(float).to_numpy()
+        values = np.where(np.isnan(values), self.mean_, values)
+        numerical = (values - self.mean_) / self.scale_
+
+        categories = X[self.categorical_col].astype(object).where(X[self.categorical_col].notna(), self.most_frequent_)
+        onehot = categories.to_numpy()[:, None] == self.categories_[None, :]
+        return np.hstack([numerical, onehot]).astype(np.float32)
+
+class MemoryBudget:
+    """
+    Splits a peak-memory budget between the streamed chunk, the training sample and the trees.
+    """
+
+    raw_row_bytes = 256  # Conservative estimate for one row of a raw pandas chunk (object column included)
+    tree_node_bytes = 160  # Node struct plus class value array, two nodes per leaf
+
+    def __init__(self, max_memory_mb, n_features, n_estimators):
+        budget = max_memory_mb * 1024 * 1024
+        self.chunk_rows = max(1000, int(budget * 0.25 // self.raw_row_bytes))
+        self.sample_rows = max(1000, int(budget * 0.5 // (n_features * 4 + 8)))
+        self.max_leaf_nodes = max(16, int(budget * 0.25 // (n_estimators * self.tree_node_bytes)))
+
+class OutOfCoreTrainer:
+    """
+    Trains the flare-up model on datasets larger than memory.
+
+    Two passes are always made: one to fit the preprocessing statistics and one (or more) to train.
+    Modes:
+        - "sgd": logistic regression trained with `partial_fit` on every chunk.
+        - "forest": RandomForest grown in warm-start batches of trees, each batch trained on a
+          fresh reservoir sample of the stream.
+    Every `holdout_every`-th row is held out of training and used to report accuracy.
+    """
+
+    def __init__(self, mode='forest', max_memory_mb=256, n_estimators=100, tree_batches=4, epochs=3,
+                 holdout_every=5, random_state=42):
+        if mode not in ('forest', 'sgd'):
+            raise ValueError(f"Unknown out-of-core training mode: {mode}")
+
+        self.mode = mode
+        self.max_memory_mb = max_memory_mb
+        self.n_estimators = n_estimators
+        self.tree_batches = tree_batches
+        self.epochs = epochs
+        self.holdout_every = holdout_every
+        self.random_state = random_state
+        self.preprocessor = StreamingPreprocessor()
+        self.report = {}
+
+    def _split(self, chunk, offset):
+        """
+        Deterministic train/holdout split by global row position.
+        """
+        holdout = (np.arange(offset, offset + len(chunk)) % self.holdout_every) == 0
+        return chunk[~holdout], chunk[holdout]
+
+    def _train_rows(self, source):
+        offset = 0
+        for chunk in source:
+            train, _ = self._split(chunk, offset)
+            offset += len(chunk)
+            yield train
+
+    def fit(self, source):
+        """
+        Train on a stream of symptom logs.
+
+        Args:
+            source (SymptomLogSource or str): The data to stream (see SymptomLogSource).
+
+        Returns:
+            Pipeline: A fitted `preprocessor` + `model` pipeline compatible with FlareUpPredictor.
+        """
+        start = time.perf_counter()
+        if not isinstance(source, SymptomLogSource):
+            source = SymptomLogSource(source)
+
+        # Size the chunks once the feature width is known; the stats pass uses the default chunk size
+        self.preprocessor.reset()
+        rows = 0
+        for train in self._train_rows(source):
+            self.preprocessor.partial_fit(train)
+            rows += len(train)
+        print(f"[DEBUG] Preprocessing statistics fitted on {rows} rows.")
+
+        budget = MemoryBudget(self.max_memory_mb, self.preprocessor.n_features_out_, self.n_estimators)
+        source.chunk_size = budget.chunk_rows
+
+        if self.mode == 'sgd':
+            model = self._fit_sgd(source)
+        else:
+            model = self._fit_forest(source, budget)
+
+        pipeline = Pipeline(steps=[('preprocessor', self.preprocessor), ('model', model)])
+        self.report = {
+            "mode": self.mode,
+            "training_rows": rows,
+            "chunk_rows": budget.chunk_rows,
+            "sample_rows": budget.sample_rows if self.mode == 'forest' else None,
+            "training_seconds": round(time.perf_counter() - start, 2),
+            "holdout_accuracy": self.evaluate(pipeline, source),
+            "peak_rss_mb": peak_rss_mb()
+        }
+        print(f"[DEBUG] Out-of-core training complete: {self.report}")
+        return pipeline
+
+    def _fit_sgd(self, source):
+        model = SGDClassifier(loss='log_loss', random_state=self.random_state)
+        rng = np.random.default_rng(self.random_state)
+        for _ in range(self.epochs):
+            for train in self._train_rows(source):
+                if train.empty:
+                    continue
+                order = rng.permutation(len(train))
+                X = self.preprocessor.transform(train)[order]
+                y = train['flare_up'].to_numpy()[order]
+                model.partial_fit(X, y, classes=np.array([0, 1]))
+        return model
+
+    def _reservoir_sample(self, source, size, rng):
+        """
+        Vectorized reservoir sampling (Algorithm R) of transformed training rows.
+        """
+        sample_X = np.empty((size, self.preprocessor.n_features_out_), dtype=np.float32)
+        sample_y = np.empty(size, dtype=np.int8)
+        seen = 0
+
+        for train in self._train_rows(source):
+            X = self.preprocessor.transform(train)
+            y = train['flare_up'].to_numpy()
+
+            fill = max(0, min(size - seen, len(train)))
+            sample_X[seen:seen + fill] = X[:fill]
+            sample_y[seen:seen + fill] = y[:fill]
+
+            positions = np.arange(seen + fill, seen + len(train)) + 1  # 1-based global positions
+            slots = (rng.random(len(positions)) * positions).astype(np.int64)
+            keep = slots < size
+            sample_X[slots[keep]] = X[fill:][keep]
+            sample_y[slots[keep]] = y[fill:][keep]
+            seen += len(train)
+
+        filled = min(seen, size)
+        return sample_X[:filled], sample_y[:filled]
+
+    def _fit_forest(self, source, budget):
+        rng = np.random.default_rng(self.random_state)
+        trees_per_batch = int(np.ceil(self.n_estimators / self.tree_batches))
+        model = RandomForestClassifier(n_estimators=trees_per_batch, warm_start=True,
+                                       max_leaf_nodes=budget.max_leaf_nodes, random_state=self.random_state)
+        grown = 0
+
+        while grown < self.n_estimators:
+            X, y = self._reservoir_sample(source, budget.sample_rows, rng)
+            grown = min(self.n_estimators, grown + trees_per_batch)
+            model.n_estimators = grown
+            model.fit(X, y)
+            print(f"[DEBUG] Forest grown to {model.n_estimators} trees on a sample of {len(y)} rows.")
+        return model
+
+    def evaluate(self, pipeline, source):
+        """
+        Accuracy on the held-out rows, computed chunk by chunk.
+        """
+        correct, total, offset = 0, 0, 0
+        for chunk in source:
+            _, holdout = self._split(chunk, offset)
+            offset += len(chunk)
+            if holdout.empty:
+                continue
+            predictions = pipeline.named_steps['model'].predict(self.preprocessor.transform(holdout))
+            correct += int((predictions == holdout['flare_up'].to_numpy()).sum())
+            total += len(holdout)
+        return round(correct / total, 4) if total else None
+
+def compare_with_in_memory(source, **trainer_options):
+    """
+    Train out-of-core and in memory on the same split, and report both holdout accuracies.
+    Only use on datasets that fit in memory; this is for validating the out-of-core mode.
+
+    Args:
+        source (str or SymptomLogSource): The data to train on.
+        **trainer_options: Passed to OutOfCoreTrainer.
+
+    Returns:
+        dict: The out-of-core report plus `in_memory_accuracy` and `in_memory_seconds`.
+    """
+    from .preprocess import DataPreprocessor
+
+    if not isinstance(source, SymptomLogSource):
+        source = SymptomLogSource(source)
+
+    trainer = OutOfCoreTrainer(**trainer_options)
+    trainer.fit(source)
+
+    start = time.perf_counter()
+    data = pd.concat(list(source), ignore_index=True)
+    train, holdout = trainer._split(data, 0)
+    features = NUMERICAL_COLS + [CATEGORICAL_COL]
+
+    baseline = Pipeline(steps=[
+        ('preprocessor', DataPreprocessor().preprocessor),
+        ('model', RandomForestClassifier(n_estimators=100, random_state=trainer.random_state))
+    ])
+    baseline.fit(train[features], train['flare_up'])
+    accuracy = accuracy_score(holdout['flare_up'], baseline.predict(holdout[features]))
+
+    report = dict(trainer.report)
+    report["in_memory_accuracy"] = round(accuracy, 4)
+    report["in_memory_seconds"] = round(time.perf_counter() - start, 2)
+    print(f"Out-of-core accuracy {report['holdout_accuracy']} vs in-memory {report['in_memory_accuracy']}")
+    return report
@@ -8,6 +8,9 @@ from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import pickle
 import os
+from .time_series import TimeSeriesFeatureEngine
+
+MODEL_FILE_PATH = os.path.join(os.path.dirname(__file__), "flare_up_model.pkl")  # The live (champion) model
 
 class FlareUpPredictor:
     """
@@ -15,12 +18,21 @@ class FlareUpPredictor:
     model training, and prediction based on user symptom logs.
     """
 
-    def __init__(self):
+    def __init__(self, use_lookup_table=False, model_file_path=None):
         """
         Initializes the FlareUpPredictor class.
         Loads a pre-trained model if available; otherwise, initializes a new RandomForest model.
+
+        Args:
+            use_lookup_table (bool): Precompute predictions over the discrete feature grid
+                whenever a model is loaded or trained (see PredictionLookupTable).
+            model_file_path (str): Model file to load and to save training results to
+                (default: the live model, MODEL_FILE_PATH; a ModelRegistry path trains a challenger).
         """
-        self.model_file_path = os.path.join(os.path.dirname(__file__), "flare_up_model.pkl")
+        self.model_file_path = model_file_path or MODEL_FILE_PATH
+        self.use_lookup_table = use_lookup_table
+        self.lookup_table = None
+        self._explainer = None
 
         try:
             with open(self.model_file_path, 'rb') as model_file:
@@ -30,6 +42,43 @@ class FlareUpPredictor:
             print("[DEBUG] No pre-trained model found. Initializing a new model.")
             self.pipeline = None  # Will be set during `train_model`.
 
+        self._refresh_lookup_table()
+
+    def _refresh_lookup_table(self):
+        """
+        Rebuild the prediction lookup table for the current pipeline, if enabled.
+        """
+        self._explainer = None  # Contributions are only valid for the model they were computed from
+        if self.use_lookup_table and self.pipeline is not None:
+            from .lookup_table import PredictionLookupTable
+            self.lookup_table = PredictionLookupTable(self.pipeline)
+
+    @property
+    def explainer(self):
+        """
+        ContributionExplainer of the current model, built on first use (None without a trained tree model).
+        """
+        if self._explainer is None and self.pipeline is not None:
+            from .attributions import ContributionExplainer
+            try:
+                self._explainer = ContributionExplainer(self.pipeline)
+            except ValueError as e:
+                print(f"[DEBUG] Feature contributions unavailable: {e}")
+        return self._explainer
+
+    def predict_proba(self, data):
+        """
+        Flare-up class probabilities, read from the lookup table when one is built.
+
+        Args:
+            data (pd.DataFrame): Rows with the model's feature columns.
+
+        Returns:
+            np.ndarray: (n, 2) array of probabilities.
+        """
+        scorer = self.lookup_table if self.lookup_table is not None else self.pipeline
+        return scorer.predict_proba(data)
+
     def preprocess_data(self, data):
         """
         Preprocesses input data for prediction.
@@ -98,6 +147,33 @@ class FlareUpPredictor:
             pickle.dump(self.pipeline, model_file)
             print("[DEBUG] Model saved successfully.")
 
+        self._refresh_lookup_table()
+
+    def train_model_out_of_core(self, source, mode='forest', max_memory_mb=256):
+        """
+        Trains the model by streaming symptom logs instead of loading them all at once.
+
+        Args:
+            source (str, list or Engine): CSV path/glob, SQLite file, SQLAlchemy URL, Engine or list of
+                shard Engines (see SymptomLogSource).
+            mode (str): "forest" (warm-start trees on reservoir samples) or "sgd" (partial_fit).
+            max_memory_mb (int): Approximate peak memory budget for chunks, samples and trees.
+
+        Returns:
+            dict: Training report including holdout accuracy and peak memory.
+        """
+        from .out_of_core import OutOfCoreTrainer
+
+        trainer = OutOfCoreTrainer(mode=mode, max_memory_mb=max_memory_mb)
+        self.pipeline = trainer.fit(source)
+
+        with open(self.model_file_path, 'wb') as model_file:
+            pickle.dump(self.pipeline, model_file)
+            print("[DEBUG] Model saved successfully.")
+
+        self._refresh_lookup_table()
+        return trainer.report
+
     def predict_flare_up(self, symptom_logs, user_logs, username='User'):
         """
         Predicts likelihood of a flare-up and provides personalized insights based on trends.
@@ -106,7 +182,7 @@ class FlareUpPredictor:
         features = self.pipeline['preprocessor'].transform(data)
         prediction = self.pipeline.predict(features)
 
-        suggestion = self.generate_insights(user_logs)
+        suggestion = self.generate_insights(user_logs, explainer=self.explainer)
 
         return {
             'greeting': f"Hello, {username}! Here's what I found based on your recent logs.",
@@ -114,9 +190,17 @@ class FlareUpPredictor:
             'suggestion': suggestion
         }
 
-    def generate_insights(self, user_logs):
+    @staticmethod
+    def generate_insights(user_logs, explainer=None):
         """
         Generates insights based on historical symptom data.
+        Accepts any DataFrame of logs, e.g. a user's hot window (`LogRing.to_frame()`).
+
+        Args:
+            user_logs (pd.DataFrame): The user's logs, oldest first.
+            explainer (ContributionExplainer): When given, the recent logs are explained by the model
+                and insights name the features that raised their predicted flare-up risk on average,
+                instead of applying fixed thresholds.
         """
         insights = []
         recent_logs = user_logs.tail(5)
@@ -124,17 +208,38 @@ class FlareUpPredictor:
         if recent_logs.empty:
             return "Not enough historical data to provide detailed insights. Keep logging!"
 
-        if (recent_logs['sleep_hours'] < 6).sum() >= 3:
-            insights.append("Consistently low sleep detected. Prioritize rest.")
-
-        if (recent_logs['took_medication'] == 0).sum() >= 3:
-            insights.append("You’ve missed medication multiple times. This may increase risks.")
-
-        if (recent_logs['stress_level'] > 6).sum() >= 3:
-            insights.append("High stress levels detected. Consider stress management.")
-
-        if (recent_logs['exercise_done'] == 0).sum() >= 3:
-            insights.append("Lack of regular exercise detected.")
+        if explainer is not None:
+            from .attributions import trend_insights
+            _, contributions = explainer.explain_frame(recent_logs)
+            insights.extend(trend_insights(contributions))
+        else:
+            # Count all flags over the recent window in one vectorized pass
+            recent_flags = pd.DataFrame({
+                'low_sleep': recent_logs['sleep_hours'] < 6,
+                'missed_medication': recent_logs['took_medication'] == 0,
+                'high_stress': recent_logs['stress_level'] > 6,
+                'no_exercise': recent_logs['exercise_done'] == 0
+            }).sum()
+
+            if recent_flags['low_sleep'] >= 3:
+                insights.append("Consistently low sleep detected. Prioritize rest.")
+
+            if recent_flags['missed_medication'] >= 3:
+                insights.append("You’ve missed medication multiple times. This may increase risks.")
+
+            if recent_flags['high_stress'] >= 3:
+                insights.append("High stress levels detected. Consider stress management.")
+
+            if recent_flags['no_exercise'] >= 3:
+                insights.append("Lack of regular exercise detected.")
+
+        # Rolling-window features need timestamps to work with
+        if 'logged_at' in user_logs.columns:
+            latest = TimeSeriesFeatureEngine().fit(user_logs).latest()
+            if latest['missed_medication_streak'] >= 3:
+                insights.append(f"Medication missed {int(latest['missed_medication_streak'])} logs in a row.")
+            if latest['log_count_7d'] >= 3 and latest['pain_level_mean_7d'] - latest['pain_level_mean_30d'] >= 1:
+                insights.append("Your pain has been trending up this week compared to the past month.")
 
         if not insights:
             insights.append("Your logs look stable! Keep maintaining good habits.")
@@ -0,0 +1,237 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+
+class TimeSeriesFeatureEngine:
+    """
+    Computes time-series features over a user's symptom logs indexed by `logged_at`.
+    Produces rolling 7/30-day means, EWMAs, streaks and day-of-week patterns that can be
+    used both for CHIIP insights and as model features.
+
+    The engine is built once from a user's history with vectorized pandas/NumPy window
+    operations and then kept up to date with `append`, which only touches the rows still
+    inside the longest window.
+    """
+
+    numerical_cols = ['pain_level', 'stress_level', 'sleep_hours']
+    windows = {'7d': pd.Timedelta(days=7), '30d': pd.Timedelta(days=30)}
+
+    def __init__(self, ewma_span=7, short_sleep_hours=7):
+        """
+        Initialize an empty feature engine.
+
+        Args:
+            ewma_span (int): Span of the exponentially weighted moving averages.
+            short_sleep_hours (float): Sleep below this many hours counts towards the short sleep streak.
+        """
+        self.ewma_span = ewma_span
+        self.alpha = 2.0 / (ewma_span + 1)
+        self.short_sleep_hours = short_sleep_hours
+        self.feature_names = (
+            [f"{col}_mean_{name}" for name in self.windows for col in self.numerical_cols]
+            + [f"{col}_ewma" for col in self.numerical_cols]
+            + [f"log_count_{name}" for name in self.windows]
+            + ['missed_medication_streak', 'short_sleep_streak']
+        )
+        self._reset()
+
+    def _reset(self):
+        """
+        Clear all incremental state.
+        """
+        self.history = pd.DataFrame(columns=self.feature_names, dtype=float)
+        self._pending = []  # Feature rows appended since the last frame materialization
+        self._pending_index = []
+        self._window_rows = {name: deque() for name in self.windows}
+        self._window_sums = {name: np.zeros(len(self.numerical_cols)) for name in self.windows}
+        self._ewma = None
+        self._missed_medication_streak = 0
+        self._short_sleep_streak = 0
+        self._dow_sums = np.zeros((7, len(self.numerical_cols)))
+        self._dow_counts = np.zeros(7, dtype=int)
+        self._last_logged_at = None
+        self._raw_logs = pd.DataFrame()
+        self._appended_logs = []
+
+    @staticmethod
+    def _to_frame(logs):
+        """
+        Normalise symptom logs into a DataFrame sorted and indexed by `logged_at`.
+        """
+        data = pd.DataFrame(logs) if isinstance(logs, list) else logs.copy()
+        if 'logged_at' not in data.columns:
+            raise ValueError("Missing columns: ['logged_at']")
+
+        data['logged_at'] = pd.to_datetime(data['logged_at'])
+        data = data.sort_values('logged_at', kind='stable').set_index('logged_at')
+        data['took_medication'] = data['took_medication'].astype(int)
+        return data
+
+    def fit(self, logs):
+        """
+        Build features for a full history of logs using vectorized window operations.
+
+        Args:
+            logs (list of dicts or pd.DataFrame): Symptom logs including `logged_at`.
+
+        Returns:
+            TimeSeriesFeatureEngine: The fitted engine (for chaining).
+        """
+        self._reset()
+        data = self._to_frame(logs)
+        if data.empty:
+            return self
+        self._raw_logs = data
+
+        values = data[self.numerical_cols].astype(float)
+        features = {}
+
+        # Rolling time-based window means and counts
+        for name, window in self.windows.items():
+            rolling = values.rolling(window)
+            means = rolling.mean()
+            for col in self.numerical_cols:
+                features[f"{col}_mean_{name}"] = means[col].to_numpy()
+            features[f"log_count_{name}"] = rolling.count()[self.numerical_cols[0]].to_numpy()
+
+        # Exponentially weighted means (adjust=False so `append` can continue the recursion exactly)
+        ewma = values.ewm(span=self.ewma_span, adjust=False).mean()
+        for col in self.numerical_cols:
+            features[f"{col}_ewma"] = ewma[col].to_numpy()
+
+        # Streaks: running count of consecutive True values, reset on every False
+        missed = (data['took_medication'] == 0).to_numpy()
+        short_sleep = (data['sleep_hours'] < self.short_sleep_hours).to_numpy()
+        features['missed_medication_streak'] = self._streaks(missed)
+        features['short_sleep_streak'] = self._streaks(short_sleep)
+
+        self.history = pd.DataFrame(features, index=data.index)[self.feature_names]
+
+        # Carry the tail of the history over as incremental state
+        timestamps = data.index
+        raw = values.to_numpy()
+        last = timestamps[-1]
+        for name, window in self.windows.items():
+            in_window = timestamps > last - window
+            self._window_rows[name] = deque(zip(timestamps[in_window], raw[in_window]))
+            self._window_sums[name] = raw[in_window].sum(axis=0)
+
+        self._ewma = ewma.to_numpy()[-1].copy()
+        self._missed_medication_streak = int(features['missed_medication_streak'][-1])
+        self._short_sleep_streak = int(features['short_sleep_streak'][-1])
+
+        days = timestamps.dayofweek.to_numpy()
+        np.add.at(self._dow_sums, days, raw)
+        self._dow_counts = np.bincount(days, minlength=7)
+        self._last_logged_at = last
+        return self
+
+    @staticmethod
+    def _streaks(flags):
+        """
+        Vectorized run-length of consecutive True values ending at each position.
+        """
+        flags = np.asarray(flags, dtype=bool)
+        positions = np.arange(len(flags))
+        last_reset = np.maximum.accumulate(np.where(flags, -1, positions))
+        return np.where(flags, positions - last_reset, 0)
+
+    def append(self, log):
+        """
+        Update the features with a single new log without recomputing the history.
+        Logs that arrive out of order trigger a full rebuild instead.
+
+        Args:
+            log (dict): A symptom log including `logged_at`.
+
+        Returns:
+            dict: The feature vector for the appended log.
+        """
+        logged_at = pd.Timestamp(log['logged_at'])
+        if self._last_logged_at is not None and logged_at < self._last_logged_at:
+            self.fit(self._all_logs(log))
+            return self.latest()
+
+        raw = np.array([float(log[col]) for col in self.numerical_cols])
+        features = {}
+
+        for name, window in self.windows.items():
+            rows = self._window_rows[name]
+            rows.append((logged_at, raw))
+            self._window_sums[name] += raw
+            while rows and rows[0][0] <= logged_at - window:
+                _, expired = rows.popleft()
+                self._window_sums[name] -= expired
+            means = self._window_sums[name] / len(rows)
+            for col, value in zip(self.numerical_cols, means):
+                features[f"{col}_mean_{name}"] = float(value)
+            features[f"log_count_{name}"] = float(len(rows))
+
+        self._ewma = raw.copy() if self._ewma is None else (1 - self.alpha) * self._ewma + self.alpha * raw
+        for col, value in zip(self.numerical_cols, self._ewma):
+            features[f"{col}_ewma"] = float(value)
+
+        self._missed_medication_streak = self._missed_medication_streak + 1 if not log['took_medication'] else 0
+        self._short_sleep_streak = self._short_sleep_streak + 1 if log['sleep_hours'] < self.short_sleep_hours else 0
+        features['missed_medication_streak'] = float(self._missed_medication_streak)
+        features['short_sleep_streak'] = float(self._short_sleep_streak)
+
+        day = logged_at.dayofweek
+        self._dow_sums[day] += raw
+        self._dow_counts[day] += 1
+        self._last_logged_at = logged_at
+
+        self._appended_logs.append(log)
+        self._pending.append([features[name] for name in self.feature_names])
+        self._pending_index.append(logged_at)
+        return features
+
+    def _all_logs(self, extra_log):
+        """
+        Every raw log seen so far plus `extra_log`, used when a rebuild is required.
+        """
+        fitted = self._raw_logs.reset_index()
+        appended = pd.DataFrame(self._appended_logs + [extra_log])
+        return appended if fitted.empty else pd.concat([fitted, appended], ignore_index=True)
+
+    def features(self):
+        """
+        Per-log feature matrix, suitable as model features.
+
+        Returns:
+            pd.DataFrame: One row per log, indexed by `logged_at`.
+        """
+        if self._pending:
+            appended = pd.DataFrame(self._pending, columns=self.feature_names,
+                                    index=pd.DatetimeIndex(self._pending_index, name='logged_at'))
+            self.history = appended if self.history.empty else pd.concat([self.history, appended])
+            self._pending, self._pending_index = [], []
+        return self.history
+
+    def latest(self):
+        """
+        Feature vector for the most recent log.
+
+        Returns:
+            dict: Feature name to value, or an empty dict when no logs have been seen.
+        """
+        if self._pending:
+            return dict(zip(self.feature_names, self._pending[-1]))
+        if self.history.empty:
+            return {}
+        return self.history.iloc[-1].to_dict()
+
+    def day_of_week_profile(self):
+        """
+        Average pain, stress and sleep per weekday.
+
+        Returns:
+            pd.DataFrame: Indexed by weekday name, with a `log_count` column.
+        """
+        counts = self._dow_counts.astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self._dow_sums / counts[:, None]
+        profile = pd.DataFrame(means, columns=self.numerical_cols,
+                               index=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+        profile['log_count'] = self._dow_counts
+        return profile
@@ -2,7 +2,11 @@ import pandas as pd
 from datetime import datetime
 from sqlalchemy.orm import Session
 from .. import db  # Assumes file is within `backend/app/ml/`
-from ..models import SymptomLog, TrendAnalysis
+from ..models import TrendAnalysis
+from .time_series import TimeSeriesFeatureEngine
+from ..utils.sharding import shard_scope
+from ..utils.replicas import replica_scope
+from ..utils.log_archive import HISTORY_COLUMNS, user_logs
 
 class TrendAnalyzer:
     """
@@ -20,32 +24,58 @@ class TrendAnalyzer:
         self.user_id = user_id
         self.db_session = db_session
         self.data = None
+        self.features = TimeSeriesFeatureEngine()
 
     def load_user_data(self):
         """
-        Loads historical symptom logs for the user.
+        Loads historical symptom logs for the user, including archived months.
         """
         try:
-            # Query symptom logs
-            symptom_logs = self.db_session.query(SymptomLog).filter_by(user_id=self.user_id).all()
-            self.data = pd.DataFrame([{
-                "logged_at": log.logged_at,
-                "pain_level": log.pain_level,
-                "stress_level": log.stress_level,
-                "sleep_hours": log.sleep_hours,
-                "exercise_done": log.exercise_done,
-                "took_medication": log.took_medication,
-                "exercise_type": log.exercise_type
-            } for log in symptom_logs])
+            # Query symptom logs (on the user's shard, or a read replica that has the user's writes)
+            with shard_scope(self.user_id), replica_scope(self.user_id):
+                symptom_logs = user_logs(self.db_session, self.user_id)
+            self.data = pd.DataFrame(symptom_logs, columns=list(HISTORY_COLUMNS)).drop(columns='id')
 
             if self.data.empty:
                 print(f"No data available for user {self.user_id}")
             else:
+                self.features.fit(self.data)
                 print(f"Data successfully loaded for user {self.user_id}")
 
         except Exception as e:
             print(f"Error loading data for user {self.user_id}: {e}")
 
+    def load_recent_data(self, window):
+        """
+        Use a user's in-memory window of recent logs instead of querying the database.
+
+        Args:
+            window (LogRing): The user's hot window (see HotWindowCache).
+        """
+        self.data = window.to_frame()
+        if not self.data.empty:
+            self.features.fit(self.data)
+
+    def append_log(self, log):
+        """
+        Add a newly logged symptom entry without reloading the user's history.
+
+        Args:
+            log (SymptomLog): The log that was just stored.
+        """
+        entry = {
+            "logged_at": log.logged_at,
+            "pain_level": log.pain_level,
+            "stress_level": log.stress_level,
+            "sleep_hours": log.sleep_hours,
+            "exercise_done": log.exercise_done,
+            "took_medication": log.took_medication,
+            "exercise_type": log.exercise_type
+        }
+        row = pd.DataFrame([entry])
+        self.data = row if self.data is None or self.data.empty else pd.concat([self.data, row], ignore_index=True)
+        self.features.append(entry)
+
     def analyze_trends(self):
         """
         Analyze user data to identify trends and generate insights.
@@ -78,8 +108,46 @@ class TrendAnalyzer:
         if not missed_med_logs.empty:
             trend_summary.append(f"Medication missed on {len(missed_med_logs)} occasions. Regular intake may improve symptoms.")
 
+        trend_summary.extend(self.analyze_recent_trends())
+
         return " ".join(trend_summary) if trend_summary else "No significant trends detected."
 
+    def analyze_recent_trends(self):
+        """
+        Short-term trends from the rolling-window features (7 vs 30 days, streaks, weekdays).
+
+        Returns:
+            list: Trend sentences, empty when nothing stands out.
+        """
+        latest = self.features.latest()
+        if not latest:
+            return []
+
+        trend_summary = []
+
+        if latest['log_count_7d'] >= 3 and latest['pain_level_mean_7d'] - latest['pain_level_mean_30d'] >= 1:
+            trend_summary.append(f"Pain has been rising this week ({latest['pain_level_mean_7d']:.1f} vs "
+                                 f"{latest['pain_level_mean_30d']:.1f} over 30 days).")
+
+        if latest['log_count_7d'] >= 3 and latest['stress_level_mean_7d'] - latest['stress_level_mean_30d'] >= 1:
+            trend_summary.append(f"Stress has been rising this week ({latest['stress_level_mean_7d']:.1f} vs "
+                                 f"{latest['stress_level_mean_30d']:.1f} over 30 days).")
+
+        if latest['missed_medication_streak'] >= 3:
+            trend_summary.append(f"Medication missed {int(latest['missed_medication_streak'])} logs in a row.")
+
+        if latest['short_sleep_streak'] >= 3:
+            trend_summary.append(f"Short sleep for {int(latest['short_sleep_streak'])} logs in a row.")
+
+        profile = self.features.day_of_week_profile()
+        profile = profile[profile['log_count'] >= 3]
+        if len(profile) >= 2:
+            worst_day = profile['pain_level'].idxmax()
+            if profile.loc[worst_day, 'pain_level'] - profile['pain_level'].mean() >= 1.5:
+                trend_summary.append(f"Pain tends to be highest on {worst_day}s.")
+
+        return trend_summary
+
     def save_trend_analysis(self):
         """
         Saves the trend analysis summary in the database.
@@ -92,8 +160,9 @@ class TrendAnalyzer:
         )
 
         try:
-            self.db_session.add(new_trend_analysis)
-            self.db_session.commit()
+            with shard_scope(self.user_id):
+                self.db_session.add(new_trend_analysis)
+                self.db_session.commit()
             print(f"Trend analysis saved for user {self.user_id}.")
         except Exception as e:
             self.db_session.rollback()
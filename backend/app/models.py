@@ -15,6 +15,8 @@ class User(db.Model):
 # Updated SymptomLog model to use user_id as foreign key
 class SymptomLog(db.Model):
     __tablename__ = 'symptom_logs'
+    __table_args__ = (db.Index('ix_symptom_logs_user_id_logged_at', 'user_id', 'logged_at'),  # Per-user history
+                      db.Index('ux_symptom_logs_user_id_client_key', 'user_id', 'client_key', unique=True))  # Retried writes
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.String(10), db.ForeignKey('users.user_id'), nullable=False)
@@ -32,6 +34,8 @@ class SymptomLog(db.Model):
     logged_at = db.Column(db.DateTime, default=datetime.utcnow)
     timestamp = db.Column(db.Time, default=datetime.now().time)
 
+    client_key = db.Column(db.String(64), nullable=True)  # Idempotency-Key of the request that wrote it
+
     user = db.relationship('User', backref=db.backref('symptom_logs', lazy=True))
 
     def __repr__(self):
@@ -63,3 +67,138 @@ class TrendAnalysis(db.Model):
 
     def __repr__(self):
         return f'<TrendAnalysis for User {self.user_id} at {self.generated_at}>'
+
+# ---------------------- Analytics Rollups ----------------------
+
+class DailyRollup(db.Model):
+    __tablename__ = 'daily_rollups'
+    __table_args__ = (db.UniqueConstraint('day', 'cohort', name='uq_daily_rollups_day_cohort'),)
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    cohort = db.Column(db.String(10), nullable=False)  # Signup month of the users, e.g. "2024-11"
+
+    log_count = db.Column(db.Integer, nullable=False, default=0)
+    flare_count = db.Column(db.Integer, nullable=False, default=0)
+    pain_sum = db.Column(db.Integer, nullable=False, default=0)
+    stress_sum = db.Column(db.Integer, nullable=False, default=0)
+    sleep_sum = db.Column(db.Float, nullable=False, default=0.0)
+    medication_count = db.Column(db.Integer, nullable=False, default=0)
+
+    pain_histogram = db.Column(db.String(100), nullable=True)  # Comma separated counts for levels 1-10
+    stress_histogram = db.Column(db.String(100), nullable=True)  # Comma separated counts for levels 1-10
+    users_sketch = db.Column(db.LargeBinary, nullable=True)  # HyperLogLog registers of distinct users
+
+    def __repr__(self):
+        return f'<DailyRollup {self.day} cohort {self.cohort}>'
+
+class ExerciseRollup(db.Model):
+    __tablename__ = 'exercise_rollups'
+    __table_args__ = (db.UniqueConstraint('day', 'cohort', 'exercise_type', name='uq_exercise_rollups_day_cohort_type'),)
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    cohort = db.Column(db.String(10), nullable=False)
+    exercise_type = db.Column(db.String(50), nullable=False)  # "none" when no exercise was logged
+
+    log_count = db.Column(db.Integer, nullable=False, default=0)
+    pain_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ExerciseRollup {self.day} {self.exercise_type}>'
+
+class UserAdherence(db.Model):
+    __tablename__ = 'user_adherence'
+
+    user_id = db.Column(db.String(10), db.ForeignKey('users.user_id'), primary_key=True)
+    cohort = db.Column(db.String(10), nullable=False)
+    log_count = db.Column(db.Integer, nullable=False, default=0)
+    medication_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<UserAdherence {self.user_id} {self.medication_count}/{self.log_count}>'
+
+# ---------------------- Change Feed ----------------------
+
+class ChangeEvent(db.Model):
+    __tablename__ = 'change_feed'
+    __table_args__ = {'sqlite_autoincrement': True}  # Positions are never reused, even after pruning
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Feed position
+    topic = db.Column(db.String(50), nullable=False)  # e.g. "symptom_log.created"
+    entity_id = db.Column(db.Integer, nullable=False)  # ID of the changed row
+    user_id = db.Column(db.String(10), nullable=False)
+    payload = db.Column(db.Text, nullable=True)  # JSON column values of the row
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<ChangeEvent {self.id} {self.topic} {self.entity_id}>'
+
+class ConsumerOffset(db.Model):
+    __tablename__ = 'consumer_offsets'
+
+    consumer = db.Column(db.String(50), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)  # Last change_feed.id the consumer processed
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ConsumerOffset {self.consumer} at {self.position}>'
+
+# ---------------------- Feature Store ----------------------
+
+class UserFeatures(db.Model):
+    __tablename__ = 'user_features'
+
+    user_id = db.Column(db.String(10), db.ForeignKey('users.user_id'), primary_key=True)
+    version = db.Column(db.String(16), nullable=False, index=True)  # Hash of the preprocessor that encoded the vector
+    log_id = db.Column(db.Integer, nullable=False)  # Latest symptom log the vector was computed from
+    vector = db.Column(db.LargeBinary, nullable=False)  # Model-ready float32 features
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserFeatures {self.user_id} v{self.version}>'
+
+# ---------------------- Log Archive ----------------------
+
+class LogPartition(db.Model):
+    __tablename__ = 'log_partitions'
+
+    month = db.Column(db.String(7), primary_key=True)  # Archived month of symptom_logs, e.g. "2024-11"
+    path = db.Column(db.String(255), nullable=False)  # Columnar file, relative to ARCHIVE_DIR
+    row_count = db.Column(db.Integer, nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<LogPartition {self.month} ({self.row_count} logs)>'
+
+# ---------------------- Read Replicas ----------------------
+
+class WriteMarker(db.Model):
+    __tablename__ = 'write_markers'
+
+    user_id = db.Column(db.String(10), primary_key=True)
+    written_at = db.Column(db.Float, nullable=False)  # Epoch seconds of the user's last write transaction
+
+    def __repr__(self):
+        return f'<WriteMarker {self.user_id} at {self.written_at}>'
+
+# ---------------------- Online Migrations ----------------------
+
+class MigrationJob(db.Model):
+    __tablename__ = 'migration_jobs'
+
+    name = db.Column(db.String(100), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'online-migration' or 'backfill'
+    table_name = db.Column(db.String(100), nullable=False)
+    phase = db.Column(db.String(10), nullable=False)  # copying -> copied -> swapped -> done (backfills: copying -> done)
+    start_key = db.Column(db.Integer, nullable=False)  # Primary key range (start_key, end_key] the job walks
+    last_key = db.Column(db.Integer, nullable=False)  # Checkpoint: every key up to here is done
+    end_key = db.Column(db.Integer, nullable=False)
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<MigrationJob {self.name} {self.phase}>'
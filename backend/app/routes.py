@@ -1,8 +1,17 @@
-from flask import Blueprint, request, jsonify
-from datetime import datetime
+from flask import Blueprint, redirect, request, jsonify, current_app
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
 import random
+from sqlalchemy.exc import IntegrityError
 from .models import User, SymptomLog
 from . import db
+from .utils.flare_rules import is_flare_up
+from .analytics.rollups import RollupManager, cohort_for
+from .utils.group_commit import get_writer
+from .utils.sharding import get_router
+from .utils.replicas import route_reads
+from .utils.log_archive import get_archive, user_logs
+from .utils.validation import InputValidator
 
 bp = Blueprint('api', __name__)
 
@@ -16,8 +25,10 @@ def auto_assign_user():
     try:
         user_id = request.json.get('user_id')
 
+        router = get_router()
         if user_id:
             # Validate existing user_id
+            router.select(user_id)
             user = User.query.filter_by(user_id=user_id).first()
             if user:
                 return jsonify({"message": "User ID validated", "user_id": user.user_id}), 200
@@ -25,8 +36,10 @@ def auto_assign_user():
 
         # Create new user if no valid ID provided
         user_id = str(random.randint(100000, 999999))
+        router.select(user_id)
         while User.query.filter_by(user_id=user_id).first():
             user_id = str(random.randint(100000, 999999))
+            router.select(user_id)
 
         new_user = User(user_id=user_id)
         db.session.add(new_user)
@@ -41,10 +54,22 @@ def auto_assign_user():
 
 # ---------------------- Symptom Logging ----------------------
 
+def _announce(app, log):
+    """
+    Hand a committed log to the hot window cache and to its user's live update streams.
+    """
+    app.extensions['hot_window'].append(log)
+    if 'live_updates' in app.extensions:
+        app.extensions['live_updates'].publish(log)
+
+def _already_logged(user_id, client_key):
+    return client_key is not None and SymptomLog.query.filter_by(user_id=user_id, client_key=client_key).first() is not None
+
 @bp.route('/log-symptoms', methods=['POST'])
 def log_symptoms():
     """
     Log symptoms for a user.
+    An optional Idempotency-Key header makes retries safe: a log is stored once per user and key.
     """
     data = request.get_json()
     user_id = data.get('user_id')
@@ -52,33 +77,69 @@ def log_symptoms():
     if not user_id:
         return jsonify({"error": "User ID is required."}), 400
 
+    client_key = request.headers.get('Idempotency-Key')
+    if not InputValidator.validate_idempotency_key(client_key):
+        return jsonify({"error": "Invalid Idempotency-Key header."}), 400
+
     required_fields = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication']
     if not all(field in data for field in required_fields):
         return jsonify({"error": "All symptom fields are required."}), 400
 
+    # Levels index the rollup histograms, so they are checked before anything is written
+    symptoms, error = InputValidator.clean_symptom_log(data)
+    if error:
+        return jsonify({"error": error}), 400
+
     try:
+        get_router().select(user_id)
         user = User.query.filter_by(user_id=user_id).first()
         if not user:
             return jsonify({"error": "Invalid User ID."}), 404
+        if _already_logged(user_id, client_key):
+            return jsonify({"message": "Symptom log already recorded."}), 200
 
         # Remove any unnecessary fields like diet_notes, additional_notes
-        new_log = SymptomLog(
+        fields = dict(
             user_id=user_id,
-            pain_level=data['pain_level'],
-            stress_level=data['stress_level'],
-            sleep_hours=data['sleep_hours'],
-            exercise_done=data['exercise_done'],
-            exercise_type=",".join(data.get('exercise_types', [])),  # Join selected exercise types
-            took_medication=data['took_medication'],
-            logged_at=datetime.utcnow()
+            pain_level=symptoms['pain_level'],
+            stress_level=symptoms['stress_level'],
+            sleep_hours=symptoms['sleep_hours'],
+            exercise_done=symptoms['exercise_done'],
+            exercise_type=",".join(symptoms['exercise_types']),  # Join selected exercise types
+            took_medication=symptoms['took_medication'],
+            logged_at=datetime.utcnow(),
+            client_key=client_key
         )
 
-        db.session.add(new_log)
-        db.session.commit()
+        if current_app.config['GROUP_COMMIT_ENABLED']:
+            # Shares a transaction with concurrent requests; returns once it is durable
+            cohort = cohort_for(user.created_at)
+            db.session.close()  # Return this request's pooled connection before waiting on the writer
+            app = current_app._get_current_object()
+            pending = get_writer(app).submit(fields, cohort)
+            try:
+                new_log = pending.result(timeout=current_app.config['GROUP_COMMIT_TIMEOUT'])
+            except FutureTimeoutError:
+                # The group can still commit after we give up; announce the log if it does
+                pending.add_done_callback(lambda done: done.exception() is None and _announce(app, done.result()))
+                return jsonify({"error": "Saving the log is taking longer than usual and it may still be saved; "
+                                         "retry with the same Idempotency-Key."}), 503, {"Retry-After": "5"}
+        else:
+            new_log = SymptomLog(**fields)
+            db.session.add(new_log)
+            if current_app.config['ANALYTICS_INCREMENTAL_ROLLUPS']:
+                RollupManager(db.session, precision=current_app.config['ANALYTICS_HLL_PRECISION']).record_log(
+                    new_log, cohort_for(user.created_at))
+            db.session.commit()
+
+        _announce(current_app, new_log)
         return jsonify({"message": "Symptom log created successfully."}), 201
 
     except Exception as e:
         db.session.rollback()
+        if isinstance(e, IntegrityError) and _already_logged(user_id, client_key):
+            # A concurrent retry with the same key stored it first
+            return jsonify({"message": "Symptom log already recorded."}), 200
         print(f"Error during symptom logging: {e}")
         return jsonify({"error": f"Database error: Unable to log symptoms ({str(e)})"}), 500
 
@@ -87,41 +148,49 @@ def log_symptoms():
 
 @bp.route('/symptom-logs', methods=['GET'])
 def get_symptom_logs():
+    """
+    A user's symptom logs, newest first, including archived months.
+    Optional query parameters: start, end (YYYY-MM-DD, inclusive).
+    """
     user_id = request.args.get('user_id')
 
     if not user_id:
         return jsonify({"error": "User ID is required."}), 400
 
     try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.strptime(start, '%Y-%m-%d') if start else None
+        end = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1) if end else None
+    except ValueError:
+        return jsonify({"error": "Dates must be in YYYY-MM-DD format."}), 400
+
+    try:
+        get_router().select(user_id)
+        route_reads(user_id)  # Read-only: a replica that has the user's latest writes, if any
         user = User.query.filter_by(user_id=user_id).first()
         if not user:
             return jsonify({"error": "Invalid User ID."}), 404
 
-        symptom_logs = SymptomLog.query.filter_by(user_id=user_id).order_by(SymptomLog.logged_at.desc()).all()
-        response_data = []
+        # Plain row tuples (no ORM objects) with formatted timestamps, from symptom_logs and the archive
+        rows = user_logs(db.session, user_id, start, end, newest_first=True, timestamps_as_text=True)
 
-        for log in symptom_logs:
-            # Flare-up logic
-            flare = (
-                    log.pain_level >= 7 or
-                    (log.pain_level >= 5 and (log.sleep_hours < 7 or not log.took_medication or log.stress_level > 5)) or
-                    (log.pain_level >= 2 and sum([
-                        log.sleep_hours < 7,
-                        not log.took_medication,
-                        not log.exercise_done,
-                        log.stress_level > 6
-                    ]) >= 3)
-            )
+        exercise_types = {}  # Few distinct exercise_type strings; split each once
+        response_data = []
+        for logged_at, pain, stress, sleep, exercise_done, exercise_type, took_medication, _ in rows:
+            if exercise_type not in exercise_types:
+                exercise_types[exercise_type] = exercise_type.split(',') if exercise_type else []
 
             response_data.append({
-                "logged_at": log.logged_at.strftime('%Y-%m-%d %H:%M:%S'),
-                "pain_level": log.pain_level,
-                "stress_level": log.stress_level,
-                "sleep_hours": log.sleep_hours,
-                "exercise_done": log.exercise_done,
-                "exercise_type": log.exercise_type.split(',') if log.exercise_type else [],
-                "took_medication": log.took_medication,
-                "flare_up": 1 if flare else 0  # Include flare_up for chart logic
+                "logged_at": logged_at,
+                "pain_level": pain,
+                "stress_level": stress,
+                "sleep_hours": sleep,
+                "exercise_done": exercise_done,
+                "exercise_type": exercise_types[exercise_type],
+                "took_medication": took_medication,
+                # Flare-up logic, included for chart logic
+                "flare_up": 1 if is_flare_up(pain, stress, sleep, exercise_done, took_medication) else 0
             })
 
         return jsonify(response_data), 200
@@ -141,41 +210,216 @@ def bot_analysis():
         if not user_id:
             return jsonify({"error": "User ID is required."}), 400
 
-        latest_log = SymptomLog.query.filter_by(user_id=user_id).order_by(SymptomLog.logged_at.desc()).first()
+        get_router().select(user_id)
+        route_reads(user_id)
+        window = current_app.extensions['hot_window'].get(user_id, db.session)
 
-        if not latest_log:
+        if not len(window):
             return jsonify({"error": "No symptom logs available for analysis."}), 404
 
-        # Determine flare-up based on conditions
-        flare = (
-                latest_log.pain_level >= 7 or
-                (latest_log.pain_level >= 5 and (latest_log.sleep_hours < 7 or not latest_log.took_medication or latest_log.stress_level > 5)) or
-                (latest_log.pain_level >= 2 and sum([
-                    latest_log.sleep_hours < 7,
-                    not latest_log.took_medication,
-                    not latest_log.exercise_done,
-                    latest_log.stress_level > 6
-                ]) >= 3)
-        )
+        # The analysis only changes when a new log is appended to the window
+        analysis = window.memoize('bot_analysis', lambda: analyze_window(user_id, window))
+        return jsonify(analysis), 200
+
+    except Exception as e:
+        print(f"Error analyzing logs: {e}")
+        return jsonify({"error": f"Unable to analyze symptom logs ({str(e)})"}), 500
 
-        insights = []
-        if flare:
-            insights.append("Your recent symptom logs indicate a potential flare-up. Please take care of yourself.")
-            if latest_log.pain_level > 5:
-                insights.append(f"Pain Level: {latest_log.pain_level}. High pain can be challenging.")
-            if latest_log.stress_level > 6:
-                insights.append(f"Stress Level: {latest_log.stress_level}. High stress affects your well-being.")
-            if latest_log.sleep_hours < 7:
-                insights.append(f"Sleep: {latest_log.sleep_hours} hours. Aim for 7-9 hours.")
-            if not latest_log.exercise_done:
+
+def analyze_window(user_id, window):
+    """
+    Build CHIIP's classification, insights and short-term trends from a user's recent logs.
+    When a trained forest is available, the flare-up insights name the features that raised the
+    model's predicted risk for the latest log (its per-feature contributions), strongest first.
+    """
+    from .ml.attributions import factor_insights, get_explainer, ranked_contributions
+    from .ml.feature_store import first_exercise_type
+    from .ml.model_registry import get_shadow
+    from .ml.trend_analysis import TrendAnalyzer
+
+    latest_log = window.latest()
+
+    # Determine flare-up based on conditions
+    flare = is_flare_up(latest_log['pain_level'], latest_log['stress_level'], latest_log['sleep_hours'],
+                        latest_log['exercise_done'], latest_log['took_medication'])
+
+    explainer = get_explainer(current_app._get_current_object())
+    attributions = None
+    if explainer is not None:
+        row = {**latest_log, "exercise_type": first_exercise_type(latest_log['exercise_type'])}
+        probabilities, contributions = explainer.explain([row])
+        attributions = {
+            "probability": round(float(probabilities[0]), 4),
+            "baseline": round(explainer.bias, 4),
+            "contributions": ranked_contributions(row, contributions[0])
+        }
+        shadow = get_shadow(current_app._get_current_object())
+        if shadow is not None:
+            shadow.submit(row, attributions['probability'])
+
+    insights = []
+    if flare:
+        insights.append("Your recent symptom logs indicate a potential flare-up. Please take care of yourself.")
+        if attributions is not None:
+            insights.extend(factor_insights(row, contributions[0]))
+        else:
+            if latest_log['pain_level'] > 5:
+                insights.append(f"Pain Level: {latest_log['pain_level']}. High pain can be challenging.")
+            if latest_log['stress_level'] > 6:
+                insights.append(f"Stress Level: {latest_log['stress_level']}. High stress affects your well-being.")
+            if latest_log['sleep_hours'] < 7:
+                insights.append(f"Sleep: {latest_log['sleep_hours']} hours. Aim for 7-9 hours.")
+            if not latest_log['exercise_done']:
                 insights.append("Exercise: Consider light activities to boost your energy.")
-            if not latest_log.took_medication:
+            if not latest_log['took_medication']:
                 insights.append("Medication: Ensure you're following your plan.")
-        else:
-            insights.append("Fantastic! You seem to be in remission. Keep up your healthy habits!")
+    else:
+        insights.append("Fantastic! You seem to be in remission. Keep up your healthy habits!")
+
+    analyzer = TrendAnalyzer(user_id, db.session)
+    analyzer.load_recent_data(window)
 
-        return jsonify({"classification": "flare" if flare else "remission", "insights": insights}), 200
+    return {
+        "classification": "flare" if flare else "remission",
+        "insights": insights,
+        "flare_risk": attributions,
+        "recent_trends": analyzer.analyze_recent_trends()
+    }
+
+# ---------------------- Live Updates ----------------------
+
+@bp.route('/live-updates', methods=['GET'])
+def live_updates():
+    """
+    Server-sent event stream of a user's changes, replacing polling of /bot-analysis and /symptom-logs.
+    Starts with the current analysis; then every committed log is sent as a "log" event (a
+    /symptom-logs row) followed by an "analysis" event (the /bot-analysis payload).
+    Streams are served by the process's LiveUpdateServer (an event loop, so they hold no request
+    thread); this route redirects EventSource clients there.
+    Query parameter: user_id.
+    """
+    user_id = request.args.get('user_id')
+
+    if not user_id:
+        return jsonify({"error": "User ID is required."}), 400
+
+    server = current_app.extensions.get('live_updates_server')
+    if server is None:
+        return jsonify({"error": "Live updates are disabled."}), 404
+    server.start()  # Another worker may be listening on the port even if this one could not
+
+    base_url = current_app.config['LIVE_UPDATES_PUBLIC_URL']
+    if not base_url:
+        host = request.host if request.host.endswith(']') else request.host.rsplit(':', 1)[0]  # Without the port
+        base_url = f"{request.scheme}://{host}:{server.port}"
+    return redirect(f"{base_url.rstrip('/')}/api/live-updates?{request.query_string.decode()}", code=307)
+
+# ---------------------- Population Analytics ----------------------
+
+@bp.route('/analytics', methods=['GET'])
+def analytics():
+    """
+    Population-level analytics answered from the precomputed rollups.
+    Optional query parameters: start, end (YYYY-MM-DD), cohort (YYYY-MM) and approximate (true/false).
+    """
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+    except ValueError:
+        return jsonify({"error": "Dates must be in YYYY-MM-DD format."}), 400
+
+    approximate = request.args.get('approximate', 'false').lower() in ('1', 'true', 'yes')
+
+    try:
+        cohort = request.args.get('cohort')
+        precision = current_app.config['ANALYTICS_HLL_PRECISION']
+        # Each shard keeps the rollups of its own users; their partial aggregates are merged
+        archive = get_archive()
+        partials = get_router().fan_out(
+            lambda session: RollupManager(session, precision=precision, archive=archive).collect(
+                start, end, cohort, approximate),
+            read_only=True)
+        summary = RollupManager.finalize(RollupManager.merge(partials), start, end, cohort, approximate)
+        return jsonify(summary), 200
 
     except Exception as e:
-        print(f"Error analyzing logs: {e}")
-        return jsonify({"error": f"Unable to analyze symptom logs ({str(e)})"}), 500
+        print(f"Error computing analytics: {e}")
+        return jsonify({"error": f"Unable to compute analytics ({str(e)})"}), 500
+
+
+# ---------------------- Flare-up Prediction ----------------------
+
+@bp.route('/predict-flare-up', methods=['POST'])
+def predict_flare_up():
+    """
+    Model-based flare-up probability for the user's latest log.
+    Concurrent requests are scored together by the inference micro-batcher.
+    """
+    data = request.get_json()
+    user_id = data.get('user_id')
+
+    if not user_id:
+        return jsonify({"error": "User ID is required."}), 400
+
+    try:
+        from .ml.batching import get_batcher
+        from .ml.model_registry import get_shadow
+
+        get_router().select(user_id)
+        route_reads(user_id)
+        latest_log = current_app.extensions['hot_window'].get(user_id, db.session).latest()
+        if not latest_log:
+            return jsonify({"error": "No symptom logs available for prediction."}), 404
+
+        batcher = get_batcher(current_app._get_current_object())
+        if batcher is None:
+            return jsonify({"error": "No trained model available."}), 503
+
+        features = {
+            "pain_level": latest_log['pain_level'],
+            "stress_level": latest_log['stress_level'],
+            "sleep_hours": latest_log['sleep_hours'],
+            "exercise_done": int(latest_log['exercise_done']),
+            "took_medication": int(latest_log['took_medication']),
+            "exercise_type": latest_log['exercise_type'].split(',')[0] if latest_log['exercise_type'] else None
+        }
+        try:
+            probability = batcher.predict_proba(features, timeout=current_app.config['INFERENCE_TIMEOUT'])
+        except FutureTimeoutError:
+            return jsonify({"error": "Prediction timed out; retry later."}), 503, {"Retry-After": "5"}
+
+        # The challenger model, if any, scores the same input in the background
+        shadow = get_shadow(current_app._get_current_object())
+        if shadow is not None:
+            shadow.submit(features, probability)
+        return jsonify({"flare_up": probability >= 0.5, "probability": round(probability, 4)}), 200
+
+    except Exception as e:
+        print(f"Error predicting flare-up: {e}")
+        return jsonify({"error": f"Unable to predict flare-up ({str(e)})"}), 500
+
+
+# ---------------------- Runtime Metrics ----------------------
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Runtime metrics of the backend's background components.
+    """
+    extensions = current_app.extensions
+    return jsonify({
+        "inference": extensions['inference_batcher'].metrics() if 'inference_batcher' in extensions else None,
+        "hot_window": extensions['hot_window'].metrics(),
+        "group_commit": extensions['group_commit_writer'].metrics() if 'group_commit_writer' in extensions else None,
+        "warmup": extensions['warmup'].metrics() if 'warmup' in extensions else None,
+        "replicas": extensions['replica_set'].metrics() if extensions['replica_set'].enabled else None,
+        "change_feed": extensions['change_feed'].metrics(),
+        "log_archive": extensions['log_archive'].metrics(),
+        "admission": extensions['admission'].metrics() if 'admission' in extensions else None,
+        "traffic_capture": extensions['traffic_recorder'].metrics() if 'traffic_recorder' in extensions else None,
+        "attributions": extensions['explainer'].metrics() if extensions.get('explainer') is not None else None,
+        "live_updates": extensions['live_updates'].metrics() if 'live_updates' in extensions else None,
+        "shadow": extensions['shadow_scorer'].metrics() if extensions.get('shadow_scorer') is not None else None
+    }), 200
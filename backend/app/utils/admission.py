@@ -0,0 +1,230 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from flask import g, jsonify, request
+from .metrics import Histogram
+
+MS_BUCKETS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+def upstream_wait(header, now=None):
+    """
+    Seconds a request spent queued before reaching the app, from a proxy's X-Request-Start header
+    ("t=<epoch>" in seconds, milliseconds or microseconds, as nginx and most routers send it).
+
+    Returns:
+        float: Seconds waited, 0.0 when the header is missing or malformed.
+    """
+    if not header:
+        return 0.0
+    try:
+        started = float(header.strip().removeprefix('t='))
+    except ValueError:
+        return 0.0
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max((now or time.time()) - started, 0.0)
+
+class TokenBucket:
+    """
+    Per-key token buckets: `rate` tokens per second up to `burst`, one token per request.
+    Only the `max_keys` most recently seen keys are tracked.
+    """
+
+    def __init__(self, rate, burst, max_keys=100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, monotonic time of the last update)
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """
+        Take a token for `key`.
+
+        Returns:
+            float: 0.0 if the request may proceed, otherwise seconds until a token is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+class EndpointLimiter:
+    """
+    Admission control for one endpoint. Up to `concurrency` requests run at once and up to `queue`
+    more wait in FIFO order; a request that would wait longer than `queue_ms` in total (including
+    the time it spent queued upstream) is shed instead of served late, and each user_id is held to
+    `rate` requests per second with bursts of `burst`. Rejecting early keeps the latency of the
+    accepted requests bounded when a spike would otherwise pile up behind the SQLite write lock.
+    """
+
+    def __init__(self, name, concurrency, queue=0, queue_ms=500.0, rate=0.0, burst=1):
+        """
+        Args:
+            name (str): Endpoint name, for metrics.
+            concurrency (int): Requests served at the same time.
+            queue (int): Requests allowed to wait for a slot; more are rejected at once.
+            queue_ms (float): Longest a request may wait for a slot (ms).
+            rate (float): Requests per second per user_id (0: no per-user limit).
+            burst (int): Requests a user_id may make at once before `rate` applies.
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.queue_ms = queue_ms
+        self.buckets = TokenBucket(rate, burst) if rate > 0 else None
+
+        self.in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+        self.queue_time = Histogram(MS_BUCKETS)
+        self.service_time = Histogram(MS_BUCKETS)
+
+    def _retry_after(self, waiting):
+        """
+        Whole seconds until a slot is likely free: mean service time per queued request ahead.
+        """
+        mean_ms = self.service_time.snapshot()['mean'] or self.queue_ms
+        return max(1, math.ceil(mean_ms / 1000 * (waiting + 1) / self.concurrency))
+
+    def _reject(self, reason, status, retry_after):
+        with self._lock:
+            self.rejected[reason] += 1
+        return status, reason, retry_after
+
+    def admit(self, user_id=None, waited=0.0):
+        """
+        Wait for a slot for one request.
+
+        Args:
+            user_id (str): The requesting user, for the per-user rate limit (None: not limited).
+            waited (float): Seconds the request already spent queued upstream.
+
+        Returns:
+            tuple: None if admitted (call `release` when done), else (HTTP status, reason, Retry-After seconds).
+        """
+        if self.buckets is not None and user_id is not None:
+            wait = self.buckets.take(user_id)
+            if wait:
+                return self._reject('rate_limited', 429, max(1, math.ceil(wait)))
+
+        budget = self.queue_ms / 1000 - waited
+        with self._lock:
+            if self.in_flight < self.concurrency and not self._waiters and budget > 0:
+                self.in_flight += 1
+                self.admitted += 1
+                self.queue_time.observe(waited * 1000)
+                return None
+            if budget <= 0:
+                self.rejected['queue_timeout'] += 1
+                return 503, 'queue_timeout', self._retry_after(len(self._waiters))
+            if len(self._waiters) >= self.queue:
+                self.rejected['queue_full'] += 1
+                return 503, 'queue_full', self._retry_after(len(self._waiters))
+            granted = threading.Event()
+            self._waiters.append(granted)
+
+        started = time.monotonic()
+        granted.wait(budget)
+        with self._lock:
+            if not granted.is_set():
+                self._waiters.remove(granted)
+                self.rejected['queue_timeout'] += 1
+                return 503, 'queue_timeout', self._retry_after(len(self._waiters))
+            self.admitted += 1  # The slot was handed over by `release`
+        self.queue_time.observe((waited + time.monotonic() - started) * 1000)
+        return None
+
+    def release(self, service_seconds):
+        """
+        Free the slot of an admitted request, handing it to the longest waiting one.
+        """
+        self.service_time.observe(service_seconds * 1000)
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self.in_flight -= 1
+
+    def metrics(self):
+        with self._lock:
+            counts = {"in_flight": self.in_flight, "waiting": len(self._waiters), "admitted": self.admitted,
+                      "rejected": dict(self.rejected)}
+        return {
+            **counts,
+            "limits": {"concurrency": self.concurrency, "queue": self.queue, "queue_ms": self.queue_ms,
+                       "rate": self.buckets.rate if self.buckets else None,
+                       "burst": self.buckets.burst if self.buckets else None},
+            "queue_ms": {**self.queue_time.snapshot(), "p99": self.queue_time.quantile(0.99)},
+            "service_ms": {**self.service_time.snapshot(), "p99": self.service_time.quantile(0.99)}
+        }
+
+class AdmissionController:
+    """
+    The endpoint limiters of an application (app.extensions['admission']).
+    """
+
+    def __init__(self, limits):
+        """
+        Args:
+            limits (dict): EndpointLimiter arguments per endpoint name (e.g. 'api.log_symptoms').
+        """
+        self.limiters = {endpoint: EndpointLimiter(endpoint, **options) for endpoint, options in limits.items()}
+
+    def metrics(self):
+        return {endpoint: limiter.metrics() for endpoint, limiter in self.limiters.items()}
+
+def _request_user_id():
+    if request.is_json:
+        data = request.get_json(silent=True)  # Cached for the view
+        return data.get('user_id') if isinstance(data, dict) else None
+    return request.args.get('user_id')
+
+def register_admission(app):
+    """
+    Admission control for the endpoints in ADMISSION_LIMITS (when ADMISSION_CONTROL_ENABLED).
+    Limits apply per process. Rejected requests get a JSON error with a Retry-After header:
+    429 when the user is over their rate, 503 when the endpoint is overloaded.
+
+    Args:
+        app (Flask): The application.
+    """
+    if not app.config['ADMISSION_CONTROL_ENABLED']:
+        return
+    controller = AdmissionController(app.config['ADMISSION_LIMITS'])
+    app.extensions['admission'] = controller
+
+    @app.before_request
+    def admit_request():
+        limiter = controller.limiters.get(request.endpoint)
+        if limiter is None:
+            return None
+        rejection = limiter.admit(_request_user_id(), upstream_wait(request.headers.get('X-Request-Start')))
+        if rejection is not None:
+            status, reason, retry_after = rejection
+            message = ("Too many requests for this user; retry later." if status == 429
+                       else "The server is busy; retry later.")
+            return jsonify({"error": message, "reason": reason}), status, {"Retry-After": str(retry_after)}
+        g.admission = (limiter, time.monotonic())
+        return None
+
+    @app.teardown_request
+    def release_request(exc):
+        admission = g.pop('admission', None)
+        if admission is not None:
+            limiter, started = admission
+            limiter.release(time.monotonic() - started)
@@ -0,0 +1,343 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+from .metrics import Histogram
+from .sharding import ShardedSession
+
+LOG_CREATED = 'symptom_log.created'
+
+# Columns of a symptom log carried in its change event
+LOG_FIELDS = ('user_id', 'pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'exercise_type',
+              'took_medication', 'logged_at')
+
+# ---------------------- Outbox ----------------------
+
+@event.listens_for(ShardedSession, 'after_flush')
+def _write_outbox(session, flush_context):
+    """
+    Append a change event for every symptom log inserted by this flush, in the same transaction
+    (and on the same shard) as the log itself.
+    """
+    if not has_app_context() or not current_app.config['CHANGE_FEED_ENABLED']:
+        return
+
+    from ..models import SymptomLog, ChangeEvent
+
+    created_at = datetime.utcnow()
+    events = [{
+        "topic": LOG_CREATED,
+        "entity_id": log.id,
+        "user_id": log.user_id,
+        "payload": json.dumps({field: getattr(log, field) for field in LOG_FIELDS}, default=str),
+        "created_at": created_at
+    } for log in session.new if isinstance(log, SymptomLog)]
+    if events:
+        session.execute(insert(ChangeEvent.__table__), events)
+
+def decode(row):
+    """
+    A change_feed row as an event dict, with its payload parsed (logged_at back to a datetime).
+    """
+    payload = json.loads(row['payload']) if row['payload'] else {}
+    if 'logged_at' in payload:
+        payload['logged_at'] = datetime.fromisoformat(payload['logged_at'])
+    return {"id": row['id'], "topic": row['topic'], "entity_id": row['entity_id'],
+            "user_id": row['user_id'], "payload": payload}
+
+# ---------------------- Consumers ----------------------
+
+class Consumer:
+    """
+    Base class of change feed consumers: set `name` and implement `handle`.
+
+    Delivery is at least once. `handle` receives batches in feed order, and the consumer's
+    offset is committed in the same transaction as whatever `handle` writes with the session
+    it is given, so database effects are applied exactly once. Side effects outside the
+    database must tolerate redelivery of a batch after a failure.
+    """
+
+    name = None
+    topics = (LOG_CREATED,)
+    durable = True  # Offsets kept in consumer_offsets; otherwise in memory, starting at the feed head
+
+    def handle(self, session, events):
+        """
+        Process a batch of events.
+
+        Args:
+            session (Session): Session on the shard the events come from.
+            events (list of dict): Events ordered by feed position (see `decode`).
+        """
+        raise NotImplementedError
+
+class HotWindowConsumer(Consumer):
+    """
+    Appends logs written by other processes to this process's hot windows, so multi-worker
+    deployments do not serve windows that miss another worker's writes, and pushes them to the
+    process's live update streams.
+    """
+
+    name = 'hot-window'
+    durable = False
+
+    def __init__(self, app):
+        self.app = app
+
+    def handle(self, session, events):
+        from ..models import SymptomLog
+
+        hot_window = self.app.extensions['hot_window']
+        live_updates = self.app.extensions.get('live_updates')
+        for change in events:
+            log = SymptomLog(id=change['entity_id'], **change['payload'])
+            hot_window.append(log)
+            if live_updates is not None:
+                live_updates.publish(log)
+
+class TrendRefreshConsumer(Consumer):
+    """
+    Stores a fresh trend analysis for every user with new logs.
+    """
+
+    name = 'trend-refresh'
+
+    def handle(self, session, events):
+        from ..ml.trend_analysis import TrendAnalyzer
+        from ..models import TrendAnalysis
+        from .db_utils import Repository
+
+        summaries = []
+        for user_id in dict.fromkeys(change['user_id'] for change in events):
+            analyzer = TrendAnalyzer(user_id, session)
+            analyzer.load_user_data()
+            summaries.append({"user_id": user_id, "analysis_summary": analyzer.analyze_trends(),
+                              "generated_at": datetime.utcnow()})
+        Repository(TrendAnalysis, session).insert_many(summaries)
+
+class PredictionScoringConsumer(Consumer):
+    """
+    Scores every new log with the flare-up model (one batch per poll) and stores the predictions.
+    """
+
+    name = 'prediction-scoring'
+
+    def __init__(self):
+        self.encoder = None
+
+    def handle(self, session, events):
+        from ..ml.feature_store import FeatureEncoder, first_exercise_type
+        from ..ml.predictor import FlareUpPredictor
+        from ..models import Prediction
+        from .db_utils import Repository
+
+        if self.encoder is None:
+            pipeline = FlareUpPredictor().pipeline
+            if pipeline is None:
+                raise RuntimeError("No trained model available.")
+            self.encoder = FeatureEncoder(pipeline)
+
+        probabilities = self.encoder.predict_proba([{
+            "pain_level": change['payload']['pain_level'],
+            "stress_level": change['payload']['stress_level'],
+            "sleep_hours": change['payload']['sleep_hours'],
+            "exercise_done": int(change['payload']['exercise_done']),
+            "took_medication": int(change['payload']['took_medication']),
+            "exercise_type": first_exercise_type(change['payload']['exercise_type'])
+        } for change in events])[:, 1]
+
+        predicted_at = datetime.utcnow()
+        Repository(Prediction, session).insert_many([{
+            "user_id": change['user_id'],
+            "prediction_result": "flare" if probability >= 0.5 else "remission",
+            "predicted_at": predicted_at,
+            "additional_info": json.dumps({"symptom_log_id": change['entity_id'],
+                                           "probability": round(float(probability), 4)})
+        } for change, probability in zip(events, probabilities)])
+
+def durable_consumers():
+    """
+    The consumers run by `flask consume-changes`, by name.
+    """
+    from ..ml.feature_store import FeatureStoreConsumer
+    return {consumer.name: consumer for consumer in (TrendRefreshConsumer(), PredictionScoringConsumer(),
+                                                     FeatureStoreConsumer())}
+
+# ---------------------- Polling ----------------------
+
+class ChangeFeed:
+    """
+    Polls the change_feed outbox of every shard and hands new events to consumers in batches.
+
+    Positions are the outbox's autoincrement IDs. They follow commit order because SQLite
+    serializes writers, so a consumer only ever needs the last position it processed.
+    """
+
+    def __init__(self, app, batch_size=100):
+        """
+        Args:
+            app (Flask): The application.
+            batch_size (int): Maximum events per `handle` call.
+        """
+        self.app = app
+        self.batch_size = batch_size
+        self._memory_offsets = {}  # (consumer, shard index) -> position, for non-durable consumers
+        self._listener = None
+        self._lock = threading.Lock()
+
+        self.delivered = {}
+        self.errors = {}
+        self.handle_ms = Histogram([1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000])
+
+    def _offset(self, session, consumer, index):
+        from ..models import ChangeEvent, ConsumerOffset
+
+        if consumer.durable:
+            return session.execute(select(ConsumerOffset.position)
+                                   .where(ConsumerOffset.consumer == consumer.name)).scalar() or 0
+        key = (consumer.name, index)
+        if key not in self._memory_offsets:
+            self._memory_offsets[key] = session.execute(select(func.max(ChangeEvent.id))).scalar() or 0
+        return self._memory_offsets[key]
+
+    def _store_offset(self, session, consumer, index, position):
+        from ..models import ConsumerOffset
+        from .db_utils import Repository
+
+        if consumer.durable:
+            Repository(ConsumerOffset, session).upsert_many(
+                [{"consumer": consumer.name, "position": position, "updated_at": datetime.utcnow()}],
+                keys=['consumer'])
+        else:
+            self._memory_offsets[(consumer.name, index)] = position
+
+    def poll(self, consumer):
+        """
+        Deliver at most one batch per shard to a consumer.
+
+        Returns:
+            int: Number of events delivered (0 when caught up or the batch failed).
+        """
+        from ..models import ChangeEvent
+        from .sharding import get_router
+
+        delivered = 0
+        for index, engine in enumerate(get_router().engines()):
+            with Session(bind=engine) as session:
+                offset = self._offset(session, consumer, index)
+                rows = session.execute(
+                    select(ChangeEvent.__table__)
+                    .where(ChangeEvent.id > offset, ChangeEvent.topic.in_(consumer.topics))
+                    .order_by(ChangeEvent.id)
+                    .limit(self.batch_size)
+                ).mappings().all()
+                if not rows:
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    consumer.handle(session, [decode(row) for row in rows])
+                    self._store_offset(session, consumer, index, rows[-1]['id'])
+                    session.commit()
+                except Exception as e:
+                    session.rollback()  # The batch is delivered again on the next poll
+                    self.errors[consumer.name] = self.errors.get(consumer.name, 0) + 1
+                    print(f"Error in change feed consumer {consumer.name}: {e}")
+                    continue
+
+                self.handle_ms.observe((time.perf_counter() - started) * 1000)
+                self.delivered[consumer.name] = self.delivered.get(consumer.name, 0) + len(rows)
+                delivered += len(rows)
+        return delivered
+
+    def drain(self, consumer):
+        """
+        Poll until the consumer has caught up (or a batch fails).
+
+        Returns:
+            int: Number of events delivered.
+        """
+        total = 0
+        while True:
+            delivered = self.poll(consumer)
+            total += delivered
+            if delivered == 0:
+                return total
+
+    def prune(self, retain_days=7):
+        """
+        Delete events older than `retain_days` that every durable consumer has processed. A durable
+        consumer without a stored offset has not processed anything yet, so nothing is deleted
+        until it has.
+
+        Returns:
+            int: Number of events deleted.
+        """
+        from ..models import ChangeEvent, ConsumerOffset
+        from .sharding import get_router
+
+        cutoff = datetime.utcnow() - timedelta(days=retain_days)
+        consumers = set(durable_consumers())
+        deleted = 0
+        for engine in get_router().engines():
+            with Session(bind=engine) as session:
+                offsets = dict(session.execute(select(ConsumerOffset.consumer, ConsumerOffset.position)).all())
+                processed = min([offsets.get(name, 0) for name in consumers] + list(offsets.values()))
+                result = session.execute(delete(ChangeEvent)
+                                         .where(ChangeEvent.id <= processed, ChangeEvent.created_at < cutoff))
+                session.commit()
+                deleted += result.rowcount
+        return deleted
+
+    # ---------------------- In-process listener ----------------------
+
+    def _listen(self, consumer, interval):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.drain(consumer)
+                except Exception as e:
+                    print(f"Error polling the change feed: {e}")
+                time.sleep(interval)
+
+    def start_listener(self):
+        """
+        Start this process's hot window listener (once per process; threads do not survive a fork).
+        """
+        interval = self.app.config['CHANGE_FEED_POLL_SECONDS']
+        if not interval or not self.app.config['CHANGE_FEED_ENABLED']:
+            return
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._memory_offsets = {}
+                self._listener = threading.Thread(target=self._listen, args=(HotWindowConsumer(self.app), interval),
+                                                  name='change-feed-listener', daemon=True)
+                self._listener.start()
+
+    def metrics(self):
+        return {
+            "batch_size": self.batch_size,
+            "delivered": dict(self.delivered),
+            "errors": dict(self.errors),
+            "listening": self._listener is not None and self._listener.is_alive(),
+            "handle_ms": self.handle_ms.snapshot()
+        }
+
+def register_change_feed(app):
+    """
+    Create the app's ChangeFeed and start the hot window listener with each process's first request.
+
+    Args:
+        app (Flask): The application.
+    """
+    feed = ChangeFeed(app, batch_size=app.config['CHANGE_FEED_BATCH_SIZE'])
+    app.extensions['change_feed'] = feed
+
+    @app.before_request
+    def start_change_feed_listener():
+        feed.start_listener()
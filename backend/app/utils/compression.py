@@ -0,0 +1,60 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional dependency; only gzip is offered without it
+    brotli = None
+
+def choose_encoding(accept_encodings):
+    """
+    Best supported content coding the client accepts (brotli preferred), or None.
+
+    Args:
+        accept_encodings (Accept): The request's parsed Accept-Encoding header.
+
+    Returns:
+        str: 'br', 'gzip' or None.
+    """
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level)
+
+def register_compression(app):
+    """
+    Compress large responses with gzip or brotli, negotiated from Accept-Encoding.
+    Only buffered responses of at least COMPRESS_MIN_BYTES with a compressible type are touched.
+
+    Args:
+        app (Flask): The application.
+    """
+    min_bytes = app.config['COMPRESS_MIN_BYTES']
+    mimetypes = set(app.config['COMPRESS_MIMETYPES'])
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+                or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+                or response.mimetype not in mimetypes):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+
+        response.set_data(compress(data, encoding, gzip_level=app.config['COMPRESS_GZIP_LEVEL'],
+                                   brotli_quality=app.config['COMPRESS_BROTLI_QUALITY']))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -1,111 +1,200 @@
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from ..models import User, SymptomLog, Prediction, TrendAnalysis
-from .. import db
+from .sharding import get_router
 
-def add_record(record, db_session: Session):
-    """
-    Add a new record to the database.
-
-    Args:
-        record (db.Model): An instance of a SQLAlchemy model representing the record to add.
-        db_session (Session): SQLAlchemy session for database interactions.
+IN_CLAUSE_CHUNK = 500  # user_ids per IN (...) list, below SQLite's bound parameter limit
 
-    Returns:
-        bool: True if the record is successfully added, False otherwise.
+class Repository:
     """
-    try:
-        db_session.add(record)
-        db_session.commit()
-        print(f"Record successfully added: {record}")
-        return True
-    except SQLAlchemyError as e:
-        db_session.rollback()
-        print(f"Error adding record: {e}")
-        return False
+    Set-based data access for one model: bulk insert, upsert, delete and fetch-many by `user_id`.
 
-def get_user_by_id(user_id, db_session: Session):
+    Every operation is a Core statement executed once per batch (`executemany` for inserts and
+    upserts), so no ORM objects are built, flushed or hydrated. Nothing is committed here: the
+    statements join the session's current transaction and the caller decides when to commit
+    (see UnitOfWork). Rows and user IDs are grouped by shard, so one call may touch several shards.
     """
-    Get a user by ID.
-
-    Args:
-        user_id (int): The ID of the user to retrieve.
-        db_session (Session): SQLAlchemy session for database interactions.
-
-    Returns:
-        User or None: The User object if found, otherwise None.
-    """
-    try:
-        user = db_session.query(User).get(user_id)
-        if user:
-            print(f"User found: {user}")
-        else:
-            print(f"No user found with ID: {user_id}")
-        return user
-    except SQLAlchemyError as e:
-        print(f"Error retrieving user with ID {user_id}: {e}")
-        return None
 
-def get_symptom_logs_by_user(user_id, db_session: Session):
+    def __init__(self, model, db_session: Session):
+        """
+        Args:
+            model (db.Model): The mapped model whose table is accessed.
+            db_session (Session): Session whose transaction the statements join.
+        """
+        self.table = model.__table__
+        self.db_session = db_session
+        self.user_column = self.table.c.get('user_id')
+
+    def _by_shard(self, items, user_id):
+        """
+        Yield (shard bind key, items) groups, with the shard selected while each group is handled.
+        """
+        router = get_router()
+        if self.user_column is None or not router.enabled:
+            yield None, list(items)
+            return
+        for shard, group in router.partition(items, user_id).items():
+            with router.scoped(shard=shard):
+                yield shard, group
+
+    def insert_many(self, rows):
+        """
+        Insert rows with one executemany per shard.
+
+        Args:
+            rows (list of dict): Column values; omitted columns get their defaults.
+
+        Returns:
+            int: Number of rows inserted.
+        """
+        for _, group in self._by_shard(rows, lambda row: row['user_id']):
+            if group:
+                self.db_session.execute(insert(self.table), group)
+        return len(rows)
+
+    def upsert_many(self, rows, keys=None, update_columns=None):
+        """
+        Insert rows, updating the existing row instead when one with the same key exists
+        (INSERT ... ON CONFLICT DO UPDATE, SQLite and PostgreSQL).
+
+        Args:
+            rows (list of dict): Column values, all with the same columns.
+            keys (list of str, optional): Columns of the unique constraint to match on (default: primary key).
+            update_columns (list of str, optional): Columns overwritten on conflict (default: every non-key column
+                given; an empty list keeps existing rows unchanged, ON CONFLICT DO NOTHING).
+
+        Returns:
+            int: Number of rows inserted or updated.
+        """
+        if not rows:
+            return 0
+        keys = keys or [column.name for column in self.table.primary_key]
+        if update_columns is None:
+            update_columns = [name for name in rows[0] if name not in keys]
+
+        for _, group in self._by_shard(rows, lambda row: row['user_id']):
+            dialect = self.db_session.get_bind().dialect.name
+            if dialect == 'sqlite':
+                statement = sqlite.insert(self.table)
+            elif dialect == 'postgresql':
+                statement = postgresql.insert(self.table)
+            else:
+                raise NotImplementedError(f"upsert_many does not support the {dialect} dialect")
+
+            if update_columns:
+                statement = statement.on_conflict_do_update(
+                    index_elements=keys, set_={name: statement.excluded[name] for name in update_columns})
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=keys)
+            self.db_session.execute(statement, group)
+        return len(rows)
+
+    def delete_many(self, user_ids):
+        """
+        Delete every row belonging to the given users.
+
+        Args:
+            user_ids (list of str): The users whose rows are deleted.
+
+        Returns:
+            int: Number of rows deleted.
+        """
+        deleted = 0
+        for _, group in self._by_shard(user_ids, lambda user_id: user_id):
+            for start in range(0, len(group), IN_CLAUSE_CHUNK):
+                result = self.db_session.execute(
+                    delete(self.table).where(self.user_column.in_(group[start:start + IN_CLAUSE_CHUNK])))
+                deleted += result.rowcount
+        return deleted
+
+    def fetch_many(self, user_ids, columns=None, order_by=None):
+        """
+        Fetch the rows of several users as plain mappings (no ORM objects).
+
+        Args:
+            user_ids (list of str): The users whose rows are fetched.
+            columns (list of str, optional): Columns to select (default: all).
+            order_by (list of str, optional): Sort columns, applied within each IN (...) chunk.
+
+        Returns:
+            list of dict: One mapping per row, grouped by shard and chunk.
+        """
+        selected = [self.table.c[name] for name in columns] if columns else [self.table]
+        order = [self.table.c[name] for name in order_by or ()]
+
+        rows = []
+        for _, group in self._by_shard(user_ids, lambda user_id: user_id):
+            for start in range(0, len(group), IN_CLAUSE_CHUNK):
+                statement = (select(*selected)
+                             .where(self.user_column.in_(group[start:start + IN_CLAUSE_CHUNK]))
+                             .order_by(*order))
+                rows.extend(self.db_session.execute(statement).mappings().all())
+        return rows
+
+class UnitOfWork:
     """
-    Get all symptom logs for a specific user.
+    Transaction boundary for repository calls: a single commit when the block exits normally,
+    a rollback when it raises (the exception is re-raised).
 
-    Args:
-        user_id (int): The ID of the user whose logs to retrieve.
-        db_session (Session): SQLAlchemy session for database interactions.
-
-    Returns:
-        list: A list of SymptomLog objects, or an empty list if none are found.
+    Example:
+        with UnitOfWork(db.session) as uow:
+            uow.repository(User).upsert_many(users, keys=['user_id'])
+            uow.repository(SymptomLog).insert_many(logs)
     """
-    try:
-        symptom_logs = db_session.query(SymptomLog).filter_by(user_id=user_id).all()
-        print(f"Found {len(symptom_logs)} symptom logs for user {user_id}")
-        return symptom_logs
-    except SQLAlchemyError as e:
-        print(f"Error retrieving symptom logs for user {user_id}: {e}")
-        return []
-
-def update_record(record, db_session: Session):
-    """
-    Update an existing record in the database.
-
-    Args:
-        record (db.Model): An instance of a SQLAlchemy model representing the record to update.
-        db_session (Session): SQLAlchemy session for database interactions.
 
-    Returns:
-        bool: True if the record is successfully updated, False otherwise.
-    """
-    try:
-        db_session.commit()
-        print(f"Record successfully updated: {record}")
-        return True
-    except SQLAlchemyError as e:
-        db_session.rollback()
-        print(f"Error updating record: {e}")
+    def __init__(self, db_session: Session):
+        """
+        Args:
+            db_session (Session): SQLAlchemy session for database interactions.
+        """
+        self.db_session = db_session
+        self._repositories = {}
+
+    def repository(self, model):
+        """
+        The Repository for a model, bound to this unit of work's session.
+        """
+        if model not in self._repositories:
+            self._repositories[model] = Repository(model, self.db_session)
+        return self._repositories[model]
+
+    def commit(self):
+        self.db_session.commit()
+
+    def rollback(self):
+        self.db_session.rollback()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+            print(f"Error in unit of work, rolled back: {exc_value}")
         return False
 
-def delete_record(record, db_session: Session):
+def schema_ddl(metadata, dialect=None):
     """
-    Delete a record from the database.
+    CREATE TABLE and CREATE INDEX statements for every table of `metadata`, in dependency order.
+    The same models always give the same text, so it doubles as a schema fingerprint.
 
     Args:
-        record (db.Model): An instance of a SQLAlchemy model representing the record to delete.
-        db_session (Session): SQLAlchemy session for database interactions.
+        metadata (MetaData): The models' metadata (`db.metadata`).
+        dialect (Dialect): SQL dialect to compile for (default: SQLite).
 
     Returns:
-        bool: True if the record is successfully deleted, False otherwise.
+        str: The statements, each ending with a semicolon.
     """
-    try:
-        db_session.delete(record)
-        db_session.commit()
-        print(f"Record successfully deleted: {record}")
-        return True
-    except SQLAlchemyError as e:
-        db_session.rollback()
-        print(f"Error deleting record: {e}")
-        return False
-
-# Example usage:
-# db_session = scoped_session(db.session)
-# user = get_user_by_id(1, db_session)
+    from sqlalchemy.schema import CreateIndex, CreateTable
+
+    dialect = dialect or sqlite.dialect()
+    statements = []
+    for table in metadata.sorted_tables:
+        statements.append(CreateTable(table, if_not_exists=True))
+        statements.extend(CreateIndex(index, if_not_exists=True)
+                          for index in sorted(table.indexes, key=lambda index: index.name))
+    compiled = (str(statement.compile(dialect=dialect)).strip() for statement in statements)
+    return "".join("\n".join(line.rstrip().replace('\t', '    ') for line in sql.splitlines()) + ";\n\n"
+                   for sql in compiled)
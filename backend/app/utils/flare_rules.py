@@ -0,0 +1,46 @@
+import numpy as np
+
+def is_flare_up(pain_level, stress_level, sleep_hours, exercise_done, took_medication):
+    """
+    Rule-based flare-up classification used across the API and analytics.
+
+    Args:
+        pain_level (int): Pain level (1-10).
+        stress_level (int): Stress level (1-10).
+        sleep_hours (float): Hours slept.
+        exercise_done (bool): Whether the user exercised.
+        took_medication (bool): Whether the user took their medication.
+
+    Returns:
+        bool: True if the log indicates a flare-up.
+    """
+    return (
+            pain_level >= 7 or
+            (pain_level >= 5 and (sleep_hours < 7 or not took_medication or stress_level > 5)) or
+            (pain_level >= 2 and sum([
+                sleep_hours < 7,
+                not took_medication,
+                not exercise_done,
+                stress_level > 6
+            ]) >= 3)
+    )
+
+def flare_up_mask(pain_level, stress_level, sleep_hours, exercise_done, took_medication):
+    """
+    Vectorized version of `is_flare_up` over NumPy arrays or pandas Series.
+
+    Returns:
+        np.ndarray: Boolean array, True where the log indicates a flare-up.
+    """
+    pain_level = np.asarray(pain_level)
+    stress_level = np.asarray(stress_level)
+    short_sleep = np.asarray(sleep_hours) < 7
+    missed_medication = ~np.asarray(took_medication, dtype=bool)
+    no_exercise = ~np.asarray(exercise_done, dtype=bool)
+
+    risk_factors = (short_sleep.astype(int) + missed_medication + no_exercise + (stress_level > 6))
+    return (
+            (pain_level >= 7) |
+            ((pain_level >= 5) & (short_sleep | missed_medication | (stress_level > 5))) |
+            ((pain_level >= 2) & (risk_factors >= 3))
+    )
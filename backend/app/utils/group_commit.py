@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from .metrics import Histogram
+
+class GroupCommitWriter:
+    """
+    Coalesces concurrent symptom log writes into shared transactions.
+    Requests enqueue their rows and wait; a single writer thread commits everything queued
+    within `max_wait_ms` (or up to `max_rows`) in one transaction per shard, then acknowledges
+    each request once its transaction is durable. With SQLite this turns one fsync per log into
+    one per group and removes write-lock contention between requests.
+    """
+
+    def __init__(self, app, max_rows=100, max_wait_ms=5.0):
+        """
+        Args:
+            app (Flask): The application; the writer runs in its own app context and session.
+            max_rows (int): Maximum logs per transaction.
+            max_wait_ms (float): Longest the first queued log waits for others to join its group.
+        """
+        self.app = app
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+
+        self.batch_sizes = Histogram([1, 2, 5, 10, 20, 50, 100, 200, 500])
+        self.wait_ms = Histogram([1, 2, 5, 10, 20, 50, 100, 200, 500, 1000])
+        self.commit_ms = Histogram([1, 2, 5, 10, 20, 50, 100, 200, 500])
+
+        self._worker = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+        self._worker.start()
+
+    def submit(self, fields, cohort):
+        """
+        Queue one log for the next group commit.
+
+        Args:
+            fields (dict): SymptomLog column values.
+            cohort (str): Cohort of the user, for the analytics rollups.
+
+        Returns:
+            Future: Resolves to a transient copy of the committed SymptomLog once durable.
+        """
+        if self._closed:
+            raise RuntimeError("GroupCommitWriter is closed")
+
+        future = Future()
+        self._queue.put((fields, cohort, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch = self._collect()
+                stop = any(item is None for item in batch)
+                self._commit([item for item in batch if item is not None])
+                if stop:
+                    return
+
+    def _write(self, batch):
+        """
+        Add a group of logs (and their rollup updates) to the session and commit once.
+        """
+        from .. import db
+        from ..models import SymptomLog
+        from ..analytics.rollups import RollupManager
+
+        logs = [SymptomLog(**fields) for fields, _, _, _ in batch]
+        db.session.add_all(logs)
+        if self.app.config['ANALYTICS_INCREMENTAL_ROLLUPS']:
+            rollups = RollupManager(db.session, precision=self.app.config['ANALYTICS_HLL_PRECISION'])
+            for log, (_, cohort, _, _) in zip(logs, batch):
+                rollups.record_log(log, cohort)
+        db.session.flush()
+        ids = [log.id for log in logs]
+        db.session.commit()
+
+        # Hand back transient copies: the committed instances are expired and bound to this thread's session
+        return [SymptomLog(id=log_id, **fields) for log_id, (fields, _, _, _) in zip(ids, batch)]
+
+    def _commit(self, batch):
+        from .. import db
+        from .sharding import get_router
+
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        router = get_router()
+        results = []
+        # One transaction per shard touched by the group
+        for shard, items in router.partition(batch, lambda item: item[0]['user_id']).items():
+            with router.scoped(shard=shard):
+                try:
+                    results.extend((item, log, None) for item, log in zip(items, self._write(items)))
+                except Exception:
+                    db.session.rollback()
+                    # Commit the rows one by one so a single bad row cannot fail the whole group
+                    for item in items:
+                        try:
+                            results.append((item, self._write([item])[0], None))
+                        except Exception as e:
+                            db.session.rollback()
+                            results.append((item, None, e))
+                finally:
+                    db.session.remove()
+
+        finished = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        self.commit_ms.observe((finished - started) * 1000)
+
+        for (_, _, future, enqueued), log, error in results:
+            self.wait_ms.observe((finished - enqueued) * 1000)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(log)
+
+    def close(self):
+        """
+        Stop accepting logs; everything already queued is still committed.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join()
+
+    def metrics(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_rows": self.max_rows,
+            "max_wait_ms": self.max_wait * 1000,
+            "commit_batch_size": self.batch_sizes.snapshot(),
+            "ack_wait_ms": self.wait_ms.snapshot(),
+            "commit_ms": self.commit_ms.snapshot()
+        }
+
+_writer_lock = threading.Lock()
+
+def get_writer(app):
+    """
+    The app's shared GroupCommitWriter, started on first use.
+
+    Args:
+        app (Flask): The application (settings come from GROUP_COMMIT_* config values).
+
+    Returns:
+        GroupCommitWriter: The writer.
+    """
+    writer = app.extensions.get('group_commit_writer')
+    if writer is None:
+        with _writer_lock:
+            if 'group_commit_writer' not in app.extensions:
+                app.extensions['group_commit_writer'] = GroupCommitWriter(
+                    app,
+                    max_rows=app.config['GROUP_COMMIT_MAX_ROWS'],
+                    max_wait_ms=app.config['GROUP_COMMIT_MAX_WAIT_MS']
+                )
+            writer = app.extensions['group_commit_writer']
+    return writer
@@ -0,0 +1,268 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)  # Logs store naive UTC datetimes
+
+class LogRing:
+    """
+    Fixed-capacity ring buffer of a user's most recent symptom logs, stored column-wise in NumPy arrays.
+    `version` increases on every append so derived results can be memoized per window state, and
+    `last_id` is the newest log ID seen, so redelivered logs can be recognised. Appends (serialized
+    by HotWindowCache) and readers do not share a lock: `version` is odd while an append is in
+    progress, so `memoize` can tell a result read across an append from a consistent one.
+    """
+
+    __slots__ = ('capacity', 'size', 'head', 'version', 'last_id', 'logged_at', 'pain_level', 'stress_level',
+                 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type', 'memo')
+
+    # Bytes per slot: float64 + 2 * int8 + float32 + 2 * bool + one object reference
+    slot_bytes = 8 + 2 + 4 + 2 + 8
+    overhead_bytes = 1024
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = 0
+        self.head = 0  # Next slot to write
+        self.version = 0
+        self.last_id = 0
+        self.logged_at = np.zeros(capacity, dtype=np.float64)  # POSIX seconds
+        self.pain_level = np.zeros(capacity, dtype=np.int8)
+        self.stress_level = np.zeros(capacity, dtype=np.int8)
+        self.sleep_hours = np.zeros(capacity, dtype=np.float32)
+        self.exercise_done = np.zeros(capacity, dtype=bool)
+        self.took_medication = np.zeros(capacity, dtype=bool)
+        self.exercise_type = [None] * capacity
+        self.memo = {}
+
+    @property
+    def nbytes(self):
+        return self.overhead_bytes + self.capacity * self.slot_bytes
+
+    def append(self, logged_at, pain_level, stress_level, sleep_hours, exercise_done, exercise_type, took_medication,
+               log_id=None):
+        """
+        Add one log (oldest entry is overwritten once the ring is full).
+        """
+        self.version += 1  # Odd: append in progress
+        slot = self.head
+        self.logged_at[slot] = (logged_at - EPOCH).total_seconds() if isinstance(logged_at, datetime) else logged_at
+        self.pain_level[slot] = pain_level
+        self.stress_level[slot] = stress_level
+        self.sleep_hours[slot] = sleep_hours
+        self.exercise_done[slot] = bool(exercise_done)
+        self.took_medication[slot] = bool(took_medication)
+        self.exercise_type[slot] = exercise_type or None
+
+        self.head = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        if log_id is not None:
+            self.last_id = max(self.last_id, log_id)
+        self.memo.clear()
+        self.version += 1
+
+    def _order(self):
+        """
+        Slot indices from oldest to newest.
+        """
+        start = (self.head - self.size) % self.capacity
+        return (start + np.arange(self.size)) % self.capacity
+
+    def __len__(self):
+        return self.size
+
+    def latest(self):
+        """
+        The newest log as a dict, or None when the ring is empty.
+        """
+        if not self.size:
+            return None
+        slot = (self.head - 1) % self.capacity
+        return {
+            "logged_at": EPOCH + timedelta(seconds=float(self.logged_at[slot])),
+            "pain_level": int(self.pain_level[slot]),
+            "stress_level": int(self.stress_level[slot]),
+            "sleep_hours": round(float(self.sleep_hours[slot]), 2),
+            "exercise_done": bool(self.exercise_done[slot]),
+            "exercise_type": self.exercise_type[slot],
+            "took_medication": bool(self.took_medication[slot])
+        }
+
+    def to_frame(self):
+        """
+        The window as a DataFrame ordered oldest to newest (same columns as TrendAnalyzer data).
+        """
+        import pandas as pd
+
+        order = self._order()
+        return pd.DataFrame({
+            "logged_at": pd.to_datetime(self.logged_at[order], unit='s'),
+            "pain_level": self.pain_level[order].astype(int),
+            "stress_level": self.stress_level[order].astype(int),
+            "sleep_hours": self.sleep_hours[order].astype(float).round(2),
+            "exercise_done": self.exercise_done[order],
+            "took_medication": self.took_medication[order],
+            "exercise_type": [self.exercise_type[slot] for slot in order]
+        })
+
+    def memoize(self, key, compute, attempts=3):
+        """
+        Return `compute()` cached until the next append. A result is only cached (and only served
+        from the cache) for the window version it was computed from. When a log is appended while
+        computing, the result may miss it or mix both states, so it is computed again (up to
+        `attempts` times; the last result is returned without being cached).
+        """
+        cached = self.memo.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        for _ in range(attempts):
+            version = self.version
+            result = compute()
+            if version % 2 == 0 and self.version == version:
+                self.memo[key] = (version, result)
+                return result
+        return result
+
+class HotWindowCache:
+    """
+    Per-user in-memory windows of the last N symptom logs, with a global memory cap and LRU eviction.
+    Windows are appended to on write and filled lazily from the database on a miss, so bot analysis,
+    insights and short-term trends can be served without touching SQLite.
+    """
+
+    def __init__(self, window_size=30, max_bytes=64 * 1024 * 1024, archive=None):
+        """
+        Args:
+            window_size (int): Number of recent logs kept per user.
+            max_bytes (int): Approximate memory cap across all windows.
+            archive (LogArchive, optional): Archived months, read when the hot table holds fewer logs than a window.
+        """
+        self.window_size = window_size
+        self.max_bytes = max_bytes
+        self.archive = archive
+        self._windows = OrderedDict()
+        self._fills = {}  # user_id -> in-flight lazy fills: {"count", "appended" rows, "stale"}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_windows(self):
+        return max(1, self.max_bytes // (LogRing.overhead_bytes + self.window_size * LogRing.slot_bytes))
+
+    def get(self, user_id, db_session):
+        """
+        The user's window, loading it from the database on a miss.
+
+        Args:
+            user_id (str): The user's ID.
+            db_session (Session): Session used for the lazy fill.
+
+        Returns:
+            LogRing: The user's window (possibly empty).
+        """
+        with self._lock:
+            ring = self._windows.get(user_id)
+            if ring is not None:
+                self._windows.move_to_end(user_id)
+                self.hits += 1
+                return ring
+            self.misses += 1
+            # Logs committed while the fill reads the database are recorded here instead of being skipped
+            fill = self._fills.setdefault(user_id, {"count": 0, "appended": [], "stale": False})
+            fill["count"] += 1
+
+        try:
+            ring = self._load(user_id, db_session)
+        except Exception:
+            with self._lock:
+                self._end_fill(user_id, fill)
+            raise
+
+        with self._lock:
+            self._end_fill(user_id, fill)
+            # Another request may have filled (and appended to) the window meanwhile; keep that one
+            existing = self._windows.get(user_id)
+            if existing is not None:
+                self._windows.move_to_end(user_id)
+                return existing
+            # The read may predate logs appended during the fill; those newer than it are added now
+            for row in sorted(fill["appended"], key=lambda row: row[-1] or 0):
+                self._append_row(ring, row)
+            if fill["stale"]:
+                return ring  # Invalidated while loading: serve this read but do not cache it
+            self._windows[user_id] = ring
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+                self.evictions += 1
+        return ring
+
+    def _end_fill(self, user_id, fill):
+        fill["count"] -= 1
+        if fill["count"] == 0 and self._fills.get(user_id) is fill:
+            del self._fills[user_id]
+
+    def _load(self, user_id, db_session):
+        from .log_archive import user_logs
+
+        rows = user_logs(db_session, user_id, newest_first=True, limit=self.window_size, archive=self.archive)
+
+        ring = LogRing(self.window_size)
+        for row in reversed(rows):
+            ring.append(*row)
+        return ring
+
+    def append(self, log):
+        """
+        Write-through for a committed log. Users without a cached window are skipped;
+        their window is loaded (including this log) on the next read. While a window is
+        being filled the log is recorded and added to it before it is cached. Logs the window
+        already holds (by ID) are ignored, so the same log may be delivered more than once.
+
+        Args:
+            log (SymptomLog): The committed log.
+        """
+        user_id = log.user_id
+        with self._lock:
+            if user_id not in self._windows and user_id not in self._fills:
+                return  # A fill that starts later reads this log from the database
+
+        # Read once, in the caller's thread: the log may be expired or detached by the time a fill ends
+        row = (log.logged_at, log.pain_level, log.stress_level, log.sleep_hours,
+               log.exercise_done, log.exercise_type, log.took_medication, log.id)
+        with self._lock:
+            fill = self._fills.get(user_id)
+            if fill is not None:
+                fill["appended"].append(row)
+            ring = self._windows.get(user_id)
+            if ring is not None:
+                self._append_row(ring, row)
+
+    @staticmethod
+    def _append_row(ring, row):
+        """
+        Append a row in HISTORY_COLUMNS order unless the ring already holds its log (by ID).
+        """
+        log_id = row[-1]
+        if log_id is None or log_id > ring.last_id:
+            ring.append(*row)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._windows.pop(user_id, None)
+            if user_id in self._fills:
+                self._fills[user_id]["stale"] = True
+
+    def metrics(self):
+        with self._lock:
+            windows = len(self._windows)
+        return {
+            "windows": windows,
+            "max_windows": self.max_windows,
+            "approx_bytes": windows * (LogRing.overhead_bytes + self.window_size * LogRing.slot_bytes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
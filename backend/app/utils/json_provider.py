@@ -0,0 +1,54 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional dependency; the stdlib provider is used without it
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+    Encodes straight to bytes with native datetime (ISO 8601), dataclass and NumPy support, which is
+    several times faster than the stdlib encoder on large responses. Anything orjson cannot encode
+    goes through the default provider's `default` hook, so output stays compatible.
+    """
+
+    def _options(self):
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    @staticmethod
+    def _default(obj):
+        if hasattr(obj, 'item'):  # NumPy scalars orjson does not handle natively
+            return obj.item()
+        return DefaultJSONProvider.default(obj)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:  # Custom stdlib arguments (indent, cls, ...) need the stdlib encoder
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self._default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self._default, option=self._options()),
+                                        mimetype=self.mimetype)
+
+def configure_json(app):
+    """
+    Install the JSON provider selected by the JSON_PROVIDER setting.
+
+    Args:
+        app (Flask): The application.
+    """
+    if app.config['JSON_PROVIDER'] == 'orjson':
+        if orjson is None:
+            print("[DEBUG] orjson is not installed; using the default JSON provider.")
+            return
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,450 @@
+import asyncio
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from .flare_rules import is_flare_up
+from .metrics import Histogram
+
+class Subscription:
+    """
+    One connected event stream: a short buffer of frames waiting to be sent. A client that falls
+    behind loses its oldest frames, never the newest (each analysis supersedes the previous one).
+    """
+
+    def __init__(self, user_id, buffer=16):
+        self.user_id = user_id
+        self.frames = deque(maxlen=buffer)
+        self.dropped = 0
+        self.on_push = None  # Called after each push, e.g. to wake an event loop
+        self._ready = threading.Condition()
+
+    def push(self, frame):
+        with self._ready:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self._ready.notify()
+        if self.on_push is not None:
+            self.on_push()
+
+    def drain(self):
+        """
+        Every buffered frame, oldest first, without waiting.
+        """
+        with self._ready:
+            frames = list(self.frames)
+            self.frames.clear()
+            return frames
+
+    def next(self, timeout):
+        """
+        The next frame, or None when nothing arrived within `timeout` seconds.
+        """
+        with self._ready:
+            if not self.frames:
+                self._ready.wait(timeout)
+            return self.frames.popleft() if self.frames else None
+
+def sse_frame(event, data, event_id=None):
+    """
+    One server-sent event; `data` is already serialized JSON (a single line).
+    """
+    return (f"id: {event_id}\n" if event_id is not None else "") + f"event: {event}\ndata: {data}\n\n"
+
+def log_row(log):
+    """
+    A committed log in the format of /api/symptom-logs rows.
+    """
+    return {
+        "logged_at": log.logged_at.strftime('%Y-%m-%d %H:%M:%S'),
+        "pain_level": log.pain_level,
+        "stress_level": log.stress_level,
+        "sleep_hours": log.sleep_hours,
+        "exercise_done": log.exercise_done,
+        "exercise_type": log.exercise_type.split(',') if log.exercise_type else [],
+        "took_medication": log.took_medication,
+        "flare_up": 1 if is_flare_up(log.pain_level, log.stress_level, log.sleep_hours, log.exercise_done,
+                                     log.took_medication) else 0
+    }
+
+class LiveUpdateHub:
+    """
+    Pushes each user's new logs and fresh bot analysis to their open event streams, so the
+    frontend no longer re-requests /bot-analysis and /symptom-logs to see changes.
+
+    Committed logs are handed to one event thread per process. Logs of users without an open
+    stream are dropped at once. For the others, the thread recomputes the analysis once per user
+    (through the hot window's memo, so a later /bot-analysis is a cache hit) and serializes each
+    frame once. It then appends the frame to every stream of that user. The streams themselves
+    are served by a LiveUpdateServer, where an idle one costs a socket and no work at all. Logs
+    written by other processes arrive through the change feed listener (CHANGE_FEED_POLL_SECONDS).
+    """
+
+    def __init__(self, app, max_connections=1000, heartbeat_seconds=15.0, buffer=16):
+        """
+        Args:
+            app (Flask): The application.
+            max_connections (int): Open streams accepted by this process; further ones are refused (503).
+            heartbeat_seconds (float): Idle time after which a stream gets a comment line (detects closed clients
+                and keeps proxies from timing it out).
+            buffer (int): Frames kept for a client that reads slower than they are produced.
+        """
+        self.app = app
+        self.max_connections = max_connections
+        self.heartbeat_seconds = heartbeat_seconds
+        self.buffer = buffer
+
+        self._subscriptions = {}  # user_id -> set of Subscription
+        self._last_ids = {}  # user_id -> newest log ID published, while the user has streams
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        self.connections = 0
+        self.published = 0
+        self.frames_sent = 0
+        self.rejected = 0
+        self.fanout_ms = Histogram([0.5, 1, 2, 5, 10, 20, 50, 100, 200])
+
+    # ---------------------- Subscriptions ----------------------
+
+    def subscribe(self, user_id):
+        """
+        Open a stream for a user.
+
+        Returns:
+            Subscription: The stream's subscription, or None when the process is at max_connections.
+        """
+        with self._lock:
+            if self.connections >= self.max_connections:
+                self.rejected += 1
+                return None
+            subscription = Subscription(user_id, self.buffer)
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            self.connections += 1
+            # Threads do not survive a fork: start the event thread in the process that serves the stream
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='live-updates', daemon=True)
+                self._worker.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            streams = self._subscriptions.get(subscription.user_id)
+            if streams is None or subscription not in streams:
+                return
+            streams.discard(subscription)
+            self.connections -= 1
+            if not streams:
+                del self._subscriptions[subscription.user_id]
+                self._last_ids.pop(subscription.user_id, None)
+
+    def open(self, user_id):
+        """
+        Check the user and subscribe them, in an app context (it reads the database and may compute
+        the analysis, so it runs off the event loop).
+
+        Returns:
+            tuple: (status, error message or None, Subscription or None, first frame or None).
+        """
+        from .. import db
+        from ..models import User
+        from .replicas import route_reads
+        from .sharding import get_router
+
+        with self.app.app_context():
+            try:
+                get_router().select(user_id)
+                route_reads(user_id)
+                if not User.query.filter_by(user_id=user_id).first():
+                    return 404, "Invalid User ID.", None, None
+            except Exception as e:
+                print(f"Error opening live updates: {e}")
+                return 500, f"Unable to open live updates ({str(e)})", None, None
+            finally:
+                db.session.remove()
+
+            # Subscribed before the first analysis is built, so a log committed in between is not missed
+            subscription = self.subscribe(user_id)
+            if subscription is None:
+                return 503, "The server is busy; retry later.", None, None
+            try:
+                return 200, None, subscription, self.analysis_frame(user_id)
+            except Exception as e:
+                self.unsubscribe(subscription)
+                print(f"Error opening live updates: {e}")
+                return 500, f"Unable to open live updates ({str(e)})", None, None
+            finally:
+                db.session.remove()
+
+    # ---------------------- Publishing ----------------------
+
+    def publish(self, log):
+        """
+        Queue a committed log for its user's streams; returns at once (nothing is queued when
+        the user has no stream in this process).
+
+        Args:
+            log (SymptomLog): The committed log (read here, so the event thread never touches ORM objects).
+        """
+        if log.user_id in self._subscriptions:
+            self._events.put((log.user_id, log.id, log_row(log)))
+
+    def analysis_frame(self, user_id):
+        """
+        The user's current bot analysis as an "analysis" frame (None when they have no logs).
+        Needs an app context; the result is memoized in the hot window like /bot-analysis.
+        """
+        from .. import db
+        from ..routes import analyze_window
+        from .sharding import get_router
+
+        get_router().select(user_id)
+        window = self.app.extensions['hot_window'].get(user_id, db.session)
+        if not len(window):
+            return None
+        analysis = window.memoize('bot_analysis', lambda: analyze_window(user_id, window))
+        return sse_frame('analysis', self.app.json.dumps(analysis), window.last_id or None)
+
+    def _batch(self):
+        """
+        Block for the first log, then take whatever else is already queued, grouped by user.
+        """
+        events = [self._events.get()]
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        by_user = {}
+        for user_id, log_id, row in events:
+            by_user.setdefault(user_id, []).append((log_id, row))
+        return by_user
+
+    def _fan_out(self, user_id, logs):
+        with self._lock:
+            streams = list(self._subscriptions.get(user_id, ()))
+            last_id = self._last_ids.get(user_id, 0)
+            # The same log can arrive from the request and from the change feed
+            logs = sorted((log for log in logs if log[0] is None or log[0] > last_id), key=lambda log: log[0] or 0)
+            if streams and logs:
+                self._last_ids[user_id] = max(last_id, logs[-1][0] or 0)
+        if not streams or not logs:
+            return
+
+        frames = [sse_frame('log', self.app.json.dumps(row), log_id) for log_id, row in logs]
+        analysis = self.analysis_frame(user_id)
+        if analysis is not None:
+            frames.append(analysis)
+        for subscription in streams:
+            for frame in frames:
+                subscription.push(frame)
+        self.published += len(logs)
+        self.frames_sent += len(frames) * len(streams)
+
+    def _run(self):
+        from .. import db
+
+        with self.app.app_context():
+            while True:
+                by_user = self._batch()
+                started = time.perf_counter()
+                for user_id, logs in by_user.items():
+                    try:
+                        self._fan_out(user_id, logs)
+                    except Exception as e:
+                        print(f"Error publishing live updates: {e}")
+                    finally:
+                        db.session.remove()
+                self.fanout_ms.observe((time.perf_counter() - started) * 1000)
+
+    def metrics(self):
+        with self._lock:
+            users = len(self._subscriptions)
+            dropped = sum(subscription.dropped for streams in self._subscriptions.values() for subscription in streams)
+        return {
+            "connections": self.connections,
+            "max_connections": self.max_connections,
+            "users": users,
+            "queued": self._events.qsize(),
+            "published": self.published,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": dropped,
+            "rejected": self.rejected,
+            "fanout_ms": self.fanout_ms.snapshot()
+        }
+
+# ---------------------- Event loop server ----------------------
+
+class LiveUpdateServer:
+    """
+    Serves GET /api/live-updates?user_id=... from one asyncio event loop thread per process, so an
+    open stream holds a socket and its Subscription buffer instead of a WSGI worker thread, and a
+    gthread worker keeps all its threads for requests. The Flask route redirects EventSource
+    clients here. Every worker listens on the same port (SO_REUSEPORT, where available) and the
+    kernel spreads new streams over them.
+
+    Nothing slow runs on the loop: opening a stream (database checks and the first analysis) runs
+    in a small thread pool, and later analyses on the hub's event thread. Pushed frames wake the
+    loop with `call_soon_threadsafe`.
+    """
+
+    def __init__(self, hub, host='0.0.0.0', port=5001, open_threads=2):
+        """
+        Args:
+            hub (LiveUpdateHub): Publishes the frames.
+            host (str): Address to listen on.
+            port (int): Port to listen on (0: any free port, see `port` after `start`).
+            open_threads (int): Threads opening streams.
+        """
+        self.hub = hub
+        self.host = host
+        self.port = port
+        self.open_threads = open_threads
+        self.ready = threading.Event()
+        self.error = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self, timeout=5.0):
+        """
+        Start listening in a background thread (once per process; threads do not survive a fork).
+
+        Returns:
+            bool: Whether the server is listening.
+        """
+        if self._pid == os.getpid() and self.ready.is_set():
+            return self.error is None
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.ready = threading.Event()
+                self.error = None
+                self._pool = ThreadPoolExecutor(max_workers=self.open_threads, thread_name_prefix='live-updates-open')
+                threading.Thread(target=lambda: asyncio.run(self._serve()), name='live-updates-server',
+                                 daemon=True).start()
+        self.ready.wait(timeout)
+        return self.ready.is_set() and self.error is None
+
+    async def _serve(self):
+        try:
+            server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                reuse_port=hasattr(socket, 'SO_REUSEPORT'))
+        except OSError as e:
+            self.error = e
+            print(f"Error starting the live update server on port {self.port}: {e}")
+            self.ready.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with server:
+            await server.serve_forever()
+
+    @staticmethod
+    async def _respond(writer, status, reason, body=b'', content_type='application/json', headers=()):
+        lines = [f"HTTP/1.1 {status} {reason}", f"Content-Type: {content_type}", f"Content-Length: {len(body)}",
+                 "Access-Control-Allow-Origin: *", "Connection: close", *headers]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        subscription = None
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10)
+                method, target, _ = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                return
+            url = urlsplit(target)
+            if url.path != '/api/live-updates':
+                await self._respond(writer, 404, 'Not Found', b'{"error": "Not found."}')
+                return
+            if method == 'OPTIONS':
+                await self._respond(writer, 204, 'No Content', headers=("Access-Control-Allow-Methods: GET",
+                                                                        "Access-Control-Allow-Headers: *"))
+                return
+            user_id = parse_qs(url.query).get('user_id', [None])[0]
+            if method != 'GET' or not user_id:
+                await self._respond(writer, 400, 'Bad Request', b'{"error": "User ID is required."}')
+                return
+
+            loop = asyncio.get_running_loop()
+            status, error, subscription, first_frame = await loop.run_in_executor(self._pool, self.hub.open, user_id)
+            if subscription is None:
+                reasons = {404: 'Not Found', 503: 'Service Unavailable'}
+                body = self.hub.app.json.dumps({"error": error}).encode()
+                await self._respond(writer, status, reasons.get(status, 'Internal Server Error'), body,
+                                    headers=("Retry-After: 30",) if status == 503 else ())
+                return
+            await self._stream(reader, writer, subscription, first_frame)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if subscription is not None:
+                self.hub.unsubscribe(subscription)
+            writer.close()
+
+    async def _stream(self, reader, writer, subscription, first_frame):
+        # The body runs until either side closes the connection, so it needs no length or chunking
+        loop = asyncio.get_running_loop()
+        pushed = asyncio.Event()
+        subscription.on_push = lambda: loop.call_soon_threadsafe(pushed.set)
+        writer.write(("HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                      "X-Accel-Buffering: no\r\nAccess-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n"
+                      f"retry: {int(self.hub.heartbeat_seconds * 1000)}\n\n").encode())
+        if first_frame is not None:
+            writer.write(first_frame.encode())
+        await writer.drain()
+
+        closed = asyncio.ensure_future(reader.read())  # Completes when the client disconnects
+        try:
+            while True:
+                frames = subscription.drain()
+                if frames:
+                    writer.write(''.join(frames).encode())
+                    await writer.drain()
+                    continue
+                pushed.clear()
+                if subscription.frames:
+                    continue  # Pushed between the drain and the clear
+                waiter = asyncio.ensure_future(pushed.wait())
+                done, _ = await asyncio.wait({waiter, closed}, timeout=self.hub.heartbeat_seconds,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if closed in done:
+                    return
+                if not done:
+                    writer.write(b": keep-alive\n\n")
+                    await writer.drain()
+        finally:
+            closed.cancel()
+            subscription.on_push = None
+
+def register_live_updates(app):
+    """
+    Create the app's LiveUpdateHub (app.extensions['live_updates']) and LiveUpdateServer
+    (app.extensions['live_updates_server'], when LIVE_UPDATES_PORT is set) if LIVE_UPDATES_ENABLED.
+    Each process starts its server with its first request (see also gunicorn.conf.py). Without
+    a server, /api/live-updates answers 404 and the frontend falls back to requesting /bot-analysis.
+
+    Args:
+        app (Flask): The application.
+    """
+    if not app.config['LIVE_UPDATES_ENABLED']:
+        return
+    hub = LiveUpdateHub(app, max_connections=app.config['LIVE_UPDATES_MAX_CONNECTIONS'],
+                        heartbeat_seconds=app.config['LIVE_UPDATES_HEARTBEAT_SECONDS'], buffer=app.config['LIVE_UPDATES_BUFFER'])
+    app.extensions['live_updates'] = hub
+    if not app.config['LIVE_UPDATES_PORT']:
+        return
+    server = LiveUpdateServer(hub, host=app.config['LIVE_UPDATES_HOST'], port=app.config['LIVE_UPDATES_PORT'])
+    app.extensions['live_updates_server'] = server
+
+    @app.before_request
+    def start_live_update_server():
+        server.start(timeout=0)
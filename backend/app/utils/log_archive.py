@@ -0,0 +1,464 @@
+import os
+import threading
+from collections import OrderedDict
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import delete, func, insert, select, update
+
+# Columns returned by history queries, in order (`id` last, as the hot window expects)
+HISTORY_COLUMNS = ('logged_at', 'pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'exercise_type',
+                   'took_medication', 'id')
+
+# Every symptom_logs column, as stored in a partition file
+ARCHIVE_COLUMNS = ('id', 'user_id', 'pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'exercise_type',
+                   'took_medication', 'diet_notes', 'additional_notes', 'logged_at', 'timestamp')
+
+# Nullable text columns, stored dictionary-encoded
+TEXT_COLUMNS = ('user_id', 'exercise_type', 'diet_notes', 'additional_notes')
+
+def month_label(moment):
+    return moment.strftime('%Y-%m')
+
+def month_bounds(label):
+    """
+    First instant of a month ("2024-11") and of the month after it.
+    """
+    start = datetime.strptime(label, '%Y-%m')
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+def _encode_text(values):
+    vocabulary = {}
+    codes = np.fromiter((-1 if value is None else vocabulary.setdefault(value, len(vocabulary)) for value in values),
+                        dtype=np.int32, count=len(values))
+    return codes, np.array(list(vocabulary), dtype=str)
+
+def _decode_text(codes, vocabulary):
+    return np.array(vocabulary.tolist() + [None], dtype=object)[codes]  # Code -1 picks the trailing None
+
+# ---------------------- Cold Partitions ----------------------
+
+class ColdPartition:
+    """
+    The decompressed columns of one archived month, sorted by (user_id, logged_at, id):
+    one user's rows are a contiguous slice found by binary search.
+    """
+
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            self.columns = {name: data[name] for name in data.files}
+        self.user_ids = _decode_text(self.columns['user_id_codes'], self.columns['user_id_values']).astype(str)
+        self.nbytes = sum(array.nbytes for array in self.columns.values()) + self.user_ids.nbytes
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def positions(self, user_id=None, start=None, end=None):
+        """
+        Row positions of a user (or all users) with start <= logged_at < end.
+        """
+        logged_at = self.columns['logged_at']
+        if user_id is None:
+            mask = np.ones(len(self), dtype=bool)
+            if start is not None:
+                mask &= logged_at >= np.datetime64(start)
+            if end is not None:
+                mask &= logged_at < np.datetime64(end)
+            return np.flatnonzero(mask)
+
+        low = np.searchsorted(self.user_ids, user_id, side='left')
+        high = np.searchsorted(self.user_ids, user_id, side='right')
+        times = logged_at[low:high]
+        first = np.searchsorted(times, np.datetime64(start), side='left') if start is not None else 0
+        last = np.searchsorted(times, np.datetime64(end), side='left') if end is not None else len(times)
+        return np.arange(low + first, low + last)
+
+    def column(self, name, positions, timestamps_as_text=False):
+        """
+        Python values of one column at `positions`.
+        """
+        if name == 'user_id':
+            return self.user_ids[positions].tolist()
+        if name in TEXT_COLUMNS:
+            return _decode_text(self.columns[f'{name}_codes'][positions], self.columns[f'{name}_values']).tolist()
+        if name == 'logged_at':
+            values = self.columns['logged_at'][positions]
+            if timestamps_as_text:
+                return np.char.replace(np.datetime_as_string(values, unit='s'), 'T', ' ').tolist()
+            return values.astype('datetime64[us]').tolist()
+        if name == 'timestamp':
+            return [None if micros < 0 else (datetime.min + timedelta(microseconds=int(micros))).time()
+                    for micros in self.columns['timestamp'][positions]]
+        return self.columns[name][positions].tolist()
+
+    def rows(self, positions, columns=HISTORY_COLUMNS, timestamps_as_text=False):
+        if not len(positions):
+            return []
+        return list(zip(*(self.column(name, positions, timestamps_as_text) for name in columns)))
+
+class LogArchive:
+    """
+    Cold storage for old symptom logs, partitioned by calendar month.
+
+    `archive` moves every whole month older than a cutoff out of `symptom_logs` into one
+    compressed columnar file (NumPy .npz: one zlib-compressed array per column, text columns
+    dictionary-encoded), so the hot table and its indexes only hold recent months. Each
+    database (or shard) lists its archived months in `log_partitions`; a month is recorded
+    there in the same transaction that deletes its rows, so readers see every log exactly
+    once, in the table or in a file. Decompressed partitions are cached per process (LRU,
+    bounded in bytes). `user_logs` merges both tiers for history queries.
+    """
+
+    def __init__(self, directory, cache_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            directory (str): Where the partition files are written.
+            cache_bytes (int): Memory cap for decompressed partitions.
+        """
+        self.directory = directory
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()  # (path, mtime) -> ColdPartition
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+        self.cold_rows_read = 0
+
+    # ---------------------- Reading ----------------------
+
+    def partitions(self, db_session, start=None, end=None):
+        """
+        Archived months of the session's database overlapping [start, end), oldest first.
+
+        Returns:
+            list: LogPartition rows.
+        """
+        from ..models import LogPartition
+
+        query = select(LogPartition).order_by(LogPartition.month)
+        if start is not None:
+            query = query.where(LogPartition.month >= month_label(start))
+        if end is not None:
+            query = query.where(LogPartition.month <= month_label(end - timedelta(microseconds=1)))
+        return db_session.execute(query).scalars().all()
+
+    def load(self, partition):
+        """
+        The decompressed columns of an archived month (cached).
+        """
+        path = os.path.join(self.directory, partition.path)
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            cold = self._cache.get(key)
+            if cold is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cold
+
+        cold = ColdPartition(path)
+        with self._lock:
+            self.loads += 1
+            if key not in self._cache:
+                self._cache[key] = cold
+                self._cached_bytes += cold.nbytes
+            while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted.nbytes
+        return cold
+
+    def user_rows(self, db_session, user_id, start=None, end=None, columns=HISTORY_COLUMNS, timestamps_as_text=False):
+        """
+        A user's archived logs with start <= logged_at < end, oldest first.
+
+        Returns:
+            list of tuple: Values of `columns`.
+        """
+        rows = []
+        for partition in self.partitions(db_session, start, end):
+            cold = self.load(partition)
+            rows.extend(cold.rows(cold.positions(user_id, start, end), columns, timestamps_as_text))
+        self.cold_rows_read += len(rows)
+        return rows
+
+    def frames(self, db_session, start=None, end=None, columns=None, chunk_size=None):
+        """
+        Yield the archived logs of every user with start <= logged_at < end, one DataFrame per month
+        (or per `chunk_size` rows of a month).
+        """
+        import pandas as pd
+
+        columns = columns or ['user_id', 'logged_at', 'pain_level', 'stress_level', 'sleep_hours', 'exercise_done',
+                              'exercise_type', 'took_medication']
+        for partition in self.partitions(db_session, start, end):
+            cold = self.load(partition)
+            positions = cold.positions(start=start, end=end)
+            step = chunk_size or len(positions)
+            for first in range(0, len(positions), max(step, 1)):
+                block = positions[first:first + step]
+                yield pd.DataFrame({name: cold.column(name, block) for name in columns}, columns=columns)
+
+    def latest_logs(self, db_session, columns, skip=()):
+        """
+        Each user's newest archived log (by logged_at), for users not in `skip`.
+
+        Returns:
+            list of dict: Values of `columns` (which should include 'user_id').
+        """
+        found = set(skip)
+        latest = []
+        for partition in reversed(self.partitions(db_session)):
+            cold = self.load(partition)
+            if not len(cold):
+                continue
+            # Rows are sorted by (user_id, logged_at, id): each user's newest is the end of their slice
+            ends = np.append(np.flatnonzero(cold.user_ids[1:] != cold.user_ids[:-1]), len(cold) - 1)
+            positions = np.array([end for end in ends if cold.user_ids[end] not in found], dtype=np.int64)
+            if not len(positions):
+                continue
+            rows = [dict(zip(columns, row)) for row in cold.rows(positions, columns)]
+            found.update(row['user_id'] for row in rows)
+            latest.extend(rows)
+        return latest
+
+    def user_ids(self, db_session, start=None, end=None):
+        """
+        Distinct users with archived logs in [start, end).
+        """
+        users = set()
+        for partition in self.partitions(db_session, start, end):
+            cold = self.load(partition)
+            users.update(np.unique(cold.user_ids[cold.positions(start=start, end=end)]).tolist())
+        return users
+
+    def user_counts(self, db_session):
+        """
+        Archived log and medication counts per user.
+
+        Returns:
+            dict: user_id -> (log_count, medication_count)
+        """
+        counts = {}
+        for partition in self.partitions(db_session):
+            cold = self.load(partition)
+            users, inverse = np.unique(cold.user_ids, return_inverse=True)
+            logs = np.bincount(inverse, minlength=len(users))
+            medication = np.bincount(inverse, weights=cold.columns['took_medication'], minlength=len(users))
+            for user_id, log_count, medication_count in zip(users.tolist(), logs.tolist(), medication.tolist()):
+                previous_logs, previous_medication = counts.get(user_id, (0, 0))
+                counts[user_id] = (previous_logs + log_count, previous_medication + int(medication_count))
+        return counts
+
+    # ---------------------- Archiving ----------------------
+
+    def archive(self, db_session, older_than_days, label='default'):
+        """
+        Archive every whole month of `symptom_logs` that ended more than `older_than_days` ago.
+
+        Args:
+            db_session (Session): Session bound to one database (or shard).
+            older_than_days (int): Age after which a month is archived.
+            label (str): Subdirectory for this database's files (the shard key).
+
+        Returns:
+            dict: Archived month -> number of rows.
+        """
+        from ..models import SymptomLog
+
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        months = db_session.execute(
+            select(func.strftime('%Y-%m', SymptomLog.logged_at)).distinct()
+            .where(SymptomLog.logged_at < datetime(cutoff.year, cutoff.month, 1))
+        ).scalars().all()
+        return {month: self.archive_month(db_session, month, label)
+                for month in sorted(months) if month and month_bounds(month)[1] <= cutoff}
+
+    def archive_month(self, db_session, month, label='default'):
+        """
+        Move one month of logs into a partition file and drop them from `symptom_logs`.
+        Logs of an already archived month (e.g. backfilled) are merged into a new file for it.
+
+        Returns:
+            int: Number of rows archived.
+        """
+        from ..models import LogPartition, SymptomLog
+
+        start, end = month_bounds(month)
+        table = SymptomLog.__table__
+        path = None
+        try:
+            rows = db_session.execute(
+                select(table).where(table.c.logged_at >= start, table.c.logged_at < end)
+            ).mappings().all()
+            if not rows:
+                return 0
+
+            existing = db_session.get(LogPartition, month)
+            previous_path = existing.path if existing is not None else None
+            archived = list(rows)
+            if existing is not None:
+                cold = self.load(existing)
+                archived += [dict(zip(ARCHIVE_COLUMNS, values))
+                             for values in cold.rows(np.arange(len(cold)), ARCHIVE_COLUMNS)]
+            archived.sort(key=lambda row: (row['user_id'], row['logged_at'], row['id']))
+
+            # A new file per run: readers keep using the previous one until this transaction commits
+            relative = os.path.join(label, f'symptom_logs_{month}_{int(time.time())}.npz')
+            path = os.path.join(self.directory, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write(path, archived)
+
+            values = {"path": relative, "row_count": len(archived), "size_bytes": os.path.getsize(path),
+                      "archived_at": datetime.utcnow()}
+            if existing is None:
+                db_session.execute(insert(LogPartition.__table__).values(month=month, **values))
+            else:
+                db_session.execute(update(LogPartition.__table__).where(LogPartition.month == month).values(**values))
+            deleted = db_session.execute(
+                delete(table).where(table.c.logged_at >= start, table.c.logged_at < end,
+                                    table.c.id <= max(row['id'] for row in rows))
+            ).rowcount
+            if deleted != len(rows):
+                raise RuntimeError(f"{month}: {deleted} rows deleted but {len(rows)} archived; retry the job")
+            db_session.commit()
+
+        except Exception as e:
+            db_session.rollback()
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+            print(f"Error archiving symptom logs of {month}: {e}")
+            raise
+
+        if previous_path is not None:
+            os.remove(os.path.join(self.directory, previous_path))
+        print(f"[DEBUG] Archived {len(rows)} logs of {month} to {relative}.")
+        return len(rows)
+
+    @staticmethod
+    def _write(path, rows):
+        columns = {
+            "id": np.array([row['id'] for row in rows], dtype=np.int64),
+            "logged_at": np.array([row['logged_at'] for row in rows], dtype='datetime64[us]'),
+            "pain_level": np.array([row['pain_level'] for row in rows], dtype=np.int8),
+            "stress_level": np.array([row['stress_level'] for row in rows], dtype=np.int8),
+            "sleep_hours": np.array([row['sleep_hours'] for row in rows], dtype=np.float64),
+            "exercise_done": np.array([row['exercise_done'] for row in rows], dtype=bool),
+            "took_medication": np.array([row['took_medication'] for row in rows], dtype=bool),
+            "timestamp": np.array([-1 if row['timestamp'] is None else
+                                   ((row['timestamp'].hour * 60 + row['timestamp'].minute) * 60
+                                    + row['timestamp'].second) * 1_000_000 + row['timestamp'].microsecond
+                                   for row in rows], dtype=np.int64)
+        }
+        for name in TEXT_COLUMNS:
+            columns[f'{name}_codes'], columns[f'{name}_values'] = _encode_text([row[name] for row in rows])
+
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as partition_file:
+            np.savez_compressed(partition_file, **columns)
+            partition_file.flush()
+            os.fsync(partition_file.fileno())
+        os.replace(temporary, path)
+
+    def restore(self, db_session, month):
+        """
+        Move an archived month back into `symptom_logs` (rows get new IDs) and delete its file.
+
+        Returns:
+            int: Number of rows restored.
+        """
+        from ..models import LogPartition, SymptomLog
+
+        partition = db_session.get(LogPartition, month)
+        if partition is None:
+            return 0
+        path = os.path.join(self.directory, partition.path)
+        cold = self.load(partition)
+        names = ARCHIVE_COLUMNS[1:]
+        rows = [dict(zip(names, values)) for values in cold.rows(np.arange(len(cold)), names)]
+        try:
+            for start in range(0, len(rows), 10_000):
+                db_session.execute(insert(SymptomLog.__table__), rows[start:start + 10_000])
+            db_session.execute(delete(LogPartition.__table__).where(LogPartition.month == month))
+            db_session.commit()
+        except Exception as e:
+            db_session.rollback()
+            print(f"Error restoring symptom logs of {month}: {e}")
+            raise
+        os.remove(path)
+        return len(rows)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "cached_partitions": len(self._cache),
+                "cached_bytes": self._cached_bytes,
+                "cache_bytes": self.cache_bytes,
+                "loads": self.loads,
+                "hits": self.hits,
+                "cold_rows_read": self.cold_rows_read
+            }
+
+def get_archive():
+    """
+    The app's LogArchive, or None outside an app context.
+    """
+    return current_app.extensions.get('log_archive') if has_app_context() else None
+
+# ---------------------- History Queries ----------------------
+
+def user_logs(db_session, user_id, start=None, end=None, newest_first=False, limit=None, timestamps_as_text=False,
+              archive=None):
+    """
+    A user's symptom logs from the hot table and the archived months, as one history.
+
+    Args:
+        db_session (Session): Session on the user's shard (or a replica of it).
+        user_id (str): The user's ID.
+        start (datetime, optional): Earliest logged_at (inclusive).
+        end (datetime, optional): Latest logged_at (exclusive).
+        newest_first (bool): Order by logged_at descending.
+        limit (int, optional): Only the newest (or oldest) `limit` logs. Archived months are
+            only read when the hot table has fewer.
+        timestamps_as_text (bool): logged_at as "YYYY-MM-DD HH:MM:SS" strings.
+        archive (LogArchive, optional): Defaults to the app's.
+
+    Returns:
+        list of tuple: Values of HISTORY_COLUMNS.
+    """
+    from ..models import SymptomLog
+
+    logged_at = func.strftime('%Y-%m-%d %H:%M:%S', SymptomLog.logged_at) if timestamps_as_text else SymptomLog.logged_at
+    query = (select(logged_at, SymptomLog.pain_level, SymptomLog.stress_level, SymptomLog.sleep_hours,
+                    SymptomLog.exercise_done, SymptomLog.exercise_type, SymptomLog.took_medication, SymptomLog.id)
+             .where(SymptomLog.user_id == user_id))
+    if start is not None:
+        query = query.where(SymptomLog.logged_at >= start)
+    if end is not None:
+        query = query.where(SymptomLog.logged_at < end)
+    if newest_first:
+        query = query.order_by(SymptomLog.logged_at.desc(), SymptomLog.id.desc())
+    else:
+        query = query.order_by(SymptomLog.logged_at, SymptomLog.id)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db_session.execute(query).all()
+
+    archive = archive or get_archive()
+    if archive is None or (limit is not None and len(rows) >= limit):
+        return rows
+
+    cold = archive.user_rows(db_session, user_id, start, end, timestamps_as_text=timestamps_as_text)
+    if not cold:
+        return rows
+    rows = sorted(cold + [tuple(row) for row in rows], key=lambda row: (row[0], row[-1]), reverse=newest_first)
+    return rows[:limit] if limit is not None else rows
+
+def register_archive(app):
+    """
+    Create the app's LogArchive from ARCHIVE_DIR and ARCHIVE_CACHE_MB.
+
+    Args:
+        app (Flask): The application.
+    """
+    app.extensions['log_archive'] = LogArchive(app.config['ARCHIVE_DIR'],
+                                               cache_bytes=app.config['ARCHIVE_CACHE_MB'] * 1024 * 1024)
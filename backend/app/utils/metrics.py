@@ -0,0 +1,54 @@
+import bisect
+import threading
+
+class Histogram:
+    """
+    Thread-safe fixed-bucket histogram for runtime metrics (batch sizes, queue depths, latencies).
+    """
+
+    def __init__(self, buckets):
+        """
+        Args:
+            buckets (list of float): Sorted upper bounds; values above the last bound go to an overflow bucket.
+        """
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+            self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Upper bucket bound containing the q-quantile (None if empty, the max if it overflowed).
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            target = q * self.count
+            running = 0
+            for bound, bucket_count in zip(self.buckets, self.counts):
+                running += bucket_count
+                if running >= target:
+                    return bound
+            return self.max
+
+    def snapshot(self):
+        """
+        JSON-serializable view of the histogram.
+        """
+        with self._lock:
+            labels = [f"le_{bound}" for bound in self.buckets] + ["overflow"]
+            return {
+                "count": self.count,
+                "mean": round(self.total / self.count, 4) if self.count else None,
+                "max": self.max,
+                "buckets": dict(zip(labels, self.counts))
+            }
@@ -0,0 +1,503 @@
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from sqlalchemy import text
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+class Throttle:
+    """
+    Paces a batched job so it never holds the write lock for long: after a batch that kept the
+    lock for t seconds the job sleeps t * (1 - duty_cycle) / duty_cycle, and longer if needed to
+    stay under `max_rows_per_second`. Application writes queue behind one batch at most.
+    """
+
+    def __init__(self, max_rows_per_second=None, duty_cycle=0.5):
+        """
+        Args:
+            max_rows_per_second (int): Rows per second cap (None or 0: no cap).
+            duty_cycle (float): Share of wall time the job may spend inside batches (0, 1].
+        """
+        if not 0 < duty_cycle <= 1:
+            raise ValueError("duty_cycle must be in (0, 1]")
+        self.max_rows_per_second = max_rows_per_second or None
+        self.duty_cycle = duty_cycle
+
+    @classmethod
+    def from_config(cls):
+        return cls(_config('ONLINE_MIGRATION_MAX_ROWS_PER_SECOND', 0), _config('ONLINE_MIGRATION_DUTY_CYCLE', 0.5))
+
+    def wait(self, rows, elapsed):
+        """
+        Sleep after a batch of `rows` rows that took `elapsed` seconds.
+
+        Returns:
+            float: Seconds slept.
+        """
+        pause = elapsed * (1 - self.duty_cycle) / self.duty_cycle
+        if self.max_rows_per_second:
+            pause = max(pause, rows / self.max_rows_per_second - elapsed)
+        if pause > 0:
+            time.sleep(pause)
+        return max(pause, 0.0)
+
+class BatchedJob:
+    """
+    Base of the resumable jobs: walks a table's integer primary key in batches of `batch_size`
+    rows, one short transaction per batch, and stores its checkpoint (the last key done) in the
+    migration_jobs table in the same transaction as the batch. A job interrupted at any point
+    resumes from its checkpoint when run again with the same name.
+    """
+
+    kind = None
+
+    def __init__(self, engine, name, table, batch_size=None, throttle=None, report_every=10.0):
+        """
+        Args:
+            engine (Engine): Database holding the table (a shard's engine when sharded).
+            name (str): Unique job name; the key of its checkpoint.
+            table (str): Table to process; needs a single integer primary key.
+            batch_size (int): Rows per transaction (default: ONLINE_MIGRATION_BATCH_SIZE).
+            throttle (Throttle): Pacing between batches (default: from the app config).
+            report_every (float): Seconds between progress lines.
+        """
+        if engine.dialect.name != 'sqlite':
+            raise NotImplementedError(f"Online migrations do not support the {engine.dialect.name} dialect")
+        self.engine = engine
+        self.name = name
+        self.table = table
+        self.batch_size = batch_size or _config('ONLINE_MIGRATION_BATCH_SIZE', 5000)
+        self.throttle = throttle or Throttle.from_config()
+        self.report_every = report_every
+
+    # ---------------------- Checkpoints ----------------------
+
+    @property
+    def _jobs(self):
+        from ..models import MigrationJob
+        return MigrationJob.__table__
+
+    def state(self, connection=None):
+        """
+        The job's migration_jobs row as a dict, or None before it started.
+        """
+        statement = sa.select(self._jobs).where(self._jobs.c.name == self.name)
+        if connection is not None:
+            row = connection.execute(statement).mappings().first()
+        else:
+            with self.engine.connect() as connection:
+                row = connection.execute(statement).mappings().first()
+        return dict(row) if row else None
+
+    def _create(self, connection, start_key, end_key):
+        now = datetime.utcnow()
+        connection.execute(sa.insert(self._jobs).values(
+            name=self.name, kind=self.kind, table_name=self.table, phase='copying', start_key=start_key,
+            last_key=start_key, end_key=end_key, rows_done=0, started_at=now, updated_at=now))
+
+    def _save(self, connection, **values):
+        connection.execute(sa.update(self._jobs).where(self._jobs.c.name == self.name)
+                           .values(updated_at=datetime.utcnow(), **values))
+
+    @contextmanager
+    def _immediate(self, pragmas=None):
+        """
+        A connection in an explicit BEGIN IMMEDIATE transaction, committed on exit, so DDL is
+        atomic as well (the driver only opens transactions implicitly before DML).
+
+        Args:
+            pragmas (dict, optional): Connection settings applied for the transaction and restored
+                afterwards (PRAGMA foreign_keys, for one, cannot change inside a transaction).
+        """
+        with self.engine.connect() as connection:
+            previous = {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in pragmas or {}}
+            for name, value in (pragmas or {}).items():
+                connection.exec_driver_sql(f'PRAGMA {name} = {int(value)}')
+            try:
+                connection.exec_driver_sql('BEGIN IMMEDIATE')
+                try:
+                    yield connection
+                except BaseException:
+                    connection.rollback()
+                    raise
+                connection.commit()
+            finally:
+                for name, value in previous.items():
+                    connection.exec_driver_sql(f'PRAGMA {name} = {int(value)}')
+
+    # ---------------------- Batches ----------------------
+
+    def _primary_key(self, connection, table=None):
+        table = table or self.table
+        columns = [row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({_quote(table)})') if row[5]]
+        if len(columns) != 1:
+            raise ValueError(f"{table} needs a single integer primary key for batching")
+        return columns[0]
+
+    def _next_key(self, connection, after, until):
+        """
+        Upper key of the next batch: the `batch_size`-th key after `after`, capped at `until`.
+        """
+        pk = _quote(self.pk)
+        return connection.execute(text(
+            f'SELECT MAX(k) FROM (SELECT {pk} AS k FROM {_quote(self.table)} '
+            f'WHERE {pk} > :after AND {pk} <= :until ORDER BY {pk} LIMIT :limit)'
+        ), {"after": after, "until": until, "limit": self.batch_size}).scalar()
+
+    def _batch(self, connection, after, upper):
+        """
+        Process keys in (after, upper] inside the batch's transaction; returns rows affected.
+        """
+        raise NotImplementedError
+
+    def _run_batches(self, state):
+        """
+        Batches from the checkpoint to `end_key`, each committed with its checkpoint and followed
+        by the throttle's pause, with a progress line every `report_every` seconds.
+
+        Returns:
+            int: Rows processed by this run.
+        """
+        first, last, end = state['start_key'], state['last_key'], state['end_key']
+        resumed_at, done = last, state['rows_done']
+        processed = 0
+        started = reported = time.monotonic()
+        while True:
+            batch_started = time.monotonic()
+            with self.engine.begin() as connection:
+                upper = self._next_key(connection, last, end)
+                if upper is None:
+                    break
+                rows = self._batch(connection, last, upper)
+                last, done = upper, done + rows
+                self._save(connection, last_key=last, rows_done=done)
+            processed += rows
+            self.throttle.wait(rows, time.monotonic() - batch_started)
+
+            now = time.monotonic()
+            if now - reported >= self.report_every:
+                reported = now
+                share = (last - first) / (end - first) if end > first else 1.0
+                rate = processed / (now - started)
+                eta = (end - last) * (now - started) / (last - resumed_at)
+                print(f"[DEBUG] {self.kind} {self.name}: {done} rows, {share:.1%} of keys, "
+                      f"{rate:.0f} rows/s, ETA {eta:.0f}s")
+        return processed
+
+class OnlineMigration(BatchedJob):
+    """
+    A table rebuild (added, dropped or changed columns and indexes) without a long write lock,
+    the approach of pt-online-schema-change / gh-ost adapted to SQLite:
+
+    1. start: create the shadow table `_<table>_new` with the target schema, and triggers on the
+       live table that mirror every insert, update and delete into it (the dual write);
+    2. copy: fill the shadow table from the live one in throttled primary-key batches, each
+       committed with its checkpoint, skipping rows the triggers already wrote;
+    3. swap: in one short transaction drop the triggers, rename the live table to
+       `_<table>_old` and the shadow table into its place, and give its indexes their final names;
+    4. cleanup: delete the old table in throttled batches, then drop it.
+
+    Each step is idempotent and `run()` resumes an interrupted migration from its phase and
+    checkpoint. In an Alembic revision (which should contain nothing else):
+
+        def upgrade():
+            OnlineMigration(op.get_bind().engine, 'symptom_logs', name='c1a2_symptom_logs_severity',
+                            add_columns=[sa.Column('severity', sa.Integer(), nullable=True)],
+                            add_indexes=[sa.Index('ix_symptom_logs_severity', 'severity')]).run()
+    """
+
+    kind = 'online-migration'
+
+    def __init__(self, engine, table, name, add_columns=(), drop_columns=(), alter_columns=(), add_indexes=(),
+                 drop_indexes=(), expressions=None, **options):
+        """
+        Args:
+            engine (Engine): Database holding the table.
+            table (str): Table to rebuild.
+            name (str): Unique migration name (e.g. the revision id and table).
+            add_columns (list of Column): New columns (filled from `expressions` or their server default).
+            drop_columns (list of str): Columns to remove.
+            alter_columns (list of Column): Replacement definitions of existing columns, by name.
+            add_indexes (list of Index): New indexes, on column names.
+            drop_indexes (list of str): Indexes to remove.
+            expressions (dict): SQL expression over the live row per target column (default: same column).
+            **options: batch_size, throttle and report_every (see BatchedJob).
+        """
+        super().__init__(engine, name, table, **options)
+        self.add_columns = list(add_columns)
+        self.drop_columns = set(drop_columns)
+        self.alter_columns = {column.name: column for column in alter_columns}
+        self.add_indexes = list(add_indexes)
+        self.drop_indexes = set(drop_indexes)
+        self.expressions = dict(expressions or {})
+        self.shadow = f'_{table}_new'
+        self.old = f'_{table}_old'
+        self.triggers = [f'_online_{table}_{action}' for action in ('insert', 'update', 'delete')]
+
+    # ---------------------- Target schema ----------------------
+
+    def _target(self, connection):
+        """
+        The shadow Table with the target schema and its indexes under temporary `_new_` names.
+        """
+        metadata = sa.MetaData()
+        live = sa.Table(self.table, metadata, autoload_with=connection)
+        sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                 {"name": self.table}).scalar()
+
+        columns = [(self.alter_columns.get(column.name) or column)._copy() for column in live.columns
+                   if column.name not in self.drop_columns]
+        columns += [column._copy() for column in self.add_columns]
+        constraints = []
+        for constraint in live.constraints:
+            names = [column.name for column in getattr(constraint, 'columns', [])]
+            if self.drop_columns.intersection(names):
+                continue
+            if isinstance(constraint, sa.UniqueConstraint):
+                constraints.append(sa.UniqueConstraint(*names, name=constraint.name))
+            elif isinstance(constraint, sa.ForeignKeyConstraint):
+                constraints.append(sa.ForeignKeyConstraint(names, [element.target_fullname for element in constraint.elements],
+                                                           name=constraint.name, ondelete=constraint.ondelete,
+                                                           onupdate=constraint.onupdate))
+            elif isinstance(constraint, sa.CheckConstraint):
+                constraints.append(sa.CheckConstraint(constraint.sqltext, name=constraint.name))
+        shadow = sa.Table(self.shadow, metadata, *columns, *constraints,
+                          sqlite_autoincrement='AUTOINCREMENT' in (sql or '').upper())
+
+        indexes = [(index.name, [column.name for column in index.columns], index.unique) for index in live.indexes
+                   if index.name not in self.drop_indexes]
+        indexes += [(index.name, list(index.expressions), index.unique) for index in self.add_indexes]
+        for name, names, unique in indexes:
+            if not self.drop_columns.intersection(names):
+                sa.Index(f'_new_{name}', *[shadow.c[column] for column in names], unique=unique)
+        return shadow
+
+    def _copy_columns(self, shadow, connection):
+        """
+        (target columns, source expressions) for the INSERT ... SELECT from the live table.
+        """
+        live = {row[1] for row in connection.execute(text(f'PRAGMA table_info({_quote(self.table)})'))}
+        pairs = [(column.name, self.expressions.get(column.name) or _quote(column.name)) for column in shadow.columns
+                 if column.name in self.expressions or column.name in live]
+        return ', '.join(_quote(name) for name, _ in pairs), ', '.join(expression for _, expression in pairs)
+
+    # ---------------------- Phases ----------------------
+
+    def start(self):
+        """
+        Create the shadow table, its indexes and the dual-write triggers, and record the key range
+        to copy (rows above it are inserted later and reach the shadow table through the triggers).
+        """
+        with self._immediate() as connection:
+            state = self.state(connection)
+            if state is not None:
+                return state
+            shadow = self._target(connection)
+            self.pk = self._primary_key(connection)
+            columns, expressions = self._copy_columns(shadow, connection)
+
+            shadow.create(connection)  # With its indexes
+            live, target, pk = _quote(self.table), _quote(self.shadow), _quote(self.pk)
+            mirror = f'INSERT OR REPLACE INTO {target} ({columns}) SELECT {expressions} FROM {live} WHERE {pk} = NEW.{pk};'
+            for statement in (
+                f'CREATE TRIGGER {_quote(self.triggers[0])} AFTER INSERT ON {live} BEGIN {mirror} END',
+                f'CREATE TRIGGER {_quote(self.triggers[1])} AFTER UPDATE ON {live} BEGIN '
+                f'DELETE FROM {target} WHERE {pk} = OLD.{pk}; {mirror} END',
+                f'CREATE TRIGGER {_quote(self.triggers[2])} AFTER DELETE ON {live} BEGIN '
+                f'DELETE FROM {target} WHERE {pk} = OLD.{pk}; END',
+            ):
+                connection.exec_driver_sql(statement)
+
+            start_key, end_key = connection.exec_driver_sql(f'SELECT MIN({pk}), MAX({pk}) FROM {live}').one()
+            self._create(connection, (start_key or 1) - 1, end_key or 0)
+        print(f"[DEBUG] {self.kind} {self.name}: shadow table {self.shadow} created, copying keys up to {end_key}")
+        return self.state()
+
+    def _batch(self, connection, after, upper):
+        live, target, pk = _quote(self.table), _quote(self.shadow), _quote(self.pk)
+        return connection.execute(text(
+            f'INSERT INTO {target} ({self._columns}) SELECT {self._expressions} FROM {live} AS source '
+            f'WHERE {pk} > :after AND {pk} <= :upper '
+            f'AND NOT EXISTS (SELECT 1 FROM {target} AS copied WHERE copied.{pk} = source.{pk})'
+        ), {"after": after, "upper": upper}).rowcount
+
+    def copy(self):
+        """
+        Copy the recorded key range into the shadow table, resuming from the checkpoint.
+        """
+        state = self.state()
+        if state['phase'] != 'copying':
+            return 0
+        with self.engine.connect() as connection:
+            self.pk = self._primary_key(connection)
+            shadow = sa.Table(self.shadow, sa.MetaData(), autoload_with=connection)
+            self._columns, self._expressions = self._copy_columns(shadow, connection)
+        copied = self._run_batches(state)
+        with self.engine.begin() as connection:
+            self._save(connection, phase='copied')
+        print(f"[DEBUG] {self.kind} {self.name}: copied {copied} rows")
+        return copied
+
+    def swap(self):
+        """
+        Atomically put the shadow table in place of the live one (renaming indexes through the
+        schema table, which SQLite cannot do with ALTER INDEX) and drop the triggers.
+
+        The renames run with legacy_alter_table on and foreign key enforcement off. Otherwise
+        SQLite rewrites the REFERENCES clauses of child tables to follow the live table to its
+        old name, and they would point at a dropped table after `cleanup`.
+        """
+        with self._immediate(pragmas={'legacy_alter_table': True, 'foreign_keys': False}) as connection:
+            if self.state(connection)['phase'] != 'copied':
+                return
+            for trigger in self.triggers:
+                connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {_quote(trigger)}')
+            connection.exec_driver_sql(f'ALTER TABLE {_quote(self.table)} RENAME TO {_quote(self.old)}')
+            connection.exec_driver_sql(f'ALTER TABLE {_quote(self.shadow)} RENAME TO {_quote(self.table)}')
+
+            indexes = text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table "
+                           "AND sql IS NOT NULL")
+            renames = [(name, sql, f'_old_{name}') for name, sql in connection.execute(indexes, {"table": self.old})]
+            renames += [(name, sql, name[len('_new_'):]) for name, sql in connection.execute(indexes, {"table": self.table})
+                        if name.startswith('_new_')]
+            version = connection.exec_driver_sql('PRAGMA schema_version').scalar()
+            connection.exec_driver_sql('PRAGMA writable_schema = ON')
+            for current, sql, renamed in renames:
+                sql = re.sub(r'^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+)(?:"(?:[^"]|"")+"|\S+)',
+                             lambda match: match.group(1) + _quote(renamed), sql, count=1, flags=re.IGNORECASE)
+                connection.execute(text("UPDATE sqlite_master SET name = :renamed, sql = :sql "
+                                        "WHERE type = 'index' AND name = :current"),
+                                   {"renamed": renamed, "sql": sql, "current": current})
+            connection.exec_driver_sql(f'PRAGMA schema_version = {version + 1}')
+            connection.exec_driver_sql('PRAGMA writable_schema = OFF')
+            self._save(connection, phase='swapped')
+        print(f"[DEBUG] {self.kind} {self.name}: {self.shadow} swapped in as {self.table}")
+
+    def cleanup(self):
+        """
+        Empty the old table in throttled batches (a single DROP of a large table frees every page
+        in one transaction), then drop it.
+        """
+        if self.state()['phase'] != 'swapped':
+            return
+        old = _quote(self.old)
+        with self.engine.connect() as connection:
+            pk = _quote(self._primary_key(connection, self.old))
+        while True:
+            batch_started = time.monotonic()
+            with self.engine.begin() as connection:
+                deleted = connection.execute(text(
+                    f'DELETE FROM {old} WHERE {pk} IN (SELECT {pk} FROM {old} ORDER BY {pk} LIMIT :limit)'
+                ), {"limit": self.batch_size}).rowcount
+            if not deleted:
+                break
+            self.throttle.wait(deleted, time.monotonic() - batch_started)
+        with self._immediate() as connection:
+            connection.exec_driver_sql(f'DROP TABLE IF EXISTS {old}')
+            self._save(connection, phase='done', finished_at=datetime.utcnow())
+        print(f"[DEBUG] {self.kind} {self.name}: dropped {self.old}")
+
+    def abort(self):
+        """
+        Drop the triggers and the shadow table of a migration that has not swapped yet, and forget it.
+        """
+        state = self.state()
+        if state is None or state['phase'] not in ('copying', 'copied'):
+            raise RuntimeError(f"{self.name} cannot be aborted in phase {state and state['phase']}")
+        with self._immediate() as connection:
+            for trigger in self.triggers:
+                connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {_quote(trigger)}')
+            connection.exec_driver_sql(f'DROP TABLE IF EXISTS {_quote(self.shadow)}')
+            connection.execute(sa.delete(self._jobs).where(self._jobs.c.name == self.name))
+
+    def run(self, cleanup=True):
+        """
+        Run (or resume) every remaining phase.
+
+        Args:
+            cleanup (bool): Also drop the old table; otherwise it is kept for `flask migration-jobs --cleanup`.
+
+        Returns:
+            dict: The final migration_jobs row.
+        """
+        self.start()
+        self.copy()
+        self.swap()
+        if cleanup:
+            self.cleanup()
+        return self.state()
+
+class Backfill(BatchedJob):
+    """
+    A data backfill (UPDATE ... SET) as a chunked job: one primary-key batch per transaction with
+    its checkpoint, throttled and reporting progress, instead of one statement that locks the
+    table for the whole update. Rows inserted after the job started are not visited; new writes
+    are expected to set the values themselves.
+    """
+
+    kind = 'backfill'
+
+    def __init__(self, engine, table, name, values, where=None, **options):
+        """
+        Args:
+            engine (Engine): Database holding the table.
+            table (str): Table to update.
+            name (str): Unique job name.
+            values (dict): SQL expression per column to set, e.g. {'severity': 'pain_level + stress_level'}.
+            where (str): Optional SQL condition restricting the rows updated.
+            **options: batch_size, throttle and report_every (see BatchedJob).
+        """
+        super().__init__(engine, name, table, **options)
+        self.values = values
+        self.where = where
+
+    def _batch(self, connection, after, upper):
+        pk = _quote(self.pk)
+        assignments = ', '.join(f'{_quote(column)} = {expression}' for column, expression in self.values.items())
+        condition = f' AND ({self.where})' if self.where else ''
+        return connection.execute(text(
+            f'UPDATE {_quote(self.table)} SET {assignments} WHERE {pk} > :after AND {pk} <= :upper{condition}'
+        ), {"after": after, "upper": upper}).rowcount
+
+    def run(self):
+        """
+        Run (or resume) the backfill.
+
+        Returns:
+            dict: The final migration_jobs row.
+        """
+        with self.engine.begin() as connection:
+            self.pk = self._primary_key(connection)
+            state = self.state(connection)
+            if state is None:
+                start_key, end_key = connection.execute(text(
+                    f'SELECT MIN({_quote(self.pk)}), MAX({_quote(self.pk)}) FROM {_quote(self.table)}')).one()
+                self._create(connection, (start_key or 1) - 1, end_key or 0)
+        state = self.state()
+        if state['phase'] == 'copying':
+            updated = self._run_batches(state)
+            with self.engine.begin() as connection:
+                self._save(connection, phase='done', finished_at=datetime.utcnow())
+            print(f"[DEBUG] {self.kind} {self.name}: updated {updated} rows")
+        return self.state()
+
+def job_status(engine):
+    """
+    Every online migration and backfill recorded in a database, with its progress.
+
+    Returns:
+        list of dict: migration_jobs rows plus 'progress' (share of the key range done).
+    """
+    from ..models import MigrationJob
+
+    with engine.connect() as connection:
+        rows = connection.execute(sa.select(MigrationJob.__table__).order_by(MigrationJob.started_at)).mappings().all()
+    return [{**row, "progress": 1.0 if row['phase'] != 'copying' or row['end_key'] <= row['start_key']
+             else (row['last_key'] - row['start_key']) / (row['end_key'] - row['start_key'])} for row in rows]
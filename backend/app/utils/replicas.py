@@ -0,0 +1,326 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from .metrics import Histogram
+from .sharding import ShardedSession
+
+POSITION_TTL = 0.5  # Seconds a replica position read from its replica_state table is reused
+
+class ReplicaSet:
+    """
+    Read replicas of the primary database and the routing of reads between them.
+
+    Writes always go to the primary; read-only routes and batch jobs read from a replica. A replica's
+    position is the time of the primary snapshot it holds (kept in its `replica_state` table, so every
+    process can see it). Replicas more than `max_lag` seconds behind are not read from, and a user's
+    reads stay on the primary until a replica has caught up with that user's last commit
+    (read-your-writes). Every write transaction stamps its users' rows in the primary's write_markers
+    table, and the snapshots copy those markers to the replicas: a replica has a user's last write
+    when its marker matches the primary's. The markers are shared by every worker process, whichever
+    one served the write. Choosing a replica for a user costs a primary key lookup on the primary
+    (and on a candidate replica once the user has written).
+    """
+
+    def __init__(self, app, replica_keys=(), sync_seconds=2.0, max_lag_seconds=10.0):
+        """
+        Args:
+            app (Flask): The application; snapshots run in its app context.
+            replica_keys (list): Bind keys of the replicas.
+            sync_seconds (float): Interval between snapshots of the primary into each replica
+                (0: replicas are kept in sync externally).
+            max_lag_seconds (float): Staler replicas are skipped. Externally synced replicas
+                without a replica_state table are assumed to be this far behind.
+        """
+        self.app = app
+        self.replica_keys = list(replica_keys)
+        self.sync_seconds = sync_seconds
+        self.max_lag = max_lag_seconds
+        self._positions = {}  # Bind key -> (snapshot time, when it was read)
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.replica_reads = 0
+        self.sticky_reads = 0  # Sent to the primary: no replica has the user's last write yet
+        self.stale_reads = 0  # Sent to the primary: every replica lags more than max_lag
+        self.syncs = {key: 0 for key in self.replica_keys}
+        self.sync_errors = {key: 0 for key in self.replica_keys}
+        self.sync_ms = Histogram([1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000])
+        if self.enabled:
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def enabled(self):
+        return bool(self.replica_keys)
+
+    def _after_fork(self):
+        # The snapshot thread stays in the parent (e.g. a pre-forking master); children read replica_state
+        self._lock = threading.Lock()
+        self._thread = None
+        self._positions = {}
+
+    # ---------------------- Positions and lag ----------------------
+
+    def _syncing_here(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _read_position(self, key):
+        from .. import db
+        try:
+            with db.engines[key].connect() as connection:
+                return connection.execute(text("SELECT synced_at FROM replica_state")).scalar()
+        except SQLAlchemyError:
+            return None
+
+    def position(self, key, now=None):
+        """
+        Time (epoch seconds) of the primary snapshot held by a replica, or None if it holds none.
+        """
+        now = now or time.time()
+        with self._lock:
+            position, checked = self._positions.get(key, (None, 0.0))
+        if not self._syncing_here() and now - checked > POSITION_TTL:
+            position = self._read_position(key)
+            with self._lock:
+                self._positions[key] = (position, now)
+        if position is None and not self.sync_seconds:
+            return now - self.max_lag
+        return position
+
+    def lag(self, key, now=None):
+        """
+        Seconds a replica is behind the primary (None before its first snapshot).
+        """
+        now = now or time.time()
+        position = self.position(key, now)
+        return None if position is None else max(0.0, now - position)
+
+    # ---------------------- Routing ----------------------
+
+    def _marker(self, key, user_id):
+        # The user's write marker in a database (None: never written, or no write_markers table yet)
+        from .. import db
+        from ..models import WriteMarker
+        try:
+            with db.engines[key].connect() as connection:
+                return connection.execute(select(WriteMarker.written_at)
+                                          .where(WriteMarker.user_id == user_id)).scalar()
+        except SQLAlchemyError:
+            return None
+
+    def choose(self, user_id=None):
+        """
+        Pick a replica for reads (round robin), or None to read from the primary.
+
+        Args:
+            user_id (str, optional): Only pick replicas that already have this user's writes.
+
+        Returns:
+            str: Bind key of the replica, or None.
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        written = self._marker(None, user_id) if user_id is not None else None
+        fresh = False
+        start = next(self._turn)
+        for offset in range(len(self.replica_keys)):
+            key = self.replica_keys[(start + offset) % len(self.replica_keys)]
+            position = self.position(key, now)
+            if position is None or now - position > self.max_lag:
+                continue
+            fresh = True
+            # A snapshot taken before the write cannot hold it; a later one may still have missed its commit
+            if written is None or (position >= written and (self._marker(key, user_id) or 0.0) >= written):
+                self.replica_reads += 1
+                return key
+
+        if fresh:
+            self.sticky_reads += 1
+        else:
+            self.stale_reads += 1
+        return None
+
+    def mark_writes(self, session, user_ids):
+        """
+        Stamp the users' write markers in the session's transaction on the primary, so they commit
+        (or roll back) with the writes.
+        """
+        from .. import db
+        from ..models import WriteMarker
+
+        dialect = db.engines[None].dialect.name  # Replicas are only used without shards
+        if dialect == 'sqlite':
+            statement = sqlite.insert(WriteMarker.__table__)
+        elif dialect == 'postgresql':
+            statement = postgresql.insert(WriteMarker.__table__)
+        else:
+            raise NotImplementedError(f"Read replicas do not support the {dialect} dialect")
+        now = time.time()
+        statement = statement.values([{"user_id": user_id, "written_at": now} for user_id in sorted(user_ids)])
+        session.execute(statement.on_conflict_do_update(index_elements=['user_id'],
+                                                        set_={"written_at": statement.excluded.written_at}))
+
+    # ---------------------- Snapshots ----------------------
+
+    def sync(self):
+        """
+        Copy the primary into every replica with SQLite's online backup API and record the
+        snapshot time in the replica's replica_state table.
+        """
+        from .. import db
+
+        for key in self.replica_keys:
+            started = time.perf_counter()
+            position = time.time()  # Everything committed before the copy starts is included
+            try:
+                source = db.engines[None].raw_connection()
+                try:
+                    target = db.engines[key].raw_connection()
+                    try:
+                        replica = target.driver_connection
+                        source.driver_connection.backup(replica)
+                        replica.execute("CREATE TABLE IF NOT EXISTS replica_state (synced_at REAL NOT NULL)")
+                        replica.execute("DELETE FROM replica_state")
+                        replica.execute("INSERT INTO replica_state VALUES (?)", (position,))
+                        replica.commit()
+                    finally:
+                        target.close()
+                finally:
+                    source.close()
+            except Exception as e:
+                self.sync_errors[key] += 1
+                print(f"Error syncing replica {key}: {e}")
+                continue
+
+            with self._lock:
+                self._positions[key] = (position, position)
+            self.syncs[key] += 1
+            self.sync_ms.observe((time.perf_counter() - started) * 1000)
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                self.sync()
+                if self._stop.wait(self.sync_seconds):
+                    return
+
+    def start(self):
+        """
+        Snapshot the primary into the replicas every `sync_seconds` in a background thread.
+        """
+        from .. import db
+        from ..models import WriteMarker
+
+        if not self.enabled:
+            return
+        with self.app.app_context():
+            WriteMarker.__table__.create(db.engines[None], checkfirst=True)  # Databases created before write markers
+        if self.sync_seconds and not self._syncing_here():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='replica-sync', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        if self._syncing_here():
+            self._stop.set()
+            self._thread.join()
+
+    def metrics(self):
+        now = time.time()
+        replicas = {}
+        for key in self.replica_keys:
+            lag = self.lag(key, now)
+            replicas[key] = {
+                "lag_seconds": None if lag is None else round(lag, 3),
+                "syncs": self.syncs[key],
+                "sync_errors": self.sync_errors[key]
+            }
+        return {
+            "replicas": replicas,
+            "max_lag_seconds": self.max_lag,
+            "replica_reads": self.replica_reads,
+            "sticky_reads": self.sticky_reads,
+            "stale_reads": self.stale_reads,
+            "sync_ms": self.sync_ms.snapshot()
+        }
+
+# ---------------------- Read-your-writes tracking ----------------------
+
+@event.listens_for(ShardedSession, 'after_flush')
+def _collect_writes(session, flush_context):
+    if has_app_context() and current_app.extensions['replica_set'].enabled:
+        written = session.info.setdefault('written_users', set())
+        for instance in itertools.chain(session.new, session.dirty, session.deleted):
+            user_id = getattr(instance, 'user_id', None)
+            if user_id is not None:
+                written.add(user_id)
+
+@event.listens_for(ShardedSession, 'after_flush_postexec')
+def _mark_writes(session, flush_context):
+    written = session.info.pop('written_users', None)
+    if written and has_app_context():
+        current_app.extensions['replica_set'].mark_writes(session, written)
+
+@event.listens_for(ShardedSession, 'after_rollback')
+def _discard_writes(session):
+    session.info.pop('written_users', None)
+
+# ---------------------- Setup and routing helpers ----------------------
+
+def configure_replicas(app):
+    """
+    Register one bind per REPLICA_URLS entry (before `db.init_app`) and the app's ReplicaSet.
+
+    Args:
+        app (Flask): The application.
+    """
+    urls = app.config['REPLICA_URLS']
+    if urls and app.config['SHARD_URLS']:
+        print("[DEBUG] REPLICA_URLS is ignored when SHARD_URLS is set; reads go to the shards.")
+        urls = []
+
+    keys = [f'replica_{index}' for index in range(len(urls))]
+    if keys:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.update(zip(keys, urls))
+        app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['replica_set'] = ReplicaSet(app, keys, sync_seconds=app.config['REPLICA_SYNC_SECONDS'],
+                                               max_lag_seconds=app.config['REPLICA_MAX_LAG_SECONDS'])
+
+def get_replicas():
+    return current_app.extensions['replica_set']
+
+def route_reads(user_id=None):
+    """
+    Send the reads of the current app context (e.g. the rest of a request) to a replica that
+    already has `user_id`'s writes, or keep them on the primary if there is none. Writes
+    (flushes and DML statements) always go to the primary.
+
+    Returns:
+        str: Bind key of the chosen replica, or None for the primary.
+    """
+    g.replica = get_replicas().choose(user_id)
+    return g.replica
+
+@contextmanager
+def replica_scope(user_id=None):
+    """
+    Like `route_reads` for the enclosed code, if running in an app context.
+    """
+    if not has_app_context():
+        yield None
+        return
+    previous = g.get('replica')
+    try:
+        yield route_reads(user_id)
+    finally:
+        g.replica = previous
@@ -0,0 +1,267 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+def jump_hash(key, buckets):
+    """
+    Jump consistent hash (Lamping & Veach). Growing from n to n + 1 buckets moves only
+    1/(n + 1) of the keys, all of them into the new bucket.
+
+    Args:
+        key (int): 64-bit key.
+        buckets (int): Number of buckets.
+
+    Returns:
+        int: Bucket index in [0, buckets).
+    """
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+def user_key(user_id):
+    """
+    Stable 64-bit hash of a user ID (Python's hash() is salted per process).
+    """
+    return int.from_bytes(hashlib.blake2b(str(user_id).encode(), digest_size=8).digest(), 'big')
+
+class ShardRouter:
+    """
+    Maps users to database shards by hashing `user_id` and routes `db.session` to them.
+
+    Each shard is a Flask-SQLAlchemy bind holding the full schema for its users (logs, predictions,
+    trend analyses and that shard's analytics rollups). Per-user code selects the user's shard for
+    the current app context; cross-user jobs use `fan_out` and merge the per-shard results.
+    With no shards configured every method is a no-op over the default database.
+    """
+
+    def __init__(self, shard_keys=()):
+        """
+        Args:
+            shard_keys (list): Bind keys of the shards, in shard order.
+        """
+        self.shard_keys = list(shard_keys)
+
+    @property
+    def enabled(self):
+        return bool(self.shard_keys)
+
+    def shard_for(self, user_id):
+        """
+        The bind key of the shard holding `user_id` (None when sharding is disabled).
+        """
+        if not self.enabled:
+            return None
+        return self.shard_keys[jump_hash(user_key(user_id), len(self.shard_keys))]
+
+    def select(self, user_id=None, shard=None):
+        """
+        Route `db.session` in the current app context (e.g. the rest of a request) to a shard.
+
+        Args:
+            user_id (str, optional): Select this user's shard.
+            shard (str, optional): Select a shard by bind key instead.
+
+        Returns:
+            str: The selected bind key.
+        """
+        g.shard = shard if shard is not None else self.shard_for(user_id)
+        return g.shard
+
+    @contextmanager
+    def scoped(self, user_id=None, shard=None):
+        """
+        Like `select`, restoring the previous shard on exit.
+        """
+        previous = g.get('shard')
+        try:
+            yield self.select(user_id=user_id, shard=shard)
+        finally:
+            g.shard = previous
+
+    def current(self):
+        shard = g.get('shard') if has_app_context() else None
+        if shard is None:
+            raise RuntimeError("Sharding is enabled but no shard is selected; use ShardRouter.select or fan_out.")
+        return shard
+
+    def partition(self, items, user_id):
+        """
+        Group items by shard.
+
+        Args:
+            items (iterable): Items to group.
+            user_id (callable): Returns the user ID of an item.
+
+        Returns:
+            dict: Bind key -> list of items, in input order.
+        """
+        groups = {}
+        for item in items:
+            groups.setdefault(self.shard_for(user_id(item)), []).append(item)
+        return groups
+
+    def engines(self, read_only=False):
+        """
+        Engine of every shard in shard order (the default engine when sharding is disabled).
+
+        Args:
+            read_only (bool): Without sharding, use a read replica when one is fresh enough.
+        """
+        from .. import db
+        if read_only and not self.enabled:
+            replica = current_app.extensions['replica_set'].choose()
+            if replica is not None:
+                return [db.engines[replica]]
+        return [db.engines[key] for key in (self.shard_keys or [None])]
+
+    def fan_out(self, func, parallel=True, read_only=False):
+        """
+        Run `func(session)` once per shard, each with its own session, for cross-user jobs.
+        Shards hold disjoint sets of users, so per-user results can be concatenated and
+        counts or rollups summed.
+
+        Args:
+            func (callable): Receives a Session bound to one shard.
+            parallel (bool): Query the shards concurrently.
+            read_only (bool): `func` only reads (it may then run on a read replica).
+
+        Returns:
+            list: The results in shard order.
+        """
+        def call(engine):
+            with Session(bind=engine) as session:
+                return func(session)
+
+        engines = self.engines(read_only=read_only)
+        if parallel and len(engines) > 1:
+            with ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix='shard-fan-out') as pool:
+                return list(pool.map(call, engines))
+        return [call(engine) for engine in engines]
+
+class ShardedSession(FlaskSession):
+    """
+    Flask-SQLAlchemy session that sends every statement to the shard selected with
+    ShardRouter (when sharding is enabled) instead of the default database, and reads to
+    the replica selected with `replicas.route_reads` (writes stay on the primary).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            router = current_app.extensions.get('shard_router')
+            if router is not None and router.enabled:
+                return self._db.engines[router.current()]
+            replica = g.get('replica')
+            if replica is not None and not self._flushing and not getattr(clause, 'is_dml', False):
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def configure_shards(app):
+    """
+    Register one bind per SHARD_URLS entry (before `db.init_app`) and the app's ShardRouter.
+
+    Args:
+        app (Flask): The application.
+    """
+    keys = [f'shard_{index}' for index in range(len(app.config['SHARD_URLS']))]
+    if keys:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.update(zip(keys, app.config['SHARD_URLS']))
+        app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['shard_router'] = ShardRouter(keys)
+
+def get_router():
+    return current_app.extensions['shard_router']
+
+@contextmanager
+def shard_scope(user_id):
+    """
+    Select `user_id`'s shard for the enclosed code, if running in an app context.
+    """
+    if not has_app_context():
+        yield None
+        return
+    with get_router().scoped(user_id=user_id) as shard:
+        yield shard
+
+# ---------------------- Resharding ----------------------
+
+def user_tables():
+    """
+    Tables whose rows belong to a single user (moved with the user when resharding).
+    """
+    from ..models import User, SymptomLog, Prediction, TrendAnalysis, UserAdherence, UserFeatures
+    return [User.__table__, SymptomLog.__table__, Prediction.__table__, TrendAnalysis.__table__,
+            UserAdherence.__table__, UserFeatures.__table__]
+
+def reshard(router, previous_keys, batch_size=500):
+    """
+    Move users to the shard `router` assigns them after the shard list changed.
+
+    Every shard in `previous_keys` is scanned; users whose shard changed are copied to
+    their new shard (surrogate integer IDs are reassigned there) and then deleted from the
+    old one. Copies replace any partial copy left by an interrupted run, so the job can be
+    re-run safely. Analytics rollups of every touched shard are rebuilt afterwards.
+    Archived log partitions are not moved: restore them (`flask restore-logs`) first.
+
+    Args:
+        router (ShardRouter): The new layout.
+        previous_keys (list): Bind keys of the old layout, in its shard order.
+        batch_size (int): Users moved per transaction.
+
+    Returns:
+        dict: Number of users moved into each shard.
+    """
+    from .. import db
+    from ..models import User, LogPartition
+    from ..analytics.rollups import RollupManager
+
+    previous = ShardRouter(previous_keys)
+    for source_key in previous.shard_keys:
+        with db.engines[source_key].connect() as connection:
+            if connection.execute(select(LogPartition.month).limit(1)).first() is not None:
+                raise RuntimeError(f"{source_key} has archived log partitions; restore them before resharding.")
+    tables = user_tables()
+    moved = {key: 0 for key in router.shard_keys}
+    touched = set()
+
+    for source_key in previous.shard_keys:
+        source = db.engines[source_key]
+        with source.connect() as connection:
+            user_ids = [row[0] for row in connection.execute(select(User.user_id))]
+
+        moving = [user_id for user_id in user_ids if router.shard_for(user_id) != source_key]
+        for start in range(0, len(moving), batch_size):
+            batch = moving[start:start + batch_size]
+            for target_key, target_users in router.partition(batch, lambda user_id: user_id).items():
+                _copy_users(source, db.engines[target_key], tables, target_users)
+                moved[target_key] += len(target_users)
+                touched.update((source_key, target_key))
+
+            with source.begin() as connection:
+                for table in reversed(tables):
+                    connection.execute(delete(table).where(table.c.user_id.in_(batch)))
+        print(f"[DEBUG] Resharding: {len(moving)} of {len(user_ids)} users moved off {source_key}.")
+
+    for key in sorted(touched):
+        with Session(bind=db.engines[key]) as session:
+            RollupManager(session, precision=current_app.config['ANALYTICS_HLL_PRECISION']).rebuild()
+    return moved
+
+def _copy_users(source, target, tables, user_ids):
+    with source.connect() as reader, target.begin() as writer:
+        for table in reversed(tables):
+            writer.execute(delete(table).where(table.c.user_id.in_(user_ids)))
+        for table in tables:
+            rows = [dict(row._mapping) for row in reader.execute(select(table).where(table.c.user_id.in_(user_ids)))]
+            if rows:
+                if 'id' in table.c and table.c.id.autoincrement:
+                    for row in rows:
+                        del row['id']
+                writer.execute(insert(table), rows)
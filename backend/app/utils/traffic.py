@@ -0,0 +1,174 @@
+import atexit
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import date, datetime
+from flask import g, request
+
+TRACE_FORMAT = 'remission-traffic'
+TRACE_VERSION = 1
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+IDENTITY_FIELDS = {'user_id'}  # Replaced by a keyed pseudonym, consistent within a capture
+SKIPPED_ENDPOINTS = {'api.metrics'}
+
+def shape(value, key=None, pseudonym=None, today=None):
+    """
+    Anonymised shape of a request value: identities become pseudonyms, YYYY-MM-DD dates become
+    day offsets from the request's date, lists keep their length, and every other scalar is
+    reduced to its type name. No recorded value can be traced back to a user or their symptoms.
+
+    Args:
+        value: A JSON or query-string value.
+        key (str): The field name the value was sent under.
+        pseudonym (callable): Maps an identity to its pseudonym.
+        today (date): Date the request was received.
+    """
+    if key in IDENTITY_FIELDS and isinstance(value, str) and pseudonym is not None:
+        return {"$id": pseudonym(value)}
+    if isinstance(value, dict):
+        return {k: shape(v, k, pseudonym, today) for k, v in value.items()}
+    if isinstance(value, list):
+        return [shape(v, key, pseudonym, today) for v in value]
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if value is None:
+        return None
+    if isinstance(value, str) and DATE_PATTERN.match(value) and today is not None:
+        try:
+            return {"$days": (date.fromisoformat(value) - today).days}
+        except ValueError:
+            pass
+    return 'str'
+
+class TrafficRecorder:
+    """
+    Opt-in request recorder: appends one anonymised event per request (arrival time, method, route
+    template, payload shape, status, duration and response size) to a gzip-compressed JSON-lines
+    trace, one file per process. `benchmarks/replay.py` re-issues traces against a local app.
+    """
+
+    def __init__(self, path, sample_rate=1.0, salt=None, flush_every=100):
+        """
+        Args:
+            path (str): Trace file; '{pid}' is replaced by the process id (appended when missing,
+                so pre-forked workers never share a file).
+            sample_rate (float): Share of requests recorded.
+            salt (bytes): Key of the user_id pseudonyms (default: random, so they cannot be reversed
+                by anyone; inherited by pre-forked workers, so pseudonyms agree across them).
+            flush_every (int): Events buffered before they are written.
+        """
+        self.path = path if '{pid}' in path else f'{path}.{{pid}}'
+        self.sample_rate = sample_rate
+        self.salt = salt or secrets.token_bytes(16)
+        self.flush_every = flush_every
+        self.recorded = 0
+        self._buffer = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def pseudonym(self, identity):
+        return hmac.new(self.salt, identity.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, event):
+        with self._lock:
+            self._buffer.append(event)
+            self.recorded += 1
+            if len(self._buffer) >= self.flush_every:
+                self._write()
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        if not self._buffer:
+            return
+        path = self.path.format(pid=os.getpid())
+        if self._pid != os.getpid():  # First write of this process: start its file with a header
+            self._pid = os.getpid()
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            if not os.path.exists(path):
+                self._buffer.insert(0, {"format": TRACE_FORMAT, "version": TRACE_VERSION,
+                                        "started_at": datetime.utcnow().isoformat(timespec='seconds')})
+        # Each flush appends a gzip member; readers see one continuous stream
+        with gzip.open(path, 'at', encoding='utf-8') as trace:
+            trace.writelines(json.dumps(event, separators=(',', ':')) + '\n' for event in self._buffer)
+        self._buffer = []
+
+    def metrics(self):
+        with self._lock:
+            return {"path": self.path, "recorded": self.recorded, "buffered": len(self._buffer),
+                    "sample_rate": self.sample_rate}
+
+def load_trace(paths):
+    """
+    Events of one or more trace files, merged and ordered by arrival time.
+
+    Returns:
+        list of dict: Recorded events.
+    """
+    events = []
+    for path in paths:
+        with gzip.open(path, 'rt', encoding='utf-8') as trace:
+            for line in trace:
+                event = json.loads(line)
+                if event.get('format') == TRACE_FORMAT:
+                    if event['version'] != TRACE_VERSION:
+                        raise ValueError(f"{path}: unsupported trace version {event['version']}")
+                    continue
+                events.append(event)
+    events.sort(key=lambda event: event['t'])
+    return events
+
+def register_traffic_capture(app):
+    """
+    Record requests to TRAFFIC_CAPTURE_PATH when it is set (app.extensions['traffic_recorder']).
+
+    Args:
+        app (Flask): The application.
+    """
+    if not app.config['TRAFFIC_CAPTURE_PATH']:
+        return
+    recorder = TrafficRecorder(app.config['TRAFFIC_CAPTURE_PATH'], sample_rate=app.config['TRAFFIC_CAPTURE_SAMPLE'])
+    app.extensions['traffic_recorder'] = recorder
+    atexit.register(recorder.flush)
+
+    @app.before_request
+    def start_capture():
+        if request.url_rule is not None and request.endpoint not in SKIPPED_ENDPOINTS and recorder.sampled():
+            g.capture_started = (time.time(), time.perf_counter())
+
+    @app.after_request
+    def capture_request(response):
+        started = g.pop('capture_started', None)
+        if started is None:
+            return response
+        arrived, perf_started = started
+        today = datetime.utcfromtimestamp(arrived).date()
+        body = request.get_json(silent=True) if request.is_json else None
+        recorder.record({
+            "t": round(arrived, 3),
+            "m": request.method,
+            "r": request.url_rule.rule,
+            "v": shape(request.view_args or {}, pseudonym=recorder.pseudonym, today=today) or None,
+            "q": shape(request.args.to_dict(), pseudonym=recorder.pseudonym, today=today) or None,
+            "b": shape(body, pseudonym=recorder.pseudonym, today=today),
+            "s": response.status_code,
+            "d": round((time.perf_counter() - perf_started) * 1000, 2),
+            "n": response.calculate_content_length()
+        })
+        return response
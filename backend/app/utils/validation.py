@@ -123,6 +123,80 @@ class InputValidator:
             return False
         return True
 
+    @staticmethod
+    def validate_idempotency_key(key):
+        """
+        Validate the Idempotency-Key a client sends so a retried write is stored only once.
+
+        Args:
+            key (str): The header value (e.g. a UUID), or None when the client sent none.
+
+        Returns:
+            bool: True if the key is absent or 1-64 characters of letters, digits, '-', '_', '.' or ':'.
+        """
+        if key is None or re.fullmatch(r'[A-Za-z0-9_.:-]{1,64}', key):
+            return True
+        print(f"Invalid idempotency key: {key!r}. Must be 1-64 letters, digits or '-_.:'.")
+        return False
+
+    @staticmethod
+    def clean_symptom_log(data):
+        """
+        Coerce the symptom fields of a /log-symptoms request to their types and validate them.
+        Numbers may arrive as JSON numbers or numeric strings, booleans also as 0/1 or "true"/"false".
+
+        Args:
+            data (dict): The request body.
+
+        Returns:
+            tuple: (dict of the cleaned fields, None), or (None, error message) when a field is invalid.
+        """
+        def to_int(value):
+            if isinstance(value, bool):
+                return None
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                return None
+            return int(number) if number.is_integer() else None
+
+        def to_float(value):
+            if isinstance(value, bool):
+                return None
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+
+        def to_bool(value):
+            if isinstance(value, str):
+                value = {'true': True, 'false': False, '1': True, '0': False}.get(value.strip().lower(), value)
+            return bool(value) if isinstance(value, (bool, int)) and value in (0, 1) else None
+
+        fields = {
+            "pain_level": to_int(data.get('pain_level')),
+            "stress_level": to_int(data.get('stress_level')),
+            "sleep_hours": to_float(data.get('sleep_hours')),
+            "exercise_done": to_bool(data.get('exercise_done')),
+            "took_medication": to_bool(data.get('took_medication'))
+        }
+        checks = {
+            "pain_level": InputValidator.validate_pain_level,
+            "stress_level": InputValidator.validate_stress_level,
+            "sleep_hours": InputValidator.validate_sleep_hours,
+            "exercise_done": InputValidator.validate_exercise_done,
+            "took_medication": InputValidator.validate_medication
+        }
+        for name, check in checks.items():
+            if not check(fields[name]):
+                return None, f"Invalid {name}: {data.get(name)!r}."
+
+        exercise_types = data.get('exercise_types', [])
+        if not isinstance(exercise_types, list) or not all(isinstance(value, str) for value in exercise_types):
+            return None, "Invalid exercise_types: must be a list of strings."
+        fields["exercise_types"] = exercise_types
+        return fields, None
+
 # Example Usage:
 # valid = InputValidator.validate_pain_level(7)
 # if not valid:
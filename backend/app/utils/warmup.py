@@ -0,0 +1,79 @@
+import threading
+import time
+
+class WarmUp:
+    """
+    Loads what `create_app` deliberately defers: pandas, the scikit-learn modules used by the ML
+    package, and the pickled flare-up model (and the registry's challenger, if any). Run in a
+    background thread it keeps those costs off both startup and the first request; run blocking
+    in a pre-fork parent it lets every worker start with them already in memory.
+    """
+
+    def __init__(self, app):
+        """
+        Args:
+            app (Flask): The application whose model should be preloaded.
+        """
+        self.app = app
+        self.done = threading.Event()
+        self.import_seconds = None
+        self.model_seconds = None
+        self.error = None
+
+    def run(self):
+        """
+        Import the ML modules and load the model (no threads are started, so this is safe before a fork).
+        """
+        try:
+            start = time.perf_counter()
+            from ..ml import batching, predictor, trend_analysis  # noqa: F401 (imports pandas and sklearn)
+            self.import_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            if 'inference_batcher' not in self.app.extensions:
+                model = predictor.FlareUpPredictor(use_lookup_table=self.app.config['PREDICTION_LOOKUP_TABLE'])
+                if model.pipeline is not None:
+                    self.app.extensions['preloaded_predictor'] = model  # Adopted by get_batcher
+            if 'shadow_scorer' not in self.app.extensions and self.app.config['MODEL_SHADOW_SAMPLE'] > 0:
+                from ..ml.model_registry import get_registry
+                registry = get_registry(self.app)
+                challenger = registry.challenger
+                if challenger:
+                    # Adopted by get_shadow
+                    self.app.extensions['preloaded_challenger'] = (challenger, registry.load(challenger))
+            self.model_seconds = time.perf_counter() - start
+            print(f"[DEBUG] Warm-up finished: imports {self.import_seconds:.2f}s, model {self.model_seconds:.2f}s.")
+        except Exception as e:
+            self.error = str(e)
+            print(f"Error during warm-up: {e}")
+        finally:
+            self.done.set()
+
+    def start(self):
+        threading.Thread(target=self.run, name='warm-up', daemon=True).start()
+
+    def metrics(self):
+        return {
+            "done": self.done.is_set(),
+            "import_seconds": self.import_seconds,
+            "model_seconds": self.model_seconds,
+            "error": self.error
+        }
+
+def start_warmup(app):
+    """
+    Run the warm-up selected by the STARTUP_WARMUP setting: 'background', 'blocking' or 'off'.
+
+    Args:
+        app (Flask): The application.
+    """
+    mode = app.config['STARTUP_WARMUP']
+    if mode == 'off':
+        return
+
+    warmup = WarmUp(app)
+    app.extensions['warmup'] = warmup
+    if mode == 'blocking':
+        warmup.run()
+    else:
+        warmup.start()
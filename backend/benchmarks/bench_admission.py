@@ -0,0 +1,79 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from .harness import summarize
+
+def _spike_config(path, admission):
+    from config import TestingConfig
+
+    class SpikeConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 30}}
+        ADMISSION_CONTROL_ENABLED = admission
+    return SpikeConfig
+
+def run(results, app, user_ids, frame, size, repeat=1, clients=64, seconds=5.0, client_timeout=2.0):
+    """
+    A spike of `clients` concurrent clients sending /log-symptoms and /bot-analysis to a file-backed
+    database, with and without admission control: latency of the accepted requests, goodput
+    (accepted and answered within `client_timeout`, after which a real client has given up) and
+    rejections by status.
+    """
+    from app import create_app, db
+    from .fixtures import copy_database
+
+    for admission in (False, True):
+        with tempfile.TemporaryDirectory() as workdir:
+            path = copy_database(app, os.path.join(workdir, 'spike.db'))
+            spike_app = create_app(_spike_config(path, admission))
+
+            stop = threading.Event()
+            barrier = threading.Barrier(clients + 1)
+            latencies, statuses = [], Counter()
+
+            def client(seed):
+                rng = random.Random(seed)
+                test_client = spike_app.test_client()
+                barrier.wait()
+                while not stop.is_set():
+                    user_id = rng.choice(user_ids)
+                    started = time.perf_counter()
+                    if rng.random() < 0.5:
+                        response = test_client.post('/api/log-symptoms', json={
+                            "user_id": user_id,
+                            "pain_level": rng.randint(1, 10),
+                            "stress_level": rng.randint(1, 10),
+                            "sleep_hours": round(rng.uniform(4.0, 9.0), 1),
+                            "exercise_done": False,
+                            "took_medication": True
+                        })
+                    else:
+                        response = test_client.post('/api/bot-analysis', json={"user_id": user_id})
+                    elapsed = time.perf_counter() - started
+                    statuses[response.status_code] += 1
+                    if response.status_code in (200, 201):
+                        latencies.append(elapsed)
+                    else:
+                        time.sleep(min(int(response.headers.get('Retry-After', 0)), 1) * rng.random())
+
+            threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+            for thread in threads:
+                thread.start()
+            barrier.wait()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            with spike_app.app_context():
+                db.engine.dispose()
+
+            latencies.sort()
+            mode = 'admission' if admission else 'unlimited'
+            results.add(f'admission.spike.{mode}', size, summarize(latencies or [0.0]), clients=clients,
+                        p99_ms=round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else None,
+                        accepted=len(latencies),
+                        goodput_per_second=round(sum(latency <= client_timeout for latency in latencies) / seconds, 1),
+                        **{f'status_{status}': count for status, count in sorted(statuses.items())})
@@ -0,0 +1,37 @@
+import random
+from .harness import measure
+
+def run(results, app, user_ids, frame, size, repeat=5):
+    """
+    Benchmark every `/api` route through the Flask test client.
+    """
+    client = app.test_client()
+    rng = random.Random(0)
+    busiest_user = frame['user_id'].value_counts().idxmax()
+
+    def new_log():
+        return {
+            "user_id": rng.choice(user_ids),
+            "pain_level": rng.randint(1, 10),
+            "stress_level": rng.randint(1, 10),
+            "sleep_hours": round(rng.uniform(4.0, 9.0), 1),
+            "exercise_done": True,
+            "exercise_types": ["cardio"],
+            "took_medication": rng.random() < 0.7
+        }
+
+    results.add('api.auto_assign_user.validate', size, measure(
+        lambda: client.post('/api/auto-assign-user', json={"user_id": user_ids[0]}), repeat=repeat, number=20))
+    results.add('api.auto_assign_user.create', size, measure(
+        lambda: client.post('/api/auto-assign-user', json={}), repeat=repeat, number=20))
+    results.add('api.log_symptoms', size, measure(
+        lambda: client.post('/api/log-symptoms', json=new_log()), repeat=repeat, number=20))
+    results.add('api.symptom_logs', size, measure(
+        lambda: client.get(f'/api/symptom-logs?user_id={busiest_user}'), repeat=repeat, number=5),
+        rows=int((frame['user_id'] == busiest_user).sum()))
+    results.add('api.bot_analysis', size, measure(
+        lambda: client.post('/api/bot-analysis', json={"user_id": busiest_user}), repeat=repeat, number=20))
+    results.add('api.analytics', size, measure(
+        lambda: client.get('/api/analytics'), repeat=repeat, number=5))
+    results.add('api.analytics.approximate', size, measure(
+        lambda: client.get('/api/analytics?approximate=true'), repeat=repeat, number=5))
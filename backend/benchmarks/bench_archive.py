@@ -0,0 +1,76 @@
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from .harness import measure
+
+def _archived_config(workdir):
+    from config import TestingConfig
+
+    class ArchivedConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'remission.db')}"
+        ARCHIVE_DIR = os.path.join(workdir, 'archive')
+    return ArchivedConfig
+
+def _footprint(engine):
+    """
+    Bytes of the symptom_logs table and its history index (SQLite dbstat), and of the database file.
+    """
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        connection.execute(text('VACUUM'))
+        sizes = dict(connection.execute(text(
+            "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ('symptom_logs', 'ix_symptom_logs_user_id_logged_at') "
+            "GROUP BY name")).all())
+    return {"table_bytes": sizes.get('symptom_logs', 0),
+            "index_bytes": sizes.get('ix_symptom_logs_user_id_logged_at', 0),
+            "file_bytes": os.path.getsize(engine.url.database)}
+
+def run(results, app, user_ids, frame, size, repeat=5, older_than_days=90, requests=50):
+    """
+    /symptom-logs for the last 30 days and for the full history, before and after archiving
+    every month older than `older_than_days`, with the hot table, index and file sizes and the
+    size of the compressed partitions.
+    """
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import User, SymptomLog
+    from app.utils.log_archive import get_archive
+
+    columns = frame.drop(columns=['flare_up']).astype({'exercise_done': bool, 'took_medication': bool})
+    columns['logged_at'] = columns['logged_at'].dt.to_pydatetime()
+    rows = columns.to_dict('records')
+    recent = (datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%d')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        archived_app = create_app(_archived_config(workdir))
+        with archived_app.app_context():
+            db.create_all(bind_key=None)
+            db.session.execute(insert(User), [{"user_id": user_id} for user_id in user_ids])
+            for start in range(0, len(rows), 50_000):
+                db.session.execute(insert(SymptomLog), rows[start:start + 50_000])
+            db.session.commit()
+            engine = db.engine
+
+        client = archived_app.test_client()
+        sample = random.Random(0).choices(user_ids, k=requests)
+
+        def read(query):
+            for user_id in sample:
+                client.get(f'/api/symptom-logs?user_id={user_id}{query}')
+
+        for phase in ('hot', 'archived'):
+            if phase == 'archived':
+                with archived_app.app_context():
+                    job = measure(lambda: get_archive().archive(db.session, older_than_days), repeat=1)
+                    partitions = get_archive().partitions(db.session)
+                results.add('archive.job', size, job, months=len(partitions),
+                            archived_rows=sum(partition.row_count for partition in partitions),
+                            archive_bytes=sum(partition.size_bytes for partition in partitions))
+
+            footprint = _footprint(engine)
+            results.add(f'archive.read.recent.{phase}', size, measure(lambda: read(f'&start={recent}'), repeat=repeat),
+                        requests=requests, **footprint)
+            results.add(f'archive.read.full.{phase}', size, measure(lambda: read(''), repeat=repeat),
+                        requests=requests, cached_bytes=archived_app.extensions['log_archive'].metrics()['cached_bytes'])
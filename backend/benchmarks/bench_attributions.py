@@ -0,0 +1,61 @@
+import numpy as np
+from .harness import measure, summarize
+
+FEATURE_COLUMNS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type']
+
+def run(results, app, user_ids, frame, size, repeat=5, tolerance=1e-9, budget_ms=2.0, requests=500):
+    """
+    Per-prediction feature contributions: additivity against the pipeline's probabilities, the
+    latency of one uncached and one cached bot-analysis explanation (the uncached median must stay
+    within `budget_ms`), a five-log insights batch, and bulk throughput.
+    """
+    import time
+    import pandas as pd
+    from app.ml.attributions import ContributionExplainer, feature_rows
+    from app.ml.predictor import FlareUpPredictor
+
+    pipeline = FlareUpPredictor().pipeline
+    if pipeline is None:
+        print("No trained model available; skipping attribution benchmarks.")
+        return
+
+    explainers = []
+    results.add('attributions.build', size, measure(lambda: explainers.append(ContributionExplainer(pipeline)),
+                                                     repeat=1))
+    explainer = explainers[-1]
+
+    logs = frame[FEATURE_COLUMNS].head(10_000)
+    rows = feature_rows(logs)
+    probabilities, contributions = explainer.explain(rows)
+    model_input = pd.DataFrame(rows, columns=FEATURE_COLUMNS)
+    model_input['exercise_type'] = [np.nan if value is None else value for value in model_input['exercise_type']]
+    expected = pipeline.predict_proba(model_input)[:, 1]
+    difference = float(np.abs(probabilities - expected).max())
+    if difference > tolerance:
+        raise AssertionError(f"Contributions do not add up to the predicted probability (off by {difference})")
+
+    # One request's explanation, every row new to the cache (the worst case for /bot-analysis)
+    uncached = ContributionExplainer(pipeline, cache_size=0)
+    samples = []
+    for row in rows[:requests]:
+        started = time.perf_counter()
+        uncached.explain([row])
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    stats = summarize(samples)
+    if stats['median'] * 1000 > budget_ms:
+        raise AssertionError(f"Uncached explanation takes {stats['median'] * 1000:.2f}ms, over the {budget_ms}ms budget")
+    results.add('attributions.explain.single', size, stats, budget_ms=budget_ms, max_difference=difference,
+                p99_ms=round(samples[int(len(samples) * 0.99)] * 1000, 3))
+
+    single = rows[:1]
+    results.add('attributions.explain.cached', size, measure(lambda: explainer.explain(single), repeat=repeat,
+                                                             number=100))
+    recent = logs.tail(5)
+    results.add('attributions.explain.recent_logs', size,
+                measure(lambda: uncached.explain_frame(recent), repeat=repeat, number=20))
+
+    bulk = ContributionExplainer(pipeline, cache_size=0)
+    stats = measure(lambda: bulk.explain(rows), repeat=repeat)
+    results.add('attributions.explain.batch', size, stats, rows=len(rows),
+                rows_per_second=round(len(rows) / stats['median']))
@@ -0,0 +1,57 @@
+import threading
+import time
+from .harness import measure
+
+FEATURE_COLUMNS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type']
+
+def _throughput(score, rows, clients, requests_per_client):
+    """
+    Run `clients` threads that each score `requests_per_client` single rows; returns requests/second.
+    """
+    barrier = threading.Barrier(clients + 1)
+
+    def client(offset):
+        barrier.wait()
+        for i in range(requests_per_client):
+            score(rows[(offset + i) % len(rows)])
+
+    threads = [threading.Thread(target=client, args=(n * requests_per_client,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return clients * requests_per_client / (time.perf_counter() - start)
+
+def run(results, app, user_ids, frame, size, repeat=3, clients=(1, 100, 200), requests_per_client=10):
+    """
+    Compare per-request `predict_proba` calls with the micro-batcher under concurrent clients.
+    """
+    import pandas as pd
+    from app.ml.predictor import FlareUpPredictor
+    from app.ml.batching import MicroBatcher
+
+    pipeline = FlareUpPredictor().pipeline
+    if pipeline is None:
+        print("No trained model available; skipping batching benchmarks.")
+        return
+
+    rows = frame[FEATURE_COLUMNS].head(1000).to_dict('records')
+
+    def direct(row):
+        pipeline.predict_proba(pd.DataFrame([row], columns=FEATURE_COLUMNS))
+
+    for count in clients:
+        batcher = MicroBatcher(pipeline, max_batch_size=app.config['INFERENCE_MAX_BATCH_SIZE'],
+                               max_wait_ms=app.config['INFERENCE_MAX_WAIT_MS'])
+        throughput = {}
+        for name, score in (('direct', direct), ('batched', batcher.predict_proba)):
+            samples = []
+            stats = measure(lambda: samples.append(_throughput(score, rows, count, requests_per_client)), repeat=repeat)
+            throughput[name] = max(samples)
+            results.add(f'inference.{name}.clients_{count}', size, stats,
+                        requests_per_second=round(throughput[name]))
+        print(f"  {count} clients: batching speedup x{throughput['batched'] / throughput['direct']:.1f}, "
+              f"mean batch size {batcher.metrics()['batch_size']['mean']}")
+        batcher.close()
@@ -0,0 +1,85 @@
+from datetime import datetime
+from .harness import measure
+
+def run(results, app, user_ids, frame, size, repeat=3, orm_rows=200, bulk_rows=10_000):
+    """
+    Benchmark symptom log insert throughput: one ORM commit per row vs. one bulk insert, and the
+    repository layer's upsert and fetch-many against ORM loads.
+    """
+    from sqlalchemy import insert
+    from app import db
+    from app.models import User, SymptomLog
+    from app.utils.db_utils import UnitOfWork
+
+    def row(i):
+        return {
+            "user_id": user_ids[i % len(user_ids)],
+            "pain_level": 1 + i % 10,
+            "stress_level": 1 + (i * 7) % 10,
+            "sleep_hours": 4.0 + (i % 50) / 10,
+            "exercise_done": bool(i % 2),
+            "exercise_type": "cardio" if i % 2 else None,
+            "took_medication": bool(i % 3),
+            "logged_at": datetime.utcnow()
+        }
+
+    with app.app_context():
+        def orm_inserts():
+            for i in range(orm_rows):
+                db.session.add(SymptomLog(**row(i)))
+                db.session.commit()
+
+        stats = measure(orm_inserts, repeat=repeat)
+        results.add('db.insert.orm_per_row_commit', size, stats, rows=orm_rows,
+                    rows_per_second=round(orm_rows / stats['median']))
+
+        rows = [row(i) for i in range(bulk_rows)]
+
+        def bulk_insert():
+            db.session.execute(insert(SymptomLog), rows)
+            db.session.commit()
+
+        stats = measure(bulk_insert, repeat=repeat)
+        results.add('db.insert.bulk', size, stats, rows=bulk_rows,
+                    rows_per_second=round(bulk_rows / stats['median']))
+
+        def repository_insert():
+            with UnitOfWork(db.session) as uow:
+                uow.repository(SymptomLog).insert_many(rows)
+
+        stats = measure(repository_insert, repeat=repeat)
+        results.add('db.insert.repository', size, stats, rows=bulk_rows,
+                    rows_per_second=round(bulk_rows / stats['median']))
+
+        users = [{"user_id": user_id, "created_at": datetime(2024, 1, 1)} for user_id in user_ids]
+
+        def orm_upsert():
+            for user in users:
+                existing = User.query.filter_by(user_id=user['user_id']).first()
+                if existing is None:
+                    db.session.add(User(**user))
+                else:
+                    existing.created_at = user['created_at']
+            db.session.commit()
+
+        def repository_upsert():
+            with UnitOfWork(db.session) as uow:
+                uow.repository(User).upsert_many(users, keys=['user_id'])
+
+        for name, func in [('orm', orm_upsert), ('repository', repository_upsert)]:
+            stats = measure(func, repeat=repeat)
+            results.add(f'db.upsert_users.{name}', size, stats, rows=len(users),
+                        rows_per_second=round(len(users) / stats['median']))
+
+        sample = user_ids[:100]
+
+        def orm_fetch():
+            return SymptomLog.query.filter(SymptomLog.user_id.in_(sample)).all()
+
+        def repository_fetch():
+            return UnitOfWork(db.session).repository(SymptomLog).fetch_many(sample)
+
+        for name, func in [('orm', orm_fetch), ('repository', repository_fetch)]:
+            stats = measure(func, repeat=repeat)
+            results.add(f'db.fetch_many.{name}', size, stats, users=len(sample), rows=len(func()))
+            db.session.rollback()
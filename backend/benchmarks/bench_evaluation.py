@@ -0,0 +1,81 @@
+import os
+import tempfile
+import time
+from .fixtures import copy_database
+from .harness import measure, summarize
+
+def run(results, app, user_ids, frame, size, repeat=5, requests=200):
+    """
+    Champion/challenger evaluation: offline replay throughput of every seeded log through two models,
+    in this process and in parallel worker processes (on a file copy of the database), and the
+    /predict-flare-up latency with and without a shadow-scored challenger. The live model is its own
+    challenger here, so the replay must report full agreement.
+    """
+    from sqlalchemy import create_engine
+    from app import db
+    from app.ml.evaluation import OfflineEvaluator
+    from app.ml.model_registry import ShadowScorer
+    from app.ml.predictor import FlareUpPredictor
+
+    pipeline = FlareUpPredictor().pipeline
+    if pipeline is None:
+        print("No trained model available; skipping evaluation benchmarks.")
+        return
+    pipelines = {'champion': pipeline, 'challenger': pipeline}
+    archive = app.extensions['log_archive']
+
+    reports = []
+    with app.app_context():
+        engine = db.engine
+        stats = measure(lambda: reports.append(OfflineEvaluator(pipelines, workers=1).run([engine], archive=archive)), repeat=1)
+    report = reports[-1]
+    if report['agreement']['challenger']['rate'] != 1.0:
+        raise AssertionError(f"A model disagrees with itself: {report['agreement']}")
+    results.add('evaluation.replay.in_process', size, stats, logs=report['logs'],
+                logs_per_second=round(report['logs'] / stats['median']),
+                microseconds_per_log=report['models']['champion']['microseconds_per_log'])
+
+    workers = min(os.cpu_count() or 1, 4)
+    with tempfile.TemporaryDirectory() as workdir:
+        file_engine = create_engine(f"sqlite:///{copy_database(app, os.path.join(workdir, 'replay.db'))}")
+        # Includes starting the worker processes and loading the models in each
+        stats = measure(lambda: reports.append(
+            OfflineEvaluator(pipelines, workers=workers, chunk_size=max(len(frame) // (workers * 4), 1000))
+            .run([file_engine], archive=archive)), repeat=1)
+        file_engine.dispose()
+    results.add('evaluation.replay.parallel', size, stats, logs=reports[-1]['logs'], workers=workers,
+                chunks=reports[-1]['chunks'], logs_per_second=round(reports[-1]['logs'] / stats['median']))
+
+    client = app.test_client()
+    targets = [user_ids[n % len(user_ids)] for n in range(requests)]
+
+    def latencies():
+        samples = []
+        for user_id in targets:
+            started = time.perf_counter()
+            response = client.post('/api/predict-flare-up', json={"user_id": user_id})
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise AssertionError(f"/predict-flare-up answered {response.status_code}")
+        samples.sort()
+        return samples
+
+    previous = app.extensions.get('shadow_scorer')
+    app.extensions['shadow_scorer'] = None
+    latencies()  # Loads the champion and fills the hot windows
+    baseline = latencies()
+    shadow = app.extensions['shadow_scorer'] = ShadowScorer('challenger', pipeline)
+    try:
+        shadowed = latencies()
+        deadline = time.perf_counter() + 10
+        while shadow.metrics()['scored'] + shadow.dropped < len(targets) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        app.extensions['shadow_scorer'] = previous
+        shadow.close()
+
+    metrics = shadow.metrics()
+    results.add('evaluation.predict.no_shadow', size, summarize(baseline), requests=requests)
+    results.add('evaluation.predict.shadow', size, summarize(shadowed), requests=requests,
+                scored=metrics['scored'], dropped=metrics['dropped'], agreement=metrics['agreement'],
+                challenger_latency_mean_ms=metrics['latency_ms']['mean'])
@@ -0,0 +1,55 @@
+import numpy as np
+from .harness import measure
+
+FEATURE_COLUMNS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type']
+
+def run(results, app, user_ids, frame, size, repeat=5):
+    """
+    "Score all users": latest log per user through a DataFrame and the full pipeline, against one
+    model pass over the feature store's matrix. Also the store rebuild and single-row encoding.
+    """
+    import pandas as pd
+    from sqlalchemy import func, select
+    from app import db
+    from app.ml.feature_store import FeatureEncoder, FeatureStore, first_exercise_type
+    from app.ml.predictor import FlareUpPredictor
+    from app.models import SymptomLog
+
+    pipeline = FlareUpPredictor().pipeline
+    if pipeline is None:
+        return
+    store = FeatureStore(FeatureEncoder(pipeline))
+
+    def score_with_pandas():
+        newest = select(func.max(SymptomLog.id)).group_by(SymptomLog.user_id).scalar_subquery()
+        rows = db.session.execute(select(SymptomLog).where(SymptomLog.id.in_(newest))).scalars().all()
+        data = pd.DataFrame([{
+            "pain_level": log.pain_level,
+            "stress_level": log.stress_level,
+            "sleep_hours": log.sleep_hours,
+            "exercise_done": int(log.exercise_done),
+            "took_medication": int(log.took_medication),
+            "exercise_type": first_exercise_type(log.exercise_type)
+        } for log in rows], columns=FEATURE_COLUMNS)
+        return [log.user_id for log in rows], pipeline.predict_proba(data)[:, 1]
+
+    with app.app_context():
+        results.add('features.rebuild', size, measure(lambda: store.rebuild(db.session), repeat=1), users=len(user_ids))
+
+        expected = dict(zip(*score_with_pandas()))
+        scored = dict(zip(*store.score_all(db.session)))
+        if expected.keys() != scored.keys() or not np.allclose([expected[u] for u in expected],
+                                                               [scored[u] for u in expected], atol=1e-6):
+            raise AssertionError("Feature store scores differ from the pipeline")
+
+        results.add('features.score_all.pandas', size, measure(score_with_pandas, repeat=repeat), users=len(expected))
+        results.add('features.score_all.store', size, measure(lambda: store.score_all(db.session), repeat=repeat),
+                    users=len(scored), dimension=store.encoder.dimension)
+        db.session.rollback()
+
+    row = frame[FEATURE_COLUMNS].iloc[[0]]
+    row_dict = {**row.iloc[0].to_dict(), "exercise_type": first_exercise_type(row.iloc[0]['exercise_type'])}
+    results.add('features.predict.single.pipeline', size, measure(lambda: pipeline.predict_proba(row), repeat=repeat,
+                                                                  number=20))
+    results.add('features.predict.single.encoder', size, measure(lambda: store.encoder.predict_proba([row_dict]),
+                                                                 repeat=repeat, number=20))
@@ -0,0 +1,77 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from .harness import measure
+
+def write_load(app, user_ids, writers, logs_per_writer):
+    """
+    `writers` threads each POST `logs_per_writer` logs; returns (logs/second, error count).
+    """
+    barrier = threading.Barrier(writers + 1)
+    errors = []
+
+    def writer(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        barrier.wait()
+        for _ in range(logs_per_writer):
+            response = client.post('/api/log-symptoms', json={
+                "user_id": rng.choice(user_ids),
+                "pain_level": rng.randint(1, 10),
+                "stress_level": rng.randint(1, 10),
+                "sleep_hours": round(rng.uniform(4.0, 9.0), 1),
+                "exercise_done": False,
+                "took_medication": True
+            })
+            if response.status_code != 201:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return writers * logs_per_writer / (time.perf_counter() - start), len(errors)
+
+def run(results, app, user_ids, frame, size, repeat=1, writers=(50, 200, 500), logs_per_writer=4):
+    """
+    Per-request commits vs. group commit with many concurrent writers on a file-backed SQLite database
+    (an in-memory database never fsyncs, which is what group commit saves).
+    """
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import User
+    from config import TestingConfig
+
+    for group_commit in (False, True):
+        with tempfile.TemporaryDirectory() as workdir:
+            class FileConfig(TestingConfig):
+                SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+                SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 30}}
+                GROUP_COMMIT_ENABLED = group_commit
+
+            file_app = create_app(FileConfig)
+            with file_app.app_context():
+                db.create_all(bind_key=None)
+                db.session.execute(insert(User), [{"user_id": user_id} for user_id in user_ids])
+                db.session.commit()
+
+            mode = 'group_commit' if group_commit else 'per_request_commit'
+            for count in writers:
+                samples = []
+                stats = measure(lambda: samples.append(write_load(file_app, user_ids, count, logs_per_writer)),
+                                repeat=repeat)
+                throughput, errors = samples[-1]
+                results.add(f'db.write.{mode}.writers_{count}', size, stats,
+                            logs_per_second=round(throughput), errors=errors)
+
+            if group_commit:
+                writer = file_app.extensions['group_commit_writer']
+                print(f"  mean commit batch size {writer.metrics()['commit_batch_size']['mean']}")
+                writer.close()
+            with file_app.app_context():
+                db.engine.dispose()
@@ -0,0 +1,108 @@
+import random
+import socket
+import threading
+import time
+from .harness import summarize
+
+def _open_stream(port, user_id):
+    connection = socket.create_connection(('127.0.0.1', port), timeout=10)
+    connection.sendall(f"GET /api/live-updates?user_id={user_id} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    return connection
+
+def _read_until(connection, marker, buffer):
+    # Read until `marker` is in the buffer; returns what follows its first occurrence
+    while marker not in buffer[0]:
+        chunk = connection.recv(65536)
+        if not chunk:
+            raise AssertionError("The live update server closed the stream")
+        buffer[0] += chunk
+    buffer[0] = buffer[0].split(marker, 1)[1]
+
+def _log(client, user_id, rng):
+    response = client.post('/api/log-symptoms', json={
+        "user_id": user_id,
+        "pain_level": rng.randint(1, 10),
+        "stress_level": rng.randint(1, 10),
+        "sleep_hours": round(rng.uniform(4.0, 9.0), 1),
+        "exercise_done": False,
+        "took_medication": True
+    })
+    if response.status_code != 201:
+        raise AssertionError(f"/log-symptoms answered {response.status_code}")
+
+def run(results, app, user_ids, frame, size, repeat=5, idle=2000, writes=200, sockets=1000):
+    """
+    Push latency of /api/live-updates: time from a /log-symptoms response to its analysis frame
+    reaching a subscriber, with `idle` other open streams (spread over the seeded users) that
+    only receive their own users' frames. Measured on the hub, then end to end through the
+    event loop server with `sockets` idle TCP streams, which must not add a thread each.
+    """
+    hub = app.extensions.get('live_updates')
+    if hub is None:
+        print("Live updates are disabled; skipping live update benchmarks.")
+        return
+
+    rng = random.Random(0)
+    watched = user_ids[0]
+    max_connections, hub.max_connections = hub.max_connections, max(hub.max_connections, idle + 1)
+    idle_subscriptions = [hub.subscribe(user_ids[1 + n % (len(user_ids) - 1)]) for n in range(idle)]
+    subscription = hub.subscribe(watched)
+    client = app.test_client()
+    latencies = []
+    try:
+        for _ in range(writes):
+            _log(client, watched, rng)
+            committed = time.perf_counter()
+            # The log frame comes first, then the analysis
+            while True:
+                item = subscription.next(5.0)
+                if item is None:
+                    raise AssertionError("No analysis pushed within 5s")
+                if 'event: analysis' in item:
+                    break
+            latencies.append(time.perf_counter() - committed)
+    finally:
+        for idle_subscription in idle_subscriptions + [subscription]:
+            hub.unsubscribe(idle_subscription)
+        hub.max_connections = max_connections
+
+    latencies.sort()
+    metrics = hub.metrics()
+    results.add('live_updates.push', size, summarize(latencies), idle_streams=idle, writes=writes,
+                p99_ms=round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+                fanout_mean_ms=metrics['fanout_ms']['mean'])
+
+    from app.utils.live_updates import LiveUpdateServer
+
+    server = LiveUpdateServer(hub, host='127.0.0.1', port=0)
+    if not server.start():
+        raise AssertionError(f"The live update server did not start: {server.error}")
+    threads = threading.active_count()
+    hub.max_connections = max(hub.max_connections, sockets + 1)
+    connections = []
+    try:
+        connections = [_open_stream(server.port, user_ids[1 + n % (len(user_ids) - 1)]) for n in range(sockets)]
+        watched_stream, buffer = _open_stream(server.port, watched), [b'']
+        connections.append(watched_stream)
+        _read_until(watched_stream, b'event: analysis', buffer)  # The current analysis
+        deadline = time.perf_counter() + 30
+        while hub.connections < sockets + 1 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        open_streams, threads_added = hub.connections, threading.active_count() - threads
+
+        latencies = []
+        for _ in range(writes):
+            _log(client, watched, rng)
+            committed = time.perf_counter()
+            _read_until(watched_stream, b'event: analysis', buffer)
+            latencies.append(time.perf_counter() - committed)
+    finally:
+        for connection in connections:
+            connection.close()
+        hub.max_connections = max_connections
+
+    if open_streams < sockets + 1:
+        raise AssertionError(f"Only {open_streams} of {sockets + 1} streams opened")
+    latencies.sort()
+    results.add('live_updates.push.socket', size, summarize(latencies), idle_streams=sockets, writes=writes,
+                p99_ms=round(latencies[int(len(latencies) * 0.99)] * 1000, 2), threads_added=threads_added)
@@ -0,0 +1,36 @@
+from .harness import measure
+
+FEATURE_COLUMNS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type']
+
+def run(results, app, user_ids, frame, size, repeat=5, tolerance=1e-6):
+    """
+    Parity check and timings of the prediction lookup table against the pipeline path.
+    """
+    from app.ml.predictor import FlareUpPredictor
+    from app.ml.lookup_table import PredictionLookupTable
+
+    pipeline = FlareUpPredictor().pipeline
+    if pipeline is None:
+        print("No trained model available; skipping lookup table benchmarks.")
+        return
+
+    tables = []
+    results.add('lookup.build', size, measure(lambda: tables.append(PredictionLookupTable(pipeline)), repeat=1))
+    table = tables[-1]
+
+    features = frame[FEATURE_COLUMNS].head(100_000)
+    difference = table.max_difference(features)
+    if difference > tolerance:
+        raise AssertionError(f"Lookup table disagrees with the pipeline by {difference}")
+
+    single = features.iloc[[0]]
+    results.add('lookup.predict.single', size, measure(lambda: table.predict_proba(single), repeat=repeat, number=20),
+                max_difference=difference)
+    results.add('pipeline.predict.single', size, measure(lambda: pipeline.predict_proba(single), repeat=repeat, number=20))
+
+    stats = measure(lambda: table.predict_proba(features), repeat=repeat)
+    results.add('lookup.predict.batch', size, stats, rows=len(features),
+                rows_per_second=round(len(features) / stats['median']))
+    stats = measure(lambda: pipeline.predict_proba(features), repeat=repeat)
+    results.add('pipeline.predict.batch', size, stats, rows=len(features),
+                rows_per_second=round(len(features) / stats['median']))
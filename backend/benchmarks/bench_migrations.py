@@ -0,0 +1,143 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from .harness import summarize
+
+def _file_config(path):
+    from config import TestingConfig
+
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 60}}
+    return FileConfig
+
+def _blocking(engine):
+    """
+    The change as a regular Alembic revision: batch_alter_table recreates the table with one
+    INSERT ... SELECT and rebuilds its indexes, all in one transaction.
+    """
+    import sqlalchemy as sa
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    with engine.begin() as connection:
+        with Operations(MigrationContext.configure(connection)).batch_alter_table('symptom_logs', recreate='always') as batch:
+            batch.add_column(sa.Column('severity', sa.Integer(), nullable=True))
+            batch.create_index('ix_symptom_logs_severity', ['severity'])
+
+def _online(engine):
+    import sqlalchemy as sa
+    from app.utils.online_migration import OnlineMigration
+
+    OnlineMigration(engine, 'symptom_logs', 'bench_severity',
+                    add_columns=[sa.Column('severity', sa.Integer(), nullable=True)],
+                    add_indexes=[sa.Index('ix_symptom_logs_severity', 'severity')]).run()
+
+def _check_parent_table(path):
+    """
+    Migrate `users`, which other tables reference, and check the foreign keys survived the swap.
+
+    Returns:
+        float: Migration seconds.
+    """
+    import sqlalchemy as sa
+    from sqlalchemy import create_engine, text
+    from app.utils.online_migration import OnlineMigration
+
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        started = time.perf_counter()
+        OnlineMigration(engine, 'users', 'bench_users_locale',
+                        add_columns=[sa.Column('locale', sa.String(10), nullable=True)]).run()
+        duration = time.perf_counter() - started
+        with engine.connect() as connection:
+            violations = connection.exec_driver_sql('PRAGMA foreign_key_check').all()
+            stale = connection.execute(text("SELECT name FROM sqlite_master WHERE sql LIKE '%\\_users\\_old%' "
+                                            "ESCAPE '\\'")).scalars().all()
+            sa.MetaData().reflect(connection)  # Fails when a REFERENCES clause names a missing table
+        if violations or stale:
+            raise AssertionError(f"Migrating users broke foreign keys: {len(violations)} violations, "
+                                 f"tables referencing the dropped table: {stale}")
+        return duration
+    finally:
+        engine.dispose()
+
+def run(results, app, user_ids, frame, size, repeat=1, writers=4, idle_seconds=5.0):
+    """
+    Latency of concurrent /log-symptoms writes while symptom_logs gets a new column and index:
+    without a migration, during a blocking Alembic batch migration, and during an online one
+    (throttled shadow copy, dual-write triggers, atomic swap). Every acknowledged write must be
+    in the migrated table, and migrating a referenced table (users) must leave every foreign key intact.
+    """
+    from sqlalchemy import func, select
+    from app import create_app, db
+    from app.models import SymptomLog
+    from .fixtures import clone, copy_database
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seeded = copy_database(app, os.path.join(workdir, 'seeded.db'))
+
+        for phase, migrate in (('none', None), ('blocking', _blocking), ('online', _online)):
+            path = os.path.join(workdir, f'{phase}.db')
+            clone(seeded, path)
+            phase_app = create_app(_file_config(path))
+            with phase_app.app_context():
+                initial = db.session.execute(select(func.count()).select_from(SymptomLog)).scalar()
+                db.session.remove()
+            stop = threading.Event()
+            latencies, acknowledged, errors = [], [], []
+
+            def post(client, rng):
+                return client.post('/api/log-symptoms', json={
+                    "user_id": rng.choice(user_ids),
+                    "pain_level": rng.randint(1, 10),
+                    "stress_level": rng.randint(1, 10),
+                    "sleep_hours": round(rng.uniform(4.0, 9.0), 1),
+                    "exercise_done": False,
+                    "took_medication": True
+                })
+
+            def writer(seed):
+                rng = random.Random(seed)
+                client = phase_app.test_client()
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    response = post(client, rng)
+                    latencies.append(time.perf_counter() - started)
+                    (acknowledged if response.status_code == 201 else errors).append(response.status_code)
+
+            # First request outside the measurement (lazy imports, hot window load)
+            if post(phase_app.test_client(), random.Random(-1)).status_code == 201:
+                acknowledged.append(201)
+
+            threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+            for thread in threads:
+                thread.start()
+            with phase_app.app_context():
+                started = time.perf_counter()
+                if migrate is None:
+                    time.sleep(idle_seconds)
+                else:
+                    migrate(db.engine)
+                duration = time.perf_counter() - started
+                stop.set()
+                for thread in threads:
+                    thread.join()
+                stored = db.session.execute(select(func.count()).select_from(SymptomLog)).scalar()
+                db.session.remove()
+                db.engine.dispose()
+
+            if stored != initial + len(acknowledged):
+                raise AssertionError(f"{phase}: {initial + len(acknowledged) - stored} acknowledged writes lost")
+            latencies.sort()
+            results.add(f'migrations.write_latency.{phase}', size, summarize(latencies),
+                        migration_seconds=round(duration, 3), writes=len(acknowledged), errors=len(errors),
+                        writes_per_second=round(len(latencies) / duration),
+                        p99_ms=round(latencies[int(len(latencies) * 0.99)] * 1000, 1))
+
+        parent = clone(seeded, os.path.join(workdir, 'parent.db'))
+        duration = _check_parent_table(parent)
+        results.add('migrations.online.parent_table', size, summarize([duration]), table='users',
+                    foreign_key_violations=0)
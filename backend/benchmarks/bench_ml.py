@@ -0,0 +1,55 @@
+import os
+import tempfile
+from .harness import measure
+
+FEATURE_COLUMNS = ['pain_level', 'stress_level', 'sleep_hours', 'exercise_done', 'took_medication', 'exercise_type']
+
+def run(results, app, user_ids, frame, size, repeat=5, max_training_rows=200_000):
+    """
+    Benchmark FlareUpPredictor inference and training, and TrendAnalyzer per-user analysis.
+    """
+    from app import db
+    from app.ml.predictor import FlareUpPredictor
+    from app.ml.trend_analysis import TrendAnalyzer
+
+    predictor = FlareUpPredictor()
+    features = frame[FEATURE_COLUMNS]
+
+    if predictor.pipeline is not None:
+        single = features.iloc[[0]]
+        results.add('ml.predict.single', size, measure(
+            lambda: predictor.pipeline.predict_proba(single), repeat=repeat, number=20))
+
+        batch = features.iloc[:10_000]
+        stats = measure(lambda: predictor.pipeline.predict_proba(batch), repeat=repeat)
+        results.add('ml.predict.batch', size, stats, rows=len(batch),
+                    rows_per_second=round(len(batch) / stats['median']))
+
+    # Train on a temporary copy so the shipped model file is never overwritten
+    with tempfile.TemporaryDirectory() as workdir:
+        training = frame.iloc[:max_training_rows]
+        csv_path = os.path.join(workdir, 'training.csv')
+        training.to_csv(csv_path, index=False)
+
+        trainer = FlareUpPredictor()
+        trainer.model_file_path = os.path.join(workdir, 'model.pkl')
+        results.add('ml.train', size, measure(lambda: trainer.train_model(csv_path), repeat=1), rows=len(training))
+
+        # Out-of-core training streams the same CSV; accuracy is reported against the in-memory baseline
+        from app.ml.out_of_core import compare_with_in_memory
+        reports = []
+        stats = measure(lambda: reports.append(compare_with_in_memory(csv_path, max_memory_mb=64)), repeat=1)
+        results.add('ml.train.out_of_core_vs_in_memory', size, stats,
+                    out_of_core_accuracy=reports[-1]['holdout_accuracy'],
+                    in_memory_accuracy=reports[-1]['in_memory_accuracy'],
+                    out_of_core_seconds=reports[-1]['training_seconds'])
+
+    busiest_user = frame['user_id'].value_counts().idxmax()
+    with app.app_context():
+        def analyze():
+            analyzer = TrendAnalyzer(busiest_user, db.session)
+            analyzer.load_user_data()
+            analyzer.analyze_trends()
+
+        results.add('ml.trend_analysis.per_user', size, measure(analyze, repeat=repeat),
+                    rows=int((frame['user_id'] == busiest_user).sum()))
@@ -0,0 +1,93 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from .harness import summarize
+
+def _replicated_config(workdir, replicas, sync_seconds):
+    from config import TestingConfig
+
+    class ReplicatedConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'primary.db')}"
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 60}}
+        REPLICA_URLS = [f"sqlite:///{os.path.join(workdir, f'replica_{index}.db')}" for index in range(replicas)]
+        REPLICA_SYNC_SECONDS = sync_seconds
+    return ReplicatedConfig
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+def run(results, app, user_ids, frame, size, repeat=1, replica_counts=(0, 1, 2), readers=8, writers=2,
+        duration=5.0, sync_seconds=1.0):
+    """
+    /symptom-logs read latency under concurrent /log-symptoms writes, reading from the primary
+    only and from 1-2 file-backed SQLite replicas. Every writer reads its user's logs back right
+    after each write through a second app on the same databases (as another worker process would);
+    a missing log counts as a read-your-writes violation.
+    """
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import User, SymptomLog
+
+    columns = frame.drop(columns=['flare_up']).astype({'exercise_done': bool, 'took_medication': bool})
+    columns['logged_at'] = columns['logged_at'].dt.to_pydatetime()
+    rows = columns.to_dict('records')
+
+    for replicas in replica_counts:
+        with tempfile.TemporaryDirectory() as workdir:
+            replicated = create_app(_replicated_config(workdir, replicas, sync_seconds))
+            with replicated.app_context():
+                db.create_all(bind_key=None)  # The replicas are copied from the primary
+                db.session.execute(insert(User), [{"user_id": user_id} for user_id in user_ids])
+                db.session.execute(insert(SymptomLog), rows)
+                db.session.commit()
+            # Another worker: its own ReplicaSet, reading the positions the first app's snapshots record
+            other = create_app(_replicated_config(workdir, replicas, 0))
+            time.sleep(2 * sync_seconds)  # First snapshot
+
+            read_latency, writes, violations = [], [0], [0]
+            stop = threading.Event()
+
+            def reader(seed):
+                client, rng = replicated.test_client(), random.Random(seed)
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    client.get(f'/api/symptom-logs?user_id={rng.choice(user_ids)}')
+                    read_latency.append(time.perf_counter() - started)
+
+            def writer(user_id):
+                client, reader, rng = replicated.test_client(), other.test_client(), random.Random(user_id)
+                while not stop.is_set():
+                    expected = len(reader.get(f'/api/symptom-logs?user_id={user_id}').get_json()) + 1
+                    client.post('/api/log-symptoms', json={
+                        "user_id": user_id,
+                        "pain_level": rng.randint(1, 10),
+                        "stress_level": rng.randint(1, 10),
+                        "sleep_hours": round(rng.uniform(4.0, 9.0), 1),
+                        "exercise_done": False,
+                        "took_medication": True
+                    })
+                    writes[0] += 1
+                    violations[0] += len(reader.get(f'/api/symptom-logs?user_id={user_id}').get_json()) < expected
+
+            threads = ([threading.Thread(target=reader, args=(seed,)) for seed in range(readers)] +
+                       [threading.Thread(target=writer, args=(user_id,)) for user_id in user_ids[:writers]])
+            for thread in threads:
+                thread.start()
+            time.sleep(duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+            metrics = replicated.extensions['replica_set'].metrics()
+            replicated.extensions['replica_set'].close()
+            stats = summarize(read_latency)
+            results.add(f'db.read.replicas_{replicas}', size, stats,
+                        p95_ms=round(_percentile(read_latency, 0.95) * 1000, 2),
+                        reads_per_second=round(len(read_latency) / duration), writes=writes[0],
+                        read_your_writes_violations=violations[0],
+                        replica_reads=metrics['replica_reads'], sticky_reads=metrics['sticky_reads'],
+                        max_replica_lag=max((replica['lag_seconds'] or 0 for replica in metrics['replicas'].values()),
+                                            default=0))
@@ -0,0 +1,80 @@
+import json
+import random
+from datetime import datetime, timedelta
+from .harness import measure
+
+BENCH_USER = 'SERIALIZATION-BENCH'
+
+def _legacy_symptom_logs(user_id):
+    """
+    The original /symptom-logs body: ORM objects, per-row strftime/split, stdlib JSON.
+    """
+    from app.models import SymptomLog
+    from app.utils.flare_rules import is_flare_up
+
+    response_data = []
+    for log in SymptomLog.query.filter_by(user_id=user_id).order_by(SymptomLog.logged_at.desc()).all():
+        flare = is_flare_up(log.pain_level, log.stress_level, log.sleep_hours, log.exercise_done, log.took_medication)
+        response_data.append({
+            "logged_at": log.logged_at.strftime('%Y-%m-%d %H:%M:%S'),
+            "pain_level": log.pain_level,
+            "stress_level": log.stress_level,
+            "sleep_hours": log.sleep_hours,
+            "exercise_done": log.exercise_done,
+            "exercise_type": log.exercise_type.split(',') if log.exercise_type else [],
+            "took_medication": log.took_medication,
+            "flare_up": 1 if flare else 0
+        })
+    return json.dumps(response_data, sort_keys=True, separators=(',', ':')).encode()
+
+def run(results, app, user_ids, frame, size, repeat=5, rows=10_000):
+    """
+    /symptom-logs serialization cost for one user with `rows` logs: the original ORM + stdlib JSON path
+    against row tuples + the app's JSON provider, plus gzip/brotli cost and ratio on the payload.
+    """
+    from sqlalchemy import insert
+    from app import db
+    from app.models import User, SymptomLog
+    from app.routes import get_symptom_logs
+    from app.utils.compression import brotli, compress
+
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        if db.session.get(User, BENCH_USER) is None:
+            db.session.add(User(user_id=BENCH_USER))
+            db.session.execute(insert(SymptomLog), [{
+                "user_id": BENCH_USER,
+                "pain_level": rng.randint(1, 10),
+                "stress_level": rng.randint(1, 10),
+                "sleep_hours": round(rng.uniform(4.0, 9.0), 1),
+                "exercise_done": rng.random() < 0.5,
+                "exercise_type": rng.choice([None, 'cardio', 'yoga', 'cardio,strength']),
+                "took_medication": rng.random() < 0.7,
+                "logged_at": start + timedelta(hours=n)
+            } for n in range(rows)])
+            db.session.commit()
+
+    with app.test_request_context(f'/api/symptom-logs?user_id={BENCH_USER}'):
+        legacy = _legacy_symptom_logs(BENCH_USER)
+        response, _ = get_symptom_logs()
+        payload = response.get_data()
+        if json.loads(legacy) != json.loads(payload):
+            raise AssertionError("Row-tuple serializer output differs from the original endpoint")
+
+        results.add('serialize.symptom_logs.legacy', size, measure(
+            lambda: _legacy_symptom_logs(BENCH_USER), repeat=repeat), rows=rows, bytes=len(legacy))
+        results.add('serialize.symptom_logs.rows', size, measure(
+            lambda: get_symptom_logs()[0].get_data(), repeat=repeat), rows=rows, bytes=len(payload),
+            provider=type(app.json).__name__)
+
+        records = json.loads(payload)
+        results.add('serialize.encode.stdlib', size, measure(
+            lambda: json.dumps(records, sort_keys=True, separators=(',', ':')), repeat=repeat), rows=rows)
+        results.add('serialize.encode.provider', size, measure(lambda: app.json.dumps(records), repeat=repeat),
+                    rows=rows, provider=type(app.json).__name__)
+
+    for encoding in ['gzip'] + (['br'] if brotli is not None else []):
+        compressed = compress(payload, encoding)
+        results.add(f'serialize.compress.{encoding}', size, measure(lambda: compress(payload, encoding), repeat=repeat),
+                    bytes=len(compressed), ratio=round(len(payload) / len(compressed), 2))
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from .harness import summarize
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+def _sharded_config(workdir, shards):
+    from config import TestingConfig
+
+    class ShardedConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'default.db')}"
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 60}}
+        SHARD_URLS = [f"sqlite:///{os.path.join(workdir, f'shard_{index}.db')}" for index in range(shards)]
+    return ShardedConfig
+
+def _balanced_users(shards, per_shard):
+    """
+    Six digit user IDs (like /auto-assign-user's), `per_shard` of them on each of `shards` shards.
+    """
+    from app.utils.sharding import jump_hash, user_key
+
+    users, counts = [], Counter()
+    for candidate in range(100000, 1000000):
+        shard = jump_hash(user_key(str(candidate)), shards)
+        if counts[shard] < per_shard:
+            counts[shard] += 1
+            users.append(str(candidate))
+            if len(users) == shards * per_shard:
+                return users
+    raise ValueError(f"Not enough six digit IDs for {per_shard} users on each of {shards} shards")
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+def _time_locks(engine, waits, commits):
+    """
+    Record, per transaction on `engine`, how long its first write statement took (SQLite takes
+    the RESERVED write lock there, retrying up to the busy timeout while another writer holds it)
+    and how long its COMMIT took (waiting for readers to release the file, then the journal sync).
+    The worker processes are single threaded, so one pending start time per engine is enough.
+    """
+    from sqlalchemy import event
+
+    pending = {}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before(connection, cursor, statement, parameters, context, executemany):
+        if not connection.info.get('writing') and statement.lstrip()[:6].upper() in WRITE_STATEMENTS:
+            connection.info['writing'] = True
+            pending['write'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after(connection, cursor, statement, parameters, context, executemany):
+        started = pending.pop('write', None)
+        if started is not None:
+            waits.append(time.perf_counter() - started)
+
+    @event.listens_for(engine, 'commit')
+    def commit(connection):
+        if connection.info.pop('writing', False):
+            started = time.perf_counter()
+            connection.connection.dbapi_connection.commit()  # SQLAlchemy's own commit is then a no-op
+            commits.append(time.perf_counter() - started)
+
+    @event.listens_for(engine, 'rollback')
+    def rollback(connection):
+        connection.info.pop('writing', None)
+        pending.pop('write', None)  # A write that failed never reached after_cursor_execute
+
+def _writer(workdir, shards, user_ids, logs, seed, ready, done):
+    """
+    One worker process (like a server worker): its own app, posting `logs` symptom logs.
+    It reads one user of every shard before waiting on `ready`, so imports, app creation and
+    the first connection to each shard all happen before the timed window starts.
+    """
+    from app import create_app
+
+    app = create_app(_sharded_config(workdir, shards))
+    router = app.extensions['shard_router']
+    waits, commits = [], []
+    with app.app_context():
+        for engine in router.engines():
+            _time_locks(engine, waits, commits)
+    client = app.test_client()
+    for users in router.partition(user_ids, lambda user_id: user_id).values():
+        client.get(f'/api/symptom-logs?user_id={users[0]}')
+    del waits[:], commits[:]
+
+    rng = random.Random(seed)
+    errors, latencies = 0, []
+    ready.wait(timeout=300)
+    for _ in range(logs):
+        started = time.perf_counter()
+        response = client.post('/api/log-symptoms', json={
+            "user_id": rng.choice(user_ids),
+            "pain_level": rng.randint(1, 10),
+            "stress_level": rng.randint(1, 10),
+            "sleep_hours": round(rng.uniform(4.0, 9.0), 1),
+            "exercise_done": False,
+            "took_medication": True
+        })
+        latencies.append(time.perf_counter() - started)
+        errors += response.status_code != 201
+    done.put((errors, latencies, waits, commits))
+
+def run(results, app, user_ids, frame, size, repeat=1, shard_counts=(1, 2, 4, 8), processes=(4, 16), logs_per_process=25,
+        users_per_shard=25):
+    """
+    Concurrent /log-symptoms traffic from several worker processes against 1-8 file-backed
+    SQLite shards. Each process has its own interpreter, so the writers only contend on the
+    database locks, as they do behind a pre-fork server. Besides throughput this records how
+    long writes waited for a shard's write lock (`lock_wait_*`, the first write statement of each
+    transaction) and how long commits took (`commit_*`), and what share of request time was spent
+    on both (`lock_share`), so a throughput change can be attributed to lock contention or not.
+
+    The same `users_per_shard * max(shard_counts)` users (not the tier's, which are too few to
+    cover 8 shards) are used for every shard count; `users_per_shard` reports how evenly they
+    spread. All workers build their app and connect to every shard before a barrier releases them.
+    """
+    from threading import BrokenBarrierError
+    from sqlalchemy import insert
+    from app import create_app, db
+    from app.models import User
+
+    user_ids = _balanced_users(max(shard_counts), users_per_shard)
+    context = multiprocessing.get_context('spawn')
+    for shards in shard_counts:
+        with tempfile.TemporaryDirectory() as workdir:
+            setup_app = create_app(_sharded_config(workdir, shards))
+            router = setup_app.extensions['shard_router']
+            with setup_app.app_context():
+                placement = router.partition(user_ids, lambda user_id: user_id)
+                for key, users in placement.items():
+                    engine = db.engines[key]
+                    db.metadata.create_all(engine)
+                    with engine.begin() as connection:
+                        connection.execute(insert(User), [{"user_id": user_id} for user_id in users])
+                for engine in router.engines():
+                    db.metadata.create_all(engine)  # Shards that received no users
+            spread = [len(placement.get(key, [])) for key in router.shard_keys]
+
+            for count in processes:
+                samples, errors, latencies, waits, commits = [], 0, [], [], []
+                for _ in range(repeat):
+                    ready, done = context.Barrier(count + 1), context.Queue()
+                    workers = [context.Process(target=_writer, args=(workdir, shards, user_ids, logs_per_process,
+                                                                     seed, ready, done))
+                               for seed in range(count)]
+                    for worker in workers:
+                        worker.start()
+                    try:
+                        ready.wait(timeout=300)  # Every worker is built, warmed up and waiting
+                    except BrokenBarrierError:
+                        for worker in workers:
+                            worker.terminate()
+                        raise RuntimeError(f"Sharding benchmark workers did not start ({shards} shards, {count} processes)")
+                    began = time.perf_counter()
+                    for _ in workers:
+                        worker_errors, worker_latencies, worker_waits, worker_commits = done.get(timeout=600)
+                        errors += worker_errors
+                        latencies.extend(worker_latencies)
+                        waits.extend(worker_waits)
+                        commits.extend(worker_commits)
+                    samples.append(time.perf_counter() - began)
+                    for worker in workers:
+                        worker.join()
+
+                stats = summarize(samples)
+                results.add(f'db.write.shards_{shards}.processes_{count}', size, stats,
+                            logs_per_second=round(count * logs_per_process / stats['median']), errors=errors,
+                            users_per_shard=f"{min(spread)}-{max(spread)}",
+                            lock_wait_p50_ms=round(_percentile(waits, 0.5) * 1000, 2),
+                            lock_wait_p99_ms=round(_percentile(waits, 0.99) * 1000, 2),
+                            commit_p50_ms=round(_percentile(commits, 0.5) * 1000, 2),
+                            commit_p99_ms=round(_percentile(commits, 0.99) * 1000, 2),
+                            lock_share=round((sum(waits) + sum(commits)) / sum(latencies), 3))
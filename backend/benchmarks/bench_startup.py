@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+from .harness import summarize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules `create_app` must not import: they are loaded by the warm-up or on first use
+DEFERRED_MODULES = ('pandas', 'sklearn', 'alembic', 'flask_migrate')
+
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app, db
+from app.models import User, SymptomLog
+from config import TestingConfig
+app = create_app(TestingConfig)
+created = time.perf_counter() - start
+
+with app.app_context():
+    db.create_all()
+    db.session.add(User(user_id='COLD-START'))
+    db.session.add(SymptomLog(user_id='COLD-START', pain_level=6, stress_level=7, sleep_hours=6.0,
+                              exercise_done=False, took_medication=True))
+    db.session.commit()
+
+if 'warmup' in app.extensions:
+    app.extensions['warmup'].done.wait()
+ready = time.perf_counter() - start
+
+client = app.test_client()
+first = {}
+for name, call in [('symptom_logs', lambda: client.get('/api/symptom-logs?user_id=COLD-START')),
+                   ('bot_analysis', lambda: client.post('/api/bot-analysis', json={'user_id': 'COLD-START'})),
+                   ('predict_flare_up', lambda: client.post('/api/predict-flare-up', json={'user_id': 'COLD-START'}))]:
+    request_start = time.perf_counter()
+    call()
+    first[name] = time.perf_counter() - request_start
+print(json.dumps({"create_app": created, "ready": ready, "first_request": first}))
+"""
+
+def import_profile():
+    """
+    Run `python -X importtime` on `create_app` in a fresh interpreter.
+
+    Returns:
+        tuple: (total import seconds, set of imported top-level packages)
+    """
+    code = "from app import create_app; from config import TestingConfig; create_app(TestingConfig)"
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BACKEND_DIR,
+                               env=dict(os.environ, STARTUP_WARMUP='off'), capture_output=True, text=True, check=True)
+    total_us = 0
+    packages = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        total_us += int(self_us)
+        packages.add(name.strip().split('.')[0])
+    return total_us / 1e6, packages
+
+def cold_start(warmup):
+    completed = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], cwd=BACKEND_DIR,
+                               env=dict(os.environ, STARTUP_WARMUP=warmup), capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def run(results, app, user_ids, frame, size, repeat=5, import_budget_ms=800):
+    """
+    Import-time budget for `create_app` and cold-start latency to the first responses, without
+    the warm-up and with it ('background', measured once it has finished). The budget is in
+    `-X importtime` terms (which adds overhead per module) and checked against the fastest sample;
+    Flask and SQLAlchemy alone use ~350 ms of it.
+    """
+    samples = [import_profile() for _ in range(repeat)]
+    stats = summarize([total for total, _ in samples])
+    imported = samples[-1][1]
+    results.add('startup.import_time', size, stats, budget_ms=import_budget_ms, packages=len(imported))
+
+    leaked = [module for module in DEFERRED_MODULES if module in imported]
+    if leaked:
+        raise AssertionError(f"create_app imports deferred modules: {leaked}")
+    if stats['min'] * 1000 > import_budget_ms:
+        raise AssertionError(f"create_app import time {stats['min'] * 1000:.0f} ms "
+                             f"exceeds the {import_budget_ms} ms budget")
+
+    for warmup in ('off', 'background'):
+        runs = [cold_start(warmup) for _ in range(repeat)]
+        for key in ('create_app', 'ready'):
+            results.add(f'startup.{warmup}.{key}', size, summarize([run[key] for run in runs]))
+        for name in runs[0]['first_request']:
+            results.add(f'startup.{warmup}.first_request.{name}', size,
+                        summarize([run['first_request'][name] for run in runs]))
@@ -0,0 +1,40 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage (from the backend directory):
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare ReMission benchmark results")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.1, help="Relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline = json.load(baseline_file)
+        candidate = json.load(candidate_file)
+
+    print(f"baseline {baseline['metadata']['commit']} -> candidate {candidate['metadata']['commit']}")
+    regressions = 0
+    for key in sorted(set(baseline['results']) & set(candidate['results'])):
+        before = baseline['results'][key]['median']
+        after = candidate['results'][key]['median']
+        if not before:
+            continue
+
+        change = (after - before) / before
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{key:<45} {before * 1000:10.3f} ms -> {after * 1000:10.3f} ms  {change:+7.1%}{flag}")
+
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Seeded database fixtures for benchmarks and tests.
+
+Seeding 100k or 10m synthetic logs takes far longer than most of the code it is used to measure,
+so each size tier is built once and cached as a SQLite file (plus the generated DataFrame) under
+FIXTURE_DIR. The file name carries a hash of everything that decides its contents: the ORM
+schema, the synthetic data generator, the rollup code, the tier and the seed. A fixture built
+for other models is never reused, and the next run simply builds a new one. Logs end at the
+Monday of the current week, so a fixture stays valid (and identical) for that week.
+
+Every consumer gets its own copy. `restore_into` loads a fixture into an app's in-memory
+database with SQLite's backup API. `clone` copies the file, copy-on-write where the file system
+supports reflinks.
+
+Usage (from the backend directory):
+    python -m benchmarks.fixtures --sizes 1k,100k     # build the missing fixtures
+    python -m benchmarks.fixtures --list
+    python -m benchmarks.fixtures --prune              # delete fixtures of other schemas or weeks
+"""
+import argparse
+import glob
+import hashlib
+import inspect
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from .harness import SIZES
+
+FIXTURE_DIR = os.getenv('REMISSION_FIXTURE_DIR', os.path.join(os.path.dirname(__file__), 'fixtures'))
+FICLONE = 0x40049409  # Linux ioctl: share the source file's extents (btrfs, XFS, overlayfs on those)
+
+def anchor(now=None):
+    """
+    End of the synthetic logs: midnight (UTC) at the start of the current week.
+    """
+    today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=today.weekday())
+
+def schema_hash():
+    """
+    Short hash of the ORM schema and of the code that generates and aggregates fixture data.
+    """
+    from app import db
+    from app import models  # noqa: F401 (registers the tables)
+    from app.analytics import rollups
+    from app.utils.db_utils import schema_ddl
+    import generate_synthetic_data
+
+    digest = hashlib.sha256(schema_ddl(db.metadata).encode())
+    for module in (generate_synthetic_data, rollups):
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()[:12]
+
+def default_users(num_logs):
+    return min(max(num_logs // 100, 10), 100_000)
+
+def fixture_path(num_logs, num_users=None, seed=42, end=None):
+    """
+    Path of the cached fixture for these parameters under the current schema (it may not exist yet).
+    """
+    num_users = num_users or default_users(num_logs)
+    end = end or anchor()
+    return os.path.join(FIXTURE_DIR, f"logs{num_logs}-users{num_users}-seed{seed}-{end:%Y%m%d}-{schema_hash()}.db")
+
+def seed_app(app, frame, chunk_size=50_000):
+    """
+    Create the default database's tables in `app` and fill them with the users and logs of
+    `frame`, then build the analytics rollups.
+    """
+    from sqlalchemy import insert
+    from app import db
+    from app.models import User, SymptomLog
+    from app.analytics.rollups import RollupManager
+
+    user_ids = sorted(frame['user_id'].unique())
+    with app.app_context():
+        # Default database only: the shared `db` keeps the (table-less) bind keys of every app created before
+        db.create_all(bind_key=None)
+        created_at = datetime.utcnow()
+        db.session.execute(insert(User), [{"user_id": user_id, "created_at": created_at} for user_id in user_ids])
+
+        columns = frame.drop(columns=['flare_up']).astype({'exercise_done': bool, 'took_medication': bool})
+        columns['logged_at'] = columns['logged_at'].dt.to_pydatetime()
+        for start in range(0, len(columns), chunk_size):
+            rows = columns.iloc[start:start + chunk_size].to_dict('records')
+            db.session.execute(insert(SymptomLog), rows)
+        db.session.commit()
+
+        RollupManager(db.session).rebuild()
+
+def build(path, num_logs, num_users, seed, end, chunk_size=50_000):
+    """
+    Seed an in-memory database and save it, with its DataFrame, as the fixture at `path`.
+    Files are written under temporary names and renamed, so a concurrent or interrupted build
+    never leaves a partial fixture behind.
+    """
+    from app import create_app, db
+    from config import TestingConfig
+    from generate_synthetic_data import generate_symptom_frame
+
+    started = time.perf_counter()
+    frame = generate_symptom_frame(num_logs, num_users=num_users, seed=seed, end=end)
+    app = create_app(TestingConfig)
+    seed_app(app, frame, chunk_size)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.partial"
+    with app.app_context():
+        target = sqlite3.connect(partial)
+        db.engine.raw_connection().driver_connection.backup(target)
+        target.execute('VACUUM')
+        target.close()
+    frame.to_pickle(f"{partial}.frame")
+    os.replace(f"{partial}.frame", f"{path}.frame")
+    os.replace(partial, path)
+    print(f"[DEBUG] Fixture {os.path.basename(path)} built in {time.perf_counter() - started:.1f}s.")
+    return frame
+
+def seeded_fixture(num_logs, num_users=None, seed=42, chunk_size=50_000):
+    """
+    The cached fixture for a size tier, built first if needed.
+
+    Args:
+        num_logs (int): Number of symptom logs.
+        num_users (int, optional): Number of distinct users (default: one per 100 logs).
+        seed (int): Random seed for the synthetic generator.
+        chunk_size (int): Rows per bulk insert while building.
+
+    Returns:
+        tuple: (fixture path, list of seeded user_ids, pd.DataFrame of the generated logs)
+    """
+    import pandas as pd
+
+    num_users = num_users or default_users(num_logs)
+    end = anchor()
+    path = fixture_path(num_logs, num_users, seed, end)
+    if os.path.exists(path) and os.path.exists(f"{path}.frame"):
+        frame = pd.read_pickle(f"{path}.frame")
+    else:
+        frame = build(path, num_logs, num_users, seed, end, chunk_size)
+    return path, sorted(frame['user_id'].unique()), frame
+
+def restore_into(path, app):
+    """
+    Copy a fixture into `app`'s (in-memory) default database with SQLite's backup API.
+    """
+    from app import db
+
+    with app.app_context():
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        source.backup(db.engine.raw_connection().driver_connection)
+        source.close()
+
+def clone(path, destination):
+    """
+    Private file copy of a fixture: a reflink (copy-on-write, constant time) when the file system
+    supports it, a regular copy otherwise.
+
+    Returns:
+        str: `destination`.
+    """
+    try:
+        import fcntl
+        with open(path, 'rb') as source, open(destination, 'wb') as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    except (ImportError, OSError):  # No fcntl (Windows) or no reflink support
+        shutil.copyfile(path, destination)
+    return destination
+
+def copy_database(app, destination):
+    """
+    File copy of a seeded app's database: a clone of its fixture when it was restored from one,
+    otherwise a backup of its in-memory database.
+
+    Returns:
+        str: `destination`.
+    """
+    from app import db
+
+    if app.config.get('FIXTURE_PATH'):
+        return clone(app.config['FIXTURE_PATH'], destination)
+    with app.app_context():
+        target = sqlite3.connect(destination)
+        db.engine.raw_connection().driver_connection.backup(target)
+        target.close()
+    return destination
+
+def fixtures():
+    return sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.db')))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and manage cached ReMission database fixtures")
+    parser.add_argument('--sizes', default=None, help=f"Comma separated size tiers to build from {list(SIZES)}")
+    parser.add_argument('--list', action='store_true', help="List cached fixtures")
+    parser.add_argument('--prune', action='store_true', help="Delete fixtures of other schemas or weeks")
+    args = parser.parse_args(argv)
+
+    for size in args.sizes.split(',') if args.sizes else []:
+        path, user_ids, _ = seeded_fixture(SIZES[size])
+        print(f"{size}: {path} ({len(user_ids)} users)")
+
+    if args.prune:
+        current = f"{anchor():%Y%m%d}-{schema_hash()}.db"
+        for path in fixtures():
+            if not path.endswith(current):
+                for stale in (path, f"{path}.frame"):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+                print(f"Deleted {os.path.basename(path)}")
+
+    if args.list:
+        for path in fixtures():
+            print(f"{os.path.basename(path):70} {os.path.getsize(path) / 1e6:10.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATABASE_DIR = os.path.abspath(os.path.join(BACKEND_DIR, '..', 'database'))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Make `app`, `config` and the synthetic data generator importable when run as a module
+for path in (BACKEND_DIR, DATABASE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+SIZES = {'1k': 1_000, '100k': 100_000, '10m': 10_000_000}
+
+def measure(func, repeat=5, number=1):
+    """
+    Time a callable.
+
+    Args:
+        func (callable): The code under test, called without arguments.
+        repeat (int): Number of timing samples.
+        number (int): Calls per sample; the sample is divided by this.
+
+    Returns:
+        dict: Per-call min/median/mean/max in seconds, plus repeat and number.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return summarize(samples, number=number)
+
+def summarize(samples, number=1):
+    """
+    Summary statistics of timing samples (seconds), in the format of `measure`.
+    """
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "max": max(samples),
+        "repeat": len(samples),
+        "number": number
+    }
+
+def git_commit():
+    """
+    Short hash of the current commit, or "unknown" outside a git checkout.
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+class BenchmarkRun:
+    """
+    Collects benchmark results and writes them as JSON for comparison between commits.
+    """
+
+    def __init__(self):
+        self.metadata = {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        }
+        self.results = {}
+
+    def add(self, name, size, stats, **extra):
+        """
+        Record one benchmark result.
+
+        Args:
+            name (str): Benchmark name, e.g. "api.symptom_logs".
+            size (str): Dataset size tier, e.g. "100k".
+            stats (dict): Output of `measure`.
+            **extra: Additional values to store (throughput, row counts, ...).
+        """
+        key = f"{name}[{size}]"
+        self.results[key] = {**stats, **extra}
+        print(f"{key:<45} median {stats['median'] * 1000:10.3f} ms" +
+              "".join(f"  {k}={v}" for k, v in extra.items()))
+
+    def save(self, path=None):
+        """
+        Write the results to `path` (default: results/<commit>.json).
+
+        Returns:
+            str: The path written.
+        """
+        path = path or os.path.join(RESULTS_DIR, f"{self.metadata['commit']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as results_file:
+            json.dump({"metadata": self.metadata, "results": self.results}, results_file, indent=2, sort_keys=True)
+        print(f"Results saved to {path}")
+        return path
+
+def create_seeded_app(num_logs, num_users=None, seed=42, chunk_size=50_000, cache=True):
+    """
+    Create a `TestingConfig` app seeded with synthetic users and symptom logs.
+
+    Args:
+        num_logs (int): Number of symptom logs to insert.
+        num_users (int, optional): Number of distinct users (default: one per 100 logs).
+        seed (int): Random seed for the synthetic generator.
+        chunk_size (int): Rows per bulk insert.
+        cache (bool): Restore the data from a cached fixture (built on first use, see fixtures.py)
+            instead of seeding it; app.config['FIXTURE_PATH'] is then the fixture file.
+
+    Returns:
+        tuple: (Flask app, list of seeded user_ids, pd.DataFrame of the generated logs)
+    """
+    from app import create_app
+    from config import TestingConfig
+    from . import fixtures
+
+    app = create_app(TestingConfig)
+    if cache:
+        path, user_ids, frame = fixtures.seeded_fixture(num_logs, num_users, seed, chunk_size)
+        fixtures.restore_into(path, app)
+        app.config['FIXTURE_PATH'] = path
+        return app, user_ids, frame
+
+    from generate_synthetic_data import generate_symptom_frame
+
+    frame = generate_symptom_frame(num_logs, num_users=num_users or fixtures.default_users(num_logs), seed=seed)
+    fixtures.seed_app(app, frame, chunk_size)
+    return app, sorted(frame['user_id'].unique()), frame
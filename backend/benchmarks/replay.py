@@ -0,0 +1,179 @@
+"""
+Replay recorded traffic (TRAFFIC_CAPTURE_PATH traces) against a local seeded app.
+
+Usage (from the backend directory):
+    python -m benchmarks.replay traces/capture-*.jsonl.gz --speed 10 --concurrency 16
+    python -m benchmarks.replay traces/*.jsonl.gz --size 1k --speed 50 --output results/replay.json
+
+Requests are sent open-loop at their recorded times divided by --speed, so a slow build does not
+slow the arrivals down; latency is measured from each request's scheduled time. Results are saved
+in the benchmark format, so two builds compare with `python -m benchmarks.compare`.
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from .harness import SIZES, BenchmarkRun, create_seeded_app, summarize
+
+EXERCISE_TYPES = ['cardio', 'strength', 'flexibility', 'balance']
+
+# Values for the type placeholders of known fields, within what the endpoints accept
+FIELD_VALUES = {
+    'pain_level': lambda rng: rng.randint(1, 10),
+    'stress_level': lambda rng: rng.randint(1, 10),
+    'sleep_hours': lambda rng: round(rng.uniform(4.0, 9.0), 1),
+    'exercise_types': lambda rng: rng.choice(EXERCISE_TYPES),
+}
+TYPE_VALUES = {
+    'int': lambda rng: rng.randint(1, 10),
+    'float': lambda rng: round(rng.uniform(0.0, 10.0), 1),
+    'bool': lambda rng: rng.random() < 0.5,
+    'str': lambda rng: 'replay',
+}
+RULE_ARGUMENT = re.compile(r'<(?:[^:<>]+:)?([^<>]+)>')
+
+def fill(template, rng, users, key=None, today=None):
+    """
+    A concrete value for a recorded shape: pseudonyms map to seeded users, day offsets to dates
+    relative to today and type names to plausible values.
+    """
+    if isinstance(template, dict):
+        if set(template) == {'$id'}:
+            return users(template['$id'])
+        if set(template) == {'$days'}:
+            return ((today or date.today()) + timedelta(days=template['$days'])).isoformat()
+        return {k: fill(v, rng, users, k, today) for k, v in template.items()}
+    if isinstance(template, list):
+        return [fill(v, rng, users, key, today) for v in template]
+    if template is None:
+        return None
+    return FIELD_VALUES.get(key, TYPE_VALUES[template])(rng)
+
+def replay(app, events, user_ids, speed=1.0, concurrency=8, seed=0):
+    """
+    Re-issue recorded events against `app` at `speed` times their recorded pace.
+
+    Args:
+        app (Flask): The app under test.
+        events (list of dict): Output of `load_trace`.
+        user_ids (list of str): Users of the app's database that pseudonyms are mapped onto.
+        speed (float): Time compression (1: as recorded).
+        concurrency (int): Client threads; requests wait for a free one when all are busy.
+        seed (int): Seed of the synthesised payload values.
+
+    Returns:
+        dict: Per route ("METHOD /rule"): latencies (s, from the scheduled time), status Counter
+              and the recorded durations (ms).
+    """
+    local = threading.local()
+    stats = defaultdict(lambda: {"latencies": [], "statuses": Counter(), "recorded_ms": []})
+    lock = threading.Lock()
+
+    def users(pseudonym):
+        return user_ids[int(pseudonym, 16) % len(user_ids)]
+
+    def issue(event, due, rng):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        url = RULE_ARGUMENT.sub(lambda match: str(fill((event.get('v') or {}).get(match.group(1), 'str'), rng, users,
+                                                       match.group(1))), event['r'])
+        try:
+            status = local.client.open(url, method=event['m'], query_string=fill(event.get('q') or {}, rng, users),
+                                       json=fill(event['b'], rng, users) if event.get('b') is not None else None
+                                       ).status_code
+        except Exception:  # Raised through the test client (TESTING propagates exceptions)
+            status = 500
+        finished = time.perf_counter()
+        with lock:
+            route = stats[f"{event['m']} {event['r']}"]
+            route["latencies"].append(finished - due)
+            route["statuses"][status] += 1
+            route["recorded_ms"].append(event['d'])
+
+    rng = random.Random(seed)
+    first = events[0]['t']
+    with ThreadPoolExecutor(concurrency) as executor:
+        start = time.perf_counter()
+        for event in events:
+            due = start + (event['t'] - first) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(issue, event, due, random.Random(rng.random()))
+    return dict(stats)
+
+def file_backed(app, path):
+    """
+    A copy of a seeded (in-memory) app on a database file, so concurrent requests get their own
+    connections as in production.
+    """
+    from app import create_app
+    from config import TestingConfig
+    from .fixtures import copy_database
+
+    copy_database(app, path)
+
+    class ReplayConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 30}}
+    return create_app(ReplayConfig)
+
+def report(results, stats, size, duration):
+    """
+    Record and print per-route latency distributions and error rates.
+    """
+    for route, route_stats in sorted(stats.items()):
+        latencies = sorted(route_stats["latencies"])
+        statuses = route_stats["statuses"]
+        total = sum(statuses.values())
+        results.add(f'replay.{route}', size, summarize(latencies), requests=total,
+                    requests_per_second=round(total / duration, 1),
+                    p95_ms=round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+                    p99_ms=round(latencies[int(len(latencies) * 0.99)] * 1000, 1),
+                    error_rate=round(sum(count for status, count in statuses.items() if status >= 500) / total, 4),
+                    rejected_rate=round((statuses[429] + statuses[503]) / total, 4),
+                    recorded_median_ms=round(statistics.median(route_stats["recorded_ms"]), 1),
+                    statuses=dict(sorted(statuses.items())))
+
+def main(argv=None):
+    from app.utils.traffic import load_trace
+
+    parser = argparse.ArgumentParser(description="Replay recorded ReMission traffic")
+    parser.add_argument('traces', nargs='+', help="Trace files written with TRAFFIC_CAPTURE_PATH")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed-up, 1 (as recorded) to 50")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads")
+    parser.add_argument('--size', default='100k', help=f"Seeded database size tier from {list(SIZES)}")
+    parser.add_argument('--limit', type=int, default=None, help="Replay only the first N events")
+    parser.add_argument('--output', default=None, help="JSON output path (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args(argv)
+    if not 1 <= args.speed <= 50:
+        parser.error("--speed must be between 1 and 50")
+
+    events = load_trace(args.traces)[:args.limit]
+    if not events:
+        parser.error("The traces contain no requests")
+    seeded_app, user_ids, _ = create_seeded_app(SIZES[args.size])
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = file_backed(seeded_app, os.path.join(workdir, 'replay.db'))
+        span = (events[-1]['t'] - events[0]['t']) / args.speed
+        print(f"Replaying {len(events)} requests over {span:.1f}s ({args.speed}x) with {args.concurrency} clients")
+        started = time.perf_counter()
+        stats = replay(app, events, user_ids, speed=args.speed, concurrency=args.concurrency)
+        duration = time.perf_counter() - started
+
+    results = BenchmarkRun()
+    results.metadata.update(replay={"traces": args.traces, "speed": args.speed, "concurrency": args.concurrency,
+                                    "events": len(events)})
+    report(results, stats, args.size, duration)
+    results.save(args.output)
+
+if __name__ == '__main__':
+    main()
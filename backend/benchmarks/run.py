@@ -0,0 +1,47 @@
+"""
+Run the ReMission backend benchmark suite.
+
+Usage (from the backend directory):
+    python -m benchmarks.run --sizes 1k,100k
+    python -m benchmarks.run --sizes 10m --only api,db --output results/large.json
+"""
+import argparse
+import time
+from .harness import SIZES, BenchmarkRun, create_seeded_app
+from . import (bench_admission, bench_api, bench_archive, bench_attributions, bench_batching, bench_db,
+               bench_evaluation, bench_features, bench_group_commit, bench_live_updates, bench_lookup, bench_migrations,
+               bench_ml, bench_replicas, bench_serialization, bench_sharding, bench_startup)
+
+SUITES = {'api': bench_api, 'ml': bench_ml, 'db': bench_db, 'batching': bench_batching,
+          'lookup': bench_lookup, 'group_commit': bench_group_commit,
+          'serialization': bench_serialization, 'startup': bench_startup,
+          'sharding': bench_sharding, 'replicas': bench_replicas, 'features': bench_features,
+          'archive': bench_archive, 'migrations': bench_migrations, 'admission': bench_admission,
+          'attributions': bench_attributions, 'live_updates': bench_live_updates, 'evaluation': bench_evaluation}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ReMission backend benchmarks")
+    parser.add_argument('--sizes', default='1k,100k', help=f"Comma separated size tiers from {list(SIZES)}")
+    parser.add_argument('--only', default=','.join(SUITES), help=f"Comma separated suites from {list(SUITES)}")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing samples per benchmark")
+    parser.add_argument('--output', default=None, help="JSON output path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--no-fixture-cache', action='store_true', help="Seed every size tier instead of restoring "
+                                                                        "cached database fixtures")
+    args = parser.parse_args(argv)
+
+    results = BenchmarkRun()
+    for size in args.sizes.split(','):
+        num_logs = SIZES[size]
+        start = time.perf_counter()
+        app, user_ids, frame = create_seeded_app(num_logs, cache=not args.no_fixture_cache)
+        results.add('setup.seed', size, {"min": 0, "median": time.perf_counter() - start, "mean": 0, "max": 0,
+                                          "repeat": 1, "number": 1}, rows=num_logs, users=len(user_ids),
+                    fixture_cache=not args.no_fixture_cache)
+
+        for name in args.only.split(','):
+            SUITES[name].run(results, app, user_ids, frame, size, repeat=args.repeat)
+
+    results.save(args.output)
+
+if __name__ == '__main__':
+    main()
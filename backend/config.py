@@ -17,6 +17,17 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', f'sqlite:///{os.path.join(BASE_DIR, "database", "remission.db")}')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Horizontal sharding by user_id: comma separated SQLAlchemy URLs, one per shard (empty: single database).
+    # Shards are only ever appended; run `flask reshard --previous-count N` after adding some.
+    SHARD_URLS = [url.strip() for url in os.getenv('SHARD_URLS', '').split(',') if url.strip()]
+
+    # Read replicas for the read-only endpoints and batch jobs: comma separated SQLAlchemy URLs (not used with SHARD_URLS).
+    # SQLite replicas are refreshed from the primary every REPLICA_SYNC_SECONDS with the backup API
+    # (0: kept in sync externally); replicas lagging more than REPLICA_MAX_LAG_SECONDS are skipped
+    REPLICA_URLS = [url.strip() for url in os.getenv('REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_SYNC_SECONDS = float(os.getenv('REPLICA_SYNC_SECONDS', '2'))
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '10'))
+
     # Security configurations
     SECRET_KEY = os.getenv('SECRET_KEY', 'supersecretkey')  # Default secret key for development (change in production!)
 
@@ -24,6 +35,117 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwtsecretkey')  # Secret key for JWTs
     JWT_ACCESS_TOKEN_EXPIRES = 3600  # Token expiration in seconds (default: 1 hour)
 
+    # Analytics rollups: update on every log write (otherwise rely on the `rollup-analytics` job)
+    ANALYTICS_INCREMENTAL_ROLLUPS = os.getenv('ANALYTICS_INCREMENTAL_ROLLUPS', 'true').lower() == 'true'
+    ANALYTICS_HLL_PRECISION = 10  # HyperLogLog registers = 2**precision (about 3% error at 10)
+
+    # Out-of-core model training (`flask train-model`): peak memory budget in MB
+    OUT_OF_CORE_MAX_MEMORY_MB = int(os.getenv('OUT_OF_CORE_MAX_MEMORY_MB', '256'))
+
+    # Inference micro-batching: concurrent predictions are scored together
+    INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '64'))
+    INFERENCE_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', '5'))
+    INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', '5'))  # Seconds a request waits for its batch to be scored
+
+    # Score the discrete feature grid once per model and serve predictions from the table
+    PREDICTION_LOOKUP_TABLE = os.getenv('PREDICTION_LOOKUP_TABLE', 'false').lower() == 'true'
+
+    # Model registry (`flask models`): named models next to the live one, e.g. trained with `flask train-model
+    # --challenger NAME`. The challenger re-scores MODEL_SHADOW_SAMPLE of live predictions in a background thread
+    # (agreement in /api/metrics; 0: off), dropping rows beyond MODEL_SHADOW_MAX_QUEUE rather than slowing requests
+    MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', os.path.join(BASE_DIR, 'backend', 'app', 'ml', 'registry'))
+    MODEL_SHADOW_SAMPLE = float(os.getenv('MODEL_SHADOW_SAMPLE', '1.0'))
+    MODEL_SHADOW_MAX_QUEUE = int(os.getenv('MODEL_SHADOW_MAX_QUEUE', '1000'))
+
+    # Offline model evaluation (`flask evaluate-models`): worker processes (0: one per CPU) and logs per chunk
+    MODEL_EVALUATION_WORKERS = int(os.getenv('MODEL_EVALUATION_WORKERS', '0'))
+    MODEL_EVALUATION_CHUNK_SIZE = int(os.getenv('MODEL_EVALUATION_CHUNK_SIZE', '100000'))
+
+    # Per-prediction feature contributions behind the bot's insights: explained rows kept in memory
+    ATTRIBUTION_CACHE_SIZE = int(os.getenv('ATTRIBUTION_CACHE_SIZE', '4096'))
+
+    # In-memory window of each user's most recent logs (LRU-evicted beyond the memory cap)
+    HOT_WINDOW_SIZE = int(os.getenv('HOT_WINDOW_SIZE', '30'))
+    HOT_WINDOW_MAX_MB = int(os.getenv('HOT_WINDOW_MAX_MB', '64'))
+
+    # Group commit: concurrent log writes share one transaction (acknowledged once durable)
+    GROUP_COMMIT_ENABLED = os.getenv('GROUP_COMMIT_ENABLED', 'false').lower() == 'true'
+    GROUP_COMMIT_MAX_ROWS = int(os.getenv('GROUP_COMMIT_MAX_ROWS', '100'))
+    GROUP_COMMIT_MAX_WAIT_MS = float(os.getenv('GROUP_COMMIT_MAX_WAIT_MS', '5'))
+    GROUP_COMMIT_TIMEOUT = 10  # Seconds a request waits for its group to commit
+
+    # Change feed: each new symptom log is also written to the change_feed outbox in the same transaction.
+    # Consumers (`flask consume-changes`) read it in batches; every process also polls it every
+    # CHANGE_FEED_POLL_SECONDS to apply other workers' writes to its hot windows (0: off)
+    CHANGE_FEED_ENABLED = os.getenv('CHANGE_FEED_ENABLED', 'true').lower() == 'true'
+    CHANGE_FEED_BATCH_SIZE = int(os.getenv('CHANGE_FEED_BATCH_SIZE', '100'))
+    CHANGE_FEED_POLL_SECONDS = float(os.getenv('CHANGE_FEED_POLL_SECONDS', '1'))
+
+    # Symptom log partitions: whole months older than ARCHIVE_AFTER_DAYS are moved out of symptom_logs
+    # (`flask archive-logs`) into compressed columnar files under ARCHIVE_DIR, which history queries
+    # read transparently. Up to ARCHIVE_CACHE_MB of decompressed months are kept in memory per process
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join(BASE_DIR, 'database', 'archive'))
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '180'))
+    ARCHIVE_CACHE_MB = int(os.getenv('ARCHIVE_CACHE_MB', '64'))
+
+    # Online migrations (app/utils/online_migration.py): table rebuilds and backfills run in primary-key
+    # batches of ONLINE_MIGRATION_BATCH_SIZE rows, one short transaction each, spending at most
+    # ONLINE_MIGRATION_DUTY_CYCLE of the time holding the write lock (and under the rows/second cap, 0: none)
+    ONLINE_MIGRATION_BATCH_SIZE = int(os.getenv('ONLINE_MIGRATION_BATCH_SIZE', '5000'))
+    ONLINE_MIGRATION_DUTY_CYCLE = float(os.getenv('ONLINE_MIGRATION_DUTY_CYCLE', '0.5'))
+    ONLINE_MIGRATION_MAX_ROWS_PER_SECOND = int(os.getenv('ONLINE_MIGRATION_MAX_ROWS_PER_SECOND', '0'))
+
+    # Admission control (per process) for the endpoints below: up to `concurrency` requests run at once,
+    # `queue` more wait up to `queue_ms` (including time queued upstream, from X-Request-Start) and each
+    # user_id may send `rate` requests/second with bursts of `burst`. Rejected requests get 429 (user over
+    # rate) or 503 (overloaded) with Retry-After instead of timing out in the queue
+    ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'
+    ADMISSION_LIMITS = {
+        'api.log_symptoms': {
+            "concurrency": int(os.getenv('ADMISSION_LOG_CONCURRENCY', '4')),
+            "queue": int(os.getenv('ADMISSION_LOG_QUEUE', '32')),
+            "queue_ms": float(os.getenv('ADMISSION_LOG_QUEUE_MS', '500')),
+            "rate": float(os.getenv('ADMISSION_LOG_RATE', '1')),
+            "burst": int(os.getenv('ADMISSION_LOG_BURST', '10'))
+        },
+        'api.bot_analysis': {
+            "concurrency": int(os.getenv('ADMISSION_ANALYSIS_CONCURRENCY', '2')),
+            "queue": int(os.getenv('ADMISSION_ANALYSIS_QUEUE', '16')),
+            "queue_ms": float(os.getenv('ADMISSION_ANALYSIS_QUEUE_MS', '1000')),
+            "rate": float(os.getenv('ADMISSION_ANALYSIS_RATE', '2')),
+            "burst": int(os.getenv('ADMISSION_ANALYSIS_BURST', '10'))
+        }
+    }
+
+    # Traffic capture (off unless a path is set): anonymised request traces for `python -m benchmarks.replay`,
+    # one gzip JSON-lines file per process ('{pid}' in the path is replaced by the process id)
+    TRAFFIC_CAPTURE_PATH = os.getenv('TRAFFIC_CAPTURE_PATH', '')
+    TRAFFIC_CAPTURE_SAMPLE = float(os.getenv('TRAFFIC_CAPTURE_SAMPLE', '1.0'))  # Share of requests recorded
+
+    # API responses: JSON encoder ('orjson' or 'default') and negotiated gzip/brotli compression
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    RESPONSE_COMPRESSION = os.getenv('RESPONSE_COMPRESSION', 'true').lower() == 'true'
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))  # Smaller bodies are sent as-is
+    COMPRESS_MIMETYPES = ['application/json', 'text/csv', 'text/plain']
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4  # Fast setting; higher qualities cost far more CPU per response
+
+    # Startup: load pandas, scikit-learn and the model in a 'background' thread after startup,
+    # 'blocking' (pre-fork parents, see gunicorn.conf.py) or 'off' (first use)
+    STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'background')
+
+    # Server-sent event streams (/api/live-updates) pushing new logs and analyses to the frontend.
+    # Each process serves them from an event loop on LIVE_UPDATES_PORT (shared by the workers; 0: no
+    # streams), so open streams hold no request threads; the Flask route redirects clients there
+    # (to LIVE_UPDATES_PUBLIC_URL when set, e.g. behind a proxy; otherwise the request's host)
+    LIVE_UPDATES_ENABLED = os.getenv('LIVE_UPDATES_ENABLED', 'true').lower() == 'true'
+    LIVE_UPDATES_HOST = os.getenv('LIVE_UPDATES_HOST', '0.0.0.0')
+    LIVE_UPDATES_PORT = int(os.getenv('LIVE_UPDATES_PORT', '5001'))
+    LIVE_UPDATES_PUBLIC_URL = os.getenv('LIVE_UPDATES_PUBLIC_URL', '')
+    LIVE_UPDATES_MAX_CONNECTIONS = int(os.getenv('LIVE_UPDATES_MAX_CONNECTIONS', '1000'))  # Open streams per process
+    LIVE_UPDATES_HEARTBEAT_SECONDS = float(os.getenv('LIVE_UPDATES_HEARTBEAT_SECONDS', '15'))
+    LIVE_UPDATES_BUFFER = int(os.getenv('LIVE_UPDATES_BUFFER', '16'))  # Frames held for a slow client
+
     # General application settings
     DEBUG = False
     TESTING = False
@@ -46,6 +168,11 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite:///:memory:')  # In-memory database for tests
     JWT_ACCESS_TOKEN_EXPIRES = 300  # Shorter token lifetime for testing
+    STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'off')  # Tests and benchmarks create many short-lived apps
+    CHANGE_FEED_POLL_SECONDS = float(os.getenv('CHANGE_FEED_POLL_SECONDS', '0'))  # Single process: nothing to sync
+    # Benchmarks drive the endpoints far harder than real clients; they enable it where it is measured
+    ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'false').lower() == 'true'
+    LIVE_UPDATES_PORT = int(os.getenv('LIVE_UPDATES_PORT', '0'))  # Benchmarks start servers on free ports
 
 
 class ProductionConfig(Config):
@@ -0,0 +1,37 @@
+"""
+Gunicorn settings for the pre-forked server.
+
+With PRELOAD_APP (the default) the master process imports the app once and runs the startup
+warm-up in the foreground, so pandas, scikit-learn and the flare-up model are loaded before
+any worker exists. Workers fork from that warm parent and share its memory copy-on-write,
+making a new worker ready to serve in milliseconds instead of seconds. The master also keeps
+the SQLite read replicas (REPLICA_URLS) refreshed, once for all workers.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))  # Lets micro-batching and group commit coalesce requests
+preload_app = os.getenv('PRELOAD_APP', 'true').lower() == 'true'
+# /api/live-updates streams are not served by these threads but by each worker's event loop on
+# LIVE_UPDATES_PORT (started in post_fork), so idle streams do not take request threads
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if preload_app:
+    # Threads do not survive fork(), so the warm-up runs in the master before workers are forked
+    os.environ.setdefault('STARTUP_WARMUP', 'blocking')
+
+def post_fork(server, worker):
+    """
+    Drop database connections inherited from the master; each worker opens its own. Then start the
+    worker's live update server, so streams are accepted before its first request.
+    """
+    import sys
+    if 'wsgi' in sys.modules:
+        from wsgi import app
+        from app import db
+        with app.app_context():
+            for engine in db.engines.values():  # Primary, shards and read replicas
+                engine.dispose(close=False)
+        if 'live_updates_server' in app.extensions:
+            app.extensions['live_updates_server'].start()
@@ -1,4 +1,5 @@
 import logging
+import re
 from logging.config import fileConfig
 
 from flask import current_app
@@ -16,6 +17,10 @@ logger = logging.getLogger('alembic.env')
 
 
 def get_engine():
+    # `flask db upgrade -x shard=shard_N` (or `flask upgrade-shards`) migrates one user shard
+    shard = context.get_x_argument(as_dictionary=True).get('shard')
+    if shard:
+        return current_app.extensions['migrate'].db.engines[shard]
     try:
         # this works with Flask-SQLAlchemy<3 and Alchemical
         return current_app.extensions['migrate'].db.get_engine()
@@ -94,12 +99,26 @@ def run_migrations_online():
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
+    # the shadow and old tables of an online migration in progress
+    # (app/utils/online_migration.py) are not part of the schema
+    def include_name(name, type_, parent_names):
+        if type_ == 'table':
+            return not re.match(r'^_.+_(new|old)$', name)
+        return True
+
+    if conf_args.get("include_name") is None:
+        conf_args["include_name"] = include_name
+
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # one transaction per revision, so the alembic_version update of a
+        # finished revision does not hold the SQLite write lock while an
+        # online migration copies in batches on its own connections
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
+            transaction_per_migration=True,
             **conf_args
         )
 
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers (see gunicorn.conf.py):
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+from app import create_app
+from config import config
+
+app = create_app(config_class=config[os.getenv('FLASK_ENV', 'default')])
@@ -2,17 +2,15 @@ import sqlite3
 import random
 from datetime import datetime
 from faker import Faker
+import numpy as np
 import pandas as pd
 
 # Initialize Faker to generate realistic random data
 fake = Faker()
 
-# Connect to the remission.db SQLite database
-conn = sqlite3.connect('remission.db')
-cursor = conn.cursor()
-
 # Clear symptom-related tables before populating
-def clear_database():
+def clear_database(conn):
+    cursor = conn.cursor()
     cursor.execute("DELETE FROM symptom_logs")
     cursor.execute("DELETE FROM predictions")
     cursor.execute("DELETE FROM trend_analysis")
@@ -59,20 +57,59 @@ def generate_symptom_logs(num_logs):
 
     return symptom_logs
 
+# Vectorized generator for large volumes (benchmarks, load tests); same distributions and flare logic
+def generate_symptom_frame(num_logs, num_users=1000, seed=None, end=None, days=365):
+    rng = np.random.default_rng(seed)
+    end = end or datetime.utcnow()
+
+    user_ids = rng.choice(np.arange(100000, 1000000), size=num_users, replace=False).astype(str)
+    pain_level = rng.integers(1, 11, num_logs)
+    stress_level = rng.integers(1, 11, num_logs)
+    sleep_hours = np.round(rng.uniform(4.0, 9.0, num_logs), 1)
+    exercise_done = rng.integers(0, 2, num_logs)
+    took_medication = rng.integers(0, 2, num_logs)
+
+    risk_factors = (sleep_hours < 7).astype(int) + (took_medication == 0) + (exercise_done == 0) + (stress_level > 6)
+    flare = (
+            (pain_level >= 7) |
+            ((pain_level >= 5) & ((sleep_hours < 7) | (took_medication == 0) | (stress_level > 5))) |
+            ((pain_level >= 2) & (risk_factors >= 3))
+    ).astype(int)
+
+    exercise_type = np.array(['cardio', 'strength', 'yoga', 'running', None], dtype=object)[rng.integers(0, 5, num_logs)]
+    exercise_type[exercise_done == 0] = None
+
+    offsets = rng.integers(0, days * 24 * 3600, num_logs)
+    logged_at = pd.Timestamp(end).floor('s') - pd.to_timedelta(offsets, unit='s')
+
+    return pd.DataFrame({
+        "user_id": user_ids[rng.integers(0, num_users, num_logs)],
+        "pain_level": pain_level,
+        "stress_level": stress_level,
+        "sleep_hours": sleep_hours,
+        "exercise_done": exercise_done,
+        "exercise_type": exercise_type,
+        "took_medication": took_medication,
+        "flare_up": flare,
+        "logged_at": logged_at
+    })
+
 def export_to_csv(symptom_logs):
     df = pd.DataFrame(symptom_logs)
     df.to_csv('synthetic_data.csv', index=False)
     print("Synthetic data exported to synthetic_data.csv")
 
 def main():
-    clear_database()  # Clear symptom data
+    # Connect to the remission.db SQLite database
+    conn = sqlite3.connect('remission.db')
+    clear_database(conn)  # Clear symptom data
     logs_per_user = 20000  # Total synthetic logs to generate
 
     symptom_logs = generate_symptom_logs(logs_per_user)
     export_to_csv(symptom_logs)
 
     print("Data generation complete!")
+    conn.close()
 
 if __name__ == "__main__":
     main()
-    conn.close()
@@ -4,6 +4,7 @@ import os
 # Path to the remission.db database file
 db_path = os.path.join(os.path.dirname(__file__), "remission.db")
 # Path to the schema.sql file to define the database structure
+# (generated from the ORM models; regenerate with `flask dump-schema` after changing app/models.py)
 schema_path = os.path.join(os.path.dirname(__file__), "schema.sql")
 
 with sqlite3.connect(db_path) as conn:
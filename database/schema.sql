@@ -1,44 +1,153 @@
 -- SQL schema for ReMission database
+-- Generated from the ORM models (app/models.py) by `flask dump-schema`; do not edit.
+
+CREATE TABLE IF NOT EXISTS change_feed (
+    id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+    topic VARCHAR(50) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    user_id VARCHAR(10) NOT NULL,
+    payload TEXT,
+    created_at DATETIME
+);
+
+CREATE INDEX IF NOT EXISTS ix_change_feed_created_at ON change_feed (created_at);
+
+CREATE TABLE IF NOT EXISTS consumer_offsets (
+    consumer VARCHAR(50) NOT NULL,
+    position INTEGER NOT NULL,
+    updated_at DATETIME,
+    PRIMARY KEY (consumer)
+);
+
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    cohort VARCHAR(10) NOT NULL,
+    log_count INTEGER NOT NULL,
+    flare_count INTEGER NOT NULL,
+    pain_sum INTEGER NOT NULL,
+    stress_sum INTEGER NOT NULL,
+    sleep_sum FLOAT NOT NULL,
+    medication_count INTEGER NOT NULL,
+    pain_histogram VARCHAR(100),
+    stress_histogram VARCHAR(100),
+    users_sketch BLOB,
+    PRIMARY KEY (id),
+    CONSTRAINT uq_daily_rollups_day_cohort UNIQUE (day, cohort)
+);
+
+CREATE INDEX IF NOT EXISTS ix_daily_rollups_day ON daily_rollups (day);
+
+CREATE TABLE IF NOT EXISTS exercise_rollups (
+    id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    cohort VARCHAR(10) NOT NULL,
+    exercise_type VARCHAR(50) NOT NULL,
+    log_count INTEGER NOT NULL,
+    pain_sum INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT uq_exercise_rollups_day_cohort_type UNIQUE (day, cohort, exercise_type)
+);
+
+CREATE INDEX IF NOT EXISTS ix_exercise_rollups_day ON exercise_rollups (day);
+
+CREATE TABLE IF NOT EXISTS log_partitions (
+    month VARCHAR(7) NOT NULL,
+    path VARCHAR(255) NOT NULL,
+    row_count INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    archived_at DATETIME,
+    PRIMARY KEY (month)
+);
+
+CREATE TABLE IF NOT EXISTS migration_jobs (
+    name VARCHAR(100) NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    table_name VARCHAR(100) NOT NULL,
+    phase VARCHAR(10) NOT NULL,
+    start_key INTEGER NOT NULL,
+    last_key INTEGER NOT NULL,
+    end_key INTEGER NOT NULL,
+    rows_done INTEGER NOT NULL,
+    started_at DATETIME,
+    updated_at DATETIME,
+    finished_at DATETIME,
+    PRIMARY KEY (name)
+);
 
--- Table for storing user information
--- Simplified to only store a unique user_id and creation timestamp
 CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT, -- Internal identifier (autoincrement)
-    user_id VARCHAR(10) UNIQUE NOT NULL, -- Unique 6-digit string User ID
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP -- Store account creation time
+    id INTEGER NOT NULL,
+    user_id VARCHAR(10) NOT NULL,
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    UNIQUE (user_id)
+);
+
+CREATE TABLE IF NOT EXISTS write_markers (
+    user_id VARCHAR(10) NOT NULL,
+    written_at FLOAT NOT NULL,
+    PRIMARY KEY (user_id)
 );
 
--- Table for storing symptom logs reported by users
-CREATE TABLE IF NOT EXISTS symptom_logs (
-    id INTEGER PRIMARY KEY AUTOINCREMENT, -- Internal log ID
-    user_id VARCHAR(10) NOT NULL, -- References user via their unique User ID
-    pain_level INTEGER NOT NULL, -- Scale of 1-10 for pain severity
-    stress_level INTEGER NOT NULL, -- Scale of 1-10 for stress
-    sleep_hours REAL NOT NULL, -- Number of sleep hours (e.g., 7.5)
-    exercise_done BOOLEAN NOT NULL, -- Whether user exercised (true/false)
-    exercise_type VARCHAR(50), -- Type of exercise (cardio, strength, etc.)
-    took_medication BOOLEAN NOT NULL, -- Whether user took prescribed medication
-    diet_notes VARCHAR(500), -- Optional dietary information for the day
-    additional_notes VARCHAR(500), -- Any extra information users wish to log
-    logged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- Date & time of log creation
-    FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE -- Enforce ownership of logs
-);
-
--- Table for storing model predictions
 CREATE TABLE IF NOT EXISTS predictions (
-    id INTEGER PRIMARY KEY AUTOINCREMENT, -- Internal prediction ID
-    user_id VARCHAR(10) NOT NULL, -- Associated User ID
-    prediction_result VARCHAR(50) NOT NULL, -- Prediction outcome (e.g., Flare-up, Stable)
-    predicted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- Timestamp when prediction was generated
-    additional_info VARCHAR(500), -- Supporting or explanatory details
-    FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE -- User linkage
+    id INTEGER NOT NULL,
+    user_id VARCHAR(10) NOT NULL,
+    prediction_result VARCHAR(50) NOT NULL,
+    predicted_at DATETIME,
+    additional_info VARCHAR(500),
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (user_id)
 );
 
--- Table for storing trend analysis summaries for users
+CREATE TABLE IF NOT EXISTS symptom_logs (
+    id INTEGER NOT NULL,
+    user_id VARCHAR(10) NOT NULL,
+    pain_level INTEGER NOT NULL,
+    stress_level INTEGER NOT NULL,
+    sleep_hours FLOAT NOT NULL,
+    exercise_done BOOLEAN NOT NULL,
+    exercise_type VARCHAR(50),
+    took_medication BOOLEAN NOT NULL,
+    diet_notes VARCHAR(500),
+    additional_notes VARCHAR(500),
+    logged_at DATETIME,
+    timestamp TIME,
+    client_key VARCHAR(64),
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (user_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_symptom_logs_user_id_logged_at ON symptom_logs (user_id, logged_at);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_symptom_logs_user_id_client_key ON symptom_logs (user_id, client_key);
+
 CREATE TABLE IF NOT EXISTS trend_analysis (
-    id INTEGER PRIMARY KEY AUTOINCREMENT, -- Unique trend record ID
-    user_id VARCHAR(10) NOT NULL, -- The user whose trends are analyzed
-    analysis_summary VARCHAR(1000) NOT NULL, -- Summary of the observed trends
-    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- When this analysis was generated
-    FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE -- Ensure linkage and cascade on user deletion
+    id INTEGER NOT NULL,
+    user_id VARCHAR(10) NOT NULL,
+    analysis_summary VARCHAR(1000) NOT NULL,
+    generated_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (user_id)
+);
+
+CREATE TABLE IF NOT EXISTS user_adherence (
+    user_id VARCHAR(10) NOT NULL,
+    cohort VARCHAR(10) NOT NULL,
+    log_count INTEGER NOT NULL,
+    medication_count INTEGER NOT NULL,
+    PRIMARY KEY (user_id),
+    FOREIGN KEY(user_id) REFERENCES users (user_id)
 );
+
+CREATE TABLE IF NOT EXISTS user_features (
+    user_id VARCHAR(10) NOT NULL,
+    version VARCHAR(16) NOT NULL,
+    log_id INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    updated_at DATETIME,
+    PRIMARY KEY (user_id),
+    FOREIGN KEY(user_id) REFERENCES users (user_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_user_features_version ON user_features (version);
+
@@ -1,7 +1,8 @@
-import { Component, OnInit } from '@angular/core';
+import { Component, OnDestroy, OnInit } from '@angular/core';
 import { ApiService } from '../../services/api.service';
 import { CommonModule } from '@angular/common';
 import { HttpClientModule } from '@angular/common/http';
+import { Subscription } from 'rxjs';
 
 @Component({
   selector: 'app-bot',
@@ -10,8 +11,9 @@ import { HttpClientModule } from '@angular/common/http';
   styleUrls: ['./bot.component.css'],
   imports: [CommonModule, HttpClientModule]
 })
-export class BotComponent implements OnInit {
+export class BotComponent implements OnInit, OnDestroy {
   messages: string[] = [];
+  private updates?: Subscription;
 
   constructor(private apiService: ApiService) {}
 
@@ -26,16 +28,43 @@ export class BotComponent implements OnInit {
       return;
     }
 
-    this.apiService.getBotAnalysis(userId).subscribe(
-      (data: { classification: string; insights: string[] }) => {
-        if (data.insights && data.insights.length > 0) {
-          this.messages.push(`Hey there! Here's what I've noticed about your symptoms:`);
-          data.insights.forEach((insight) => this.messages.push(insight));
-        } else {
-          this.messages.push("Hmm, I don't see much recent data. Let's start logging!");
+    // The current analysis arrives first, then a fresh one after every new log
+    let first = true;
+    this.updates = this.apiService.liveUpdates(userId).subscribe({
+      next: (update) => {
+        if (update.type !== 'analysis') {
+          return;
         }
+        this.showInsights(update.data, first);
+        first = false;
       },
+      // Live updates disabled, refused or dropped: ask for the analysis once instead
+      error: () => {
+        if (first) {
+          this.fetchInsights(userId);
+        }
+      }
+    });
+  }
+
+  fetchInsights(userId: string): void {
+    this.apiService.getBotAnalysis(userId).subscribe(
+      (data: { classification: string; insights: string[] }) => this.showInsights(data, true),
       () => this.messages.push("Oops! I had trouble fetching your data. Try again later?")
     );
   }
+
+  showInsights(data: { classification: string; insights: string[] }, first: boolean): void {
+    if (data.insights && data.insights.length > 0) {
+      this.messages.push(first ? `Hey there! Here's what I've noticed about your symptoms:`
+                               : `Thanks for logging! Here's my updated take:`);
+      data.insights.forEach((insight) => this.messages.push(insight));
+    } else if (first) {
+      this.messages.push("Hmm, I don't see much recent data. Let's start logging!");
+    }
+  }
+
+  ngOnDestroy(): void {
+    this.updates?.unsubscribe();
+  }
 }
@@ -1,7 +1,8 @@
-import { Component, OnInit } from '@angular/core';
+import { Component, OnDestroy, OnInit } from '@angular/core';
 import { ApiService } from '../../services/api.service';
 import { CommonModule } from '@angular/common';
 import { HttpClientModule } from '@angular/common/http';
+import { Subscription } from 'rxjs';
 
 interface SymptomLog {
   logged_at: string;
@@ -18,7 +19,7 @@ interface SymptomLog {
   styleUrls: ['./dashboard.component.css'],
   imports: [CommonModule, HttpClientModule],
 })
-export class DashboardComponent implements OnInit {
+export class DashboardComponent implements OnInit, OnDestroy {
   loading = true;
   errorMessage: string | null = null;
   symptomLogs: SymptomLog[] = [];
@@ -26,6 +27,7 @@ export class DashboardComponent implements OnInit {
   avgStressLevel: number = 0;
   avgSleepHours: number = 0;
   insights: string[] = [];
+  private updates?: Subscription;
 
   constructor(private apiService: ApiService) {}
 
@@ -42,6 +44,31 @@ export class DashboardComponent implements OnInit {
     }
 
     this.fetchData(storedUserId);
+    this.followUpdates(storedUserId);
+  }
+
+  ngOnDestroy(): void {
+    this.updates?.unsubscribe();
+  }
+
+  /**
+   * Adds logs pushed by the server as they are committed, instead of re-fetching the list.
+   */
+  followUpdates(userId: string): void {
+    this.updates = this.apiService.liveUpdates(userId).subscribe({
+      next: (update) => {
+        if (update.type !== 'log') {
+          return;
+        }
+        this.symptomLogs = [{ ...update.data, flare_up: update.data.flare_up === 1 }, ...this.symptomLogs];
+        this.errorMessage = null;
+        this.calculateAverages();
+        this.insights = [];
+        this.generateInsights();
+      },
+      // Without live updates the dashboard shows the logs fetched on load
+      error: (error) => console.warn('Live updates unavailable:', error)
+    });
   }
 
   fetchData(userId: string): void {
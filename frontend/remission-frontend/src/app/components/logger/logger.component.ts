@@ -24,6 +24,7 @@ export class LoggerComponent {
   tookMedication: boolean | null = null; // Initially null to avoid pre-selection
   successMessage: string = '';
   errorMessage: string = '';
+  private pendingEntry: { key: string; data: string } | null = null; // Last unconfirmed submission, resent with the same key
 
   exerciseTypes: ExerciseType[] = [
     { name: 'Cardio', selected: false },
@@ -54,9 +55,16 @@ export class LoggerComponent {
       user_id: userId // Attach user_id here if required by backend payload structure
     };
 
-    this.apiService.logSymptoms(loggedData).subscribe(
+    // Resubmitting the same entry after a failure reuses its key, so a write that did land is not stored twice
+    const data = JSON.stringify(loggedData);
+    if (!this.pendingEntry || this.pendingEntry.data !== data) {
+      this.pendingEntry = { key: this.newIdempotencyKey(), data };
+    }
+
+    this.apiService.logSymptoms(loggedData, this.pendingEntry.key).subscribe(
       () => {
         this.successMessage = 'Your symptoms have been logged successfully!';
+        this.pendingEntry = null;
         this.resetForm();
       },
       (error: any) => {
@@ -66,6 +74,13 @@ export class LoggerComponent {
     );
   }
 
+  private newIdempotencyKey(): string {
+    if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+      return crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`; // Insecure contexts lack randomUUID
+  }
+
   isFormValid(): boolean {
     return (
       this.painLevel > 0 &&
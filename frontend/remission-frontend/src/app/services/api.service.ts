@@ -1,7 +1,7 @@
 import { Injectable } from '@angular/core';
 import { HttpClient, HttpHeaders } from '@angular/common/http';
-import { Observable, throwError } from 'rxjs';
-import { catchError } from 'rxjs/operators';
+import { Observable, concat, defer, of, throwError } from 'rxjs';
+import { catchError, finalize, share, tap } from 'rxjs/operators';
 
 @Injectable({
   providedIn: 'root' // Ensures the service is available application-wide
@@ -9,6 +9,8 @@ import { catchError } from 'rxjs/operators';
 export class ApiService {
   private baseUrl = 'http://localhost:5000/api'; // Base URL for your API
   private headers = new HttpHeaders({ 'Content-Type': 'application/json' });
+  private liveStreams = new Map<string, Observable<LiveUpdate>>(); // One shared event stream per user and tab
+  private latestAnalyses = new Map<string, LiveUpdate>(); // Last analysis of each open stream, for late subscribers
 
   constructor(private http: HttpClient) {}
 
@@ -26,11 +28,13 @@ export class ApiService {
   /**
    * Logs symptoms for a user.
    * @param symptomData Object containing symptom data (pain level, stress, etc.).
+   * @param idempotencyKey Key of this entry; a retry that sends the same key is stored only once.
    * @returns Observable for API response.
    */
-  logSymptoms(symptomData: any): Observable<{ message: string }> {
+  logSymptoms(symptomData: any, idempotencyKey?: string): Observable<{ message: string }> {
     const url = `${this.baseUrl}/log-symptoms`;
-    return this.http.post<{ message: string }>(url, symptomData, { headers: this.headers }).pipe(
+    const headers = idempotencyKey ? this.headers.set('Idempotency-Key', idempotencyKey) : this.headers;
+    return this.http.post<{ message: string }>(url, symptomData, { headers }).pipe(
       catchError(this.handleError('logging symptoms'))
     );
   }
@@ -63,6 +67,72 @@ export class ApiService {
     );
   }
 
+  /**
+   * Follows the user's new logs and fresh CHIIP analyses over a server-sent event stream.
+   * The current analysis arrives first; then each new log is followed by its updated analysis.
+   * All subscribers in the tab share one stream (the server caps streams per process), which
+   * closes when the last one unsubscribes.
+   * @param userId The ID of the user to follow.
+   * @returns Observable of live updates. It errors when live updates are disabled (404), the server
+   *          refuses the stream (503) or the connection keeps failing; callers then fall back to the
+   *          request/response endpoints.
+   */
+  liveUpdates(userId: string): Observable<LiveUpdate> {
+    let stream = this.liveStreams.get(userId);
+    if (!stream) {
+      stream = this.openEventStream(userId).pipe(
+        tap((update) => {
+          if (update.type === 'analysis') {
+            this.latestAnalyses.set(userId, update);
+          }
+        }),
+        finalize(() => this.latestAnalyses.delete(userId)),
+        share()
+      );
+      this.liveStreams.set(userId, stream);
+    }
+    const shared = stream;
+    // A component subscribing to an already open stream starts from its latest analysis
+    return defer(() => {
+      const analysis = this.latestAnalyses.get(userId);
+      return analysis ? concat(of(analysis), shared) : shared;
+    });
+  }
+
+  /**
+   * Opens one EventSource for the user's live updates.
+   * @param userId The ID of the user to follow.
+   * @param maxRetries Reconnection attempts after a dropped connection before giving up.
+   * @returns Observable of the stream's events; unsubscribing closes the stream.
+   */
+  private openEventStream(userId: string, maxRetries = 3): Observable<LiveUpdate> {
+    const url = `${this.baseUrl}/live-updates?user_id=${userId}`;
+    return new Observable<LiveUpdate>((subscriber) => {
+      const source = new EventSource(url);
+      let opened = false;
+      let failures = 0;
+      source.addEventListener('open', () => {
+        opened = true;
+        failures = 0;
+      });
+      source.addEventListener('analysis', (event) =>
+        subscriber.next({ type: 'analysis', data: JSON.parse((event as MessageEvent).data) })
+      );
+      source.addEventListener('log', (event) =>
+        subscriber.next({ type: 'log', data: JSON.parse((event as MessageEvent).data) })
+      );
+      // EventSource reconnects by itself after a dropped connection, but not after an error status
+      // (e.g. 404 or 503), and it would retry an unreachable server forever
+      source.addEventListener('error', () => {
+        if (source.readyState === EventSource.CLOSED || !opened || ++failures > maxRetries) {
+          source.close();
+          subscriber.error(new Error('Live updates are unavailable.'));
+        }
+      });
+      return () => source.close();
+    });
+  }
+
   /**
    * Sends a user message to CHIIP and retrieves a response.
    * @param userMessage The message from the user to the bot.
@@ -116,3 +186,10 @@ interface SymptomLog {
   took_medication?: boolean;
   flare_up?: number;
 }
+
+/**
+ * Event pushed on the live updates stream.
+ */
+export type LiveUpdate =
+  | { type: 'analysis'; data: { classification: string; insights: string[] } }
+  | { type: 'log'; data: SymptomLog };